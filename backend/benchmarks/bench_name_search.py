@@ -0,0 +1,85 @@
+"""
+Benchmark: /api/search over the filename index.
+
+Fills a name index with a synthetic library (series folders with 20 episodes
+each plus flat movie folders, titles made of random syllables) and times a few
+typical searches.
+
+Usage (from backend/):
+    python benchmarks/bench_name_search.py
+    python benchmarks/bench_name_search.py --files 500000 --runs 10
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.core.name_index import NameIndex  # noqa: E402
+from app.core.tree_index import TreeIndex  # noqa: E402
+
+SYLLABLES = ["ka", "ri", "mo", "the", "sa", "lo", "ven", "dor", "an", "mi", "ta", "rel", "os", "qu", "ne", "bri"]
+EPISODES_PER_SHOW = 20
+
+
+def title(rng: random.Random) -> str:
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 4))]
+    return " ".join(w.capitalize() for w in words)
+
+
+def fill(index: NameIndex, files: int) -> list:
+    rng = random.Random(42)
+    titles = []
+    count = 0
+    while count < files:
+        name = title(rng)
+        titles.append(name)
+        if rng.random() < 0.7:
+            season = rng.randint(1, 9)
+            episodes = [f"{name.replace(' ', '.')}.S{season:02d}E{e:02d}.1080p.mkv" for e in range(1, EPISODES_PER_SHOW + 1)]
+            index._set_dir(f"/Shows/{name}/Season {season}", episodes)
+            count += len(episodes)
+        else:
+            year = rng.randint(1950, 2025)
+            index._set_dir(f"/Movies/{name} ({year})", [f"{name} ({year}).mkv"])
+            count += 1
+    return titles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=300_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    index = NameIndex(TreeIndex(index_file=Path("unused.json")))
+    start = time.perf_counter()
+    titles = fill(index, args.files)
+    print(f"indexed {index.file_count:,} files in {len(index._dirs):,} folders in {time.perf_counter() - start:.1f}s")
+    # Searches only sync pending tree changes; the index above is complete
+    index.sync = lambda: None
+
+    rng = random.Random(7)
+    queries = {
+        "exact title": rng.choice(titles),
+        "title word + episode": f"{rng.choice(titles).split()[0]} s01e05",
+        "common syllable": "the",
+        "two letters": "ka",
+        "episode code": "s03e12",
+        "no match": "zzzzz",
+    }
+    print(f"{'query':<24} {'terms':<30} {'matches':>8} {'median ms':>10}")
+    for name, query in queries.items():
+        latencies = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            total, _ = index.search(query, 50)
+            latencies.append(time.perf_counter() - start)
+        print(f"{name:<24} {query[:30]:<30} {total:>8,} {statistics.median(latencies) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
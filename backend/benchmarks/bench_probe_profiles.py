@@ -0,0 +1,146 @@
+"""
+Benchmark: 'fast' vs. 'full' ffprobe profile.
+
+For each sample file, runs both profiles several times and reports the median
+latency and the number of bytes ffprobe read (from its own I/O statistics,
+logged at `-v verbose`). It also checks that both profiles report the same
+audio/subtitle streams.
+
+Without arguments, MKV and MP4 samples with several audio and subtitle tracks
+are generated with ffmpeg in a temporary directory.
+
+Usage (from backend/):
+    python benchmarks/bench_probe_profiles.py
+    python benchmarks/bench_probe_profiles.py /media/input/tv/Show/ep1.mkv --runs 10 --cold
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.core.ffprobe import build_ffprobe_command  # noqa: E402
+
+_BYTES_READ = re.compile(r"Statistics: (\d+) bytes read")
+
+
+def make_samples(folder: Path, seconds: int) -> List[Path]:
+    """Creates an MKV and an MP4 with one video, three audio and two subtitle tracks."""
+    srt = folder / "subs.srt"
+    srt.write_text("1\n00:00:01,000 --> 00:00:03,000\nHello\n", encoding="utf-8")
+    inputs = [
+        "-f", "lavfi", "-i", f"testsrc=duration={seconds}:size=1280x720:rate=25",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=660:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=880:duration={seconds}",
+        "-i", str(srt), "-i", str(srt),
+    ]
+    maps = ["-map", "0:v", "-map", "1:a", "-map", "2:a", "-map", "3:a", "-map", "4:s", "-map", "5:s"]
+    tags = [
+        "-metadata:s:a:0", "language=eng", "-metadata:s:a:0", "title=Stereo",
+        "-metadata:s:a:1", "language=fra",
+        "-metadata:s:a:2", "language=jpn", "-metadata:s:a:2", "title=Commentary",
+        "-metadata:s:s:0", "language=eng", "-metadata:s:s:1", "language=spa",
+    ]
+    samples = []
+    for name, subtitle_codec in (("sample.mkv", "srt"), ("sample.mp4", "mov_text")):
+        target = folder / name
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", *inputs, *maps,
+             "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "4M",
+             "-c:a", "aac", "-c:s", subtitle_codec, *tags, str(target)],
+            check=True,
+        )
+        samples.append(target)
+    return samples
+
+
+def drop_page_cache(path: Path):
+    """Asks the kernel to forget cached pages of the file, so the next read hits the disk."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def verbose(cmd: List[str]) -> List[str]:
+    """Same command, logging at verbose level so ffprobe prints its I/O statistics."""
+    cmd = list(cmd)
+    if "-v" in cmd:
+        i = cmd.index("-v")
+        del cmd[i:i + 2]
+    return [cmd[0], "-v", "verbose", *cmd[1:]]
+
+
+def streams_of(stdout: str) -> List[Tuple]:
+    streams = json.loads(stdout).get("streams", [])
+    return [
+        (s.get("index"), s.get("codec_type"), s.get("tags", {}).get("language"), s.get("tags", {}).get("title"))
+        for s in streams
+        if s.get("codec_type") in ("audio", "subtitle")
+    ]
+
+
+def run_profile(path: Path, profile: str, runs: int, cold: bool):
+    cmd = verbose(build_ffprobe_command(path, profile))
+    latencies = []
+    bytes_read = None
+    streams = None
+    for _ in range(runs):
+        if cold:
+            drop_page_cache(path)
+        start = time.perf_counter()
+        result = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
+        latencies.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed ({profile}) for {path}: {result.stderr.strip()}")
+        # A file can be opened more than once (e.g. MP4 with moov at the end); count everything
+        bytes_read = sum(int(n) for n in _BYTES_READ.findall(result.stderr))
+        streams = streams_of(result.stdout)
+    return statistics.median(latencies), bytes_read, streams
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path, help="Sample files (default: generate MKV/MP4 samples)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seconds", type=int, default=60, help="Length of generated samples")
+    parser.add_argument("--cold", action="store_true", help="Drop the file from the page cache before each run")
+    args = parser.parse_args()
+
+    if shutil.which("ffprobe") is None:
+        sys.exit("ffprobe not found on PATH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files
+        if not files:
+            if shutil.which("ffmpeg") is None:
+                sys.exit("ffmpeg not found on PATH; pass sample files instead")
+            files = make_samples(Path(tmp), args.seconds)
+
+        print(f"{'file':<32} {'profile':<8} {'median ms':>10} {'bytes read':>14}")
+        for path in files:
+            size = path.stat().st_size
+            results = {}
+            for profile in ("full", "fast"):
+                latency, bytes_read, streams = run_profile(path, profile, args.runs, args.cold)
+                results[profile] = streams
+                print(f"{path.name[:32]:<32} {profile:<8} {latency * 1000:>10.1f} {bytes_read:>14,}")
+            same = "same streams" if results["fast"] == results["full"] else "STREAMS DIFFER"
+            print(f"{'':<32} size {size:,} bytes, {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: stream queries over the probe cache.
+
+Fills a probe cache database with synthetic results (random languages, 0-5
+audio and 0-6 subtitle streams per file, 50 files per folder) and times a few
+typical /api/query filters over the whole library and over one folder.
+
+Usage (from backend/):
+    python benchmarks/bench_stream_query.py
+    python benchmarks/bench_stream_query.py --files 200000 --runs 10
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.core.models import StreamQuery  # noqa: E402
+from app.core.probe_cache import ProbeCache  # noqa: E402
+
+LANGUAGES = ["eng", "jpn", "fra", "rus", "spa", "ger", "unknown"]
+
+QUERIES = {
+    "more than 3 audio tracks": StreamQuery(min_audio=4),
+    "rus subtitles": StreamQuery(subtitle_languages=["rus"]),
+    "only unknown audio": StreamQuery(only_audio_languages=["unknown"]),
+    "eng+jpn audio, no eng subs": StreamQuery(audio_languages=["eng", "jpn"], missing_subtitle_languages=["eng"]),
+    "title contains 'comment'": StreamQuery(title="comment"),
+}
+
+
+def fill(cache: ProbeCache, root: Path, files: int):
+    rng = random.Random(42)
+    rows = []
+    for i in range(files):
+        audio = [
+            {"id": j + 1, "language": rng.choice(LANGUAGES), "title": "Commentary" if j == 3 else None, "codec_type": "audio"}
+            for j in range(rng.randint(0, 5))
+        ]
+        subtitle = [
+            {"id": j + 10, "language": rng.choice(LANGUAGES), "title": None, "codec_type": "subtitle"}
+            for j in range(rng.randint(0, 6))
+        ]
+        path = root / f"Show {i // 50:05d}" / f"e{i:06d}.mkv"
+        result = json.dumps({"audio": audio, "subtitle": subtitle})
+        languages = json.dumps(sorted({s["language"] for s in audio + subtitle}))
+        rows.append((str(path), 1, 1, i, result, languages, 0.0))
+    conn = cache._connect()
+    conn.executemany("INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path("/media/input")
+        cache = ProbeCache(db_file=Path(tmp) / "probe_cache.db", max_entries=args.files * 2)
+        start = time.perf_counter()
+        fill(cache, root, args.files)
+        print(f"filled {args.files:,} files in {time.perf_counter() - start:.1f}s")
+
+        print(f"{'query':<30} {'scope':<8} {'matches':>8} {'median ms':>10}")
+        for name, query in QUERIES.items():
+            for scope, folder in (("library", root), ("folder", root / "Show 00042")):
+                latencies = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    total, _ = cache.query_files(folder, True, query, 0, 100)
+                    latencies.append(time.perf_counter() - start)
+                print(f"{name:<30} {scope:<8} {total:>8,} {statistics.median(latencies) * 1000:>10.1f}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark: legacy recursive `build_tree` vs. the scandir-based parallel scanner.
+
+Builds a synthetic library (shows/seasons/episodes plus folders without videos)
+in a temporary directory and times a full tree build with both implementations.
+`--latency-ms` adds a fixed delay to every directory listing and stat call to
+approximate a network mount, where each call is a round trip to the server.
+
+Usage (from backend/):
+    python benchmarks/bench_tree_scan.py
+    python benchmarks/bench_tree_scan.py --shows 200 --latency-ms 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from app.core.config import settings  # noqa: E402
+from app.core.models import FileNode  # noqa: E402
+from app.core.tree_index import TreeIndex  # noqa: E402
+
+
+def build_tree(path: Path, root: Path) -> Optional[FileNode]:
+    """The original /api/tree implementation, kept here as the baseline."""
+    children = []
+    try:
+        subdirs = sorted(
+            [item for item in path.iterdir() if item.is_dir() and not item.name.startswith(".")],
+            key=lambda x: x.name.lower()
+        )
+        for subdir in subdirs:
+            child_node = build_tree(subdir, root)
+            if child_node:
+                children.append(child_node)
+    except (PermissionError, FileNotFoundError):
+        pass
+
+    has_videos = False
+    try:
+        has_videos = any(
+            item.is_file() and item.suffix.lower() in settings.VIDEO_EXTENSIONS
+            for item in path.iterdir()
+        )
+    except (PermissionError, FileNotFoundError):
+        pass
+
+    if not has_videos and not children:
+        return None
+
+    name = "/" if path == root else path.name
+    rel_path = "/" + str(path.relative_to(root)).replace("\\", "/")
+    if rel_path == "/.":
+        rel_path = "/"
+    return FileNode(name=name, rel_path=rel_path, children=children)
+
+
+def make_library(root: Path, shows: int, seasons: int, episodes: int):
+    for show in range(shows):
+        show_dir = root / "TV" / f"Show {show:04d}"
+        for season in range(seasons):
+            season_dir = show_dir / f"Season {season + 1:02d}"
+            season_dir.mkdir(parents=True)
+            for episode in range(episodes):
+                (season_dir / f"S{season + 1:02d}E{episode + 1:02d}.mkv").touch()
+                (season_dir / f"S{season + 1:02d}E{episode + 1:02d}.srt").touch()
+        (show_dir / "Extras").mkdir()
+        (show_dir / "Extras" / "poster.jpg").touch()
+    for movie in range(shows):
+        movie_dir = root / "Movies" / f"Movie {movie:04d}"
+        movie_dir.mkdir(parents=True)
+        (movie_dir / "movie.mp4").touch()
+        (movie_dir / "movie.nfo").touch()
+
+
+def add_latency(seconds: float):
+    """Delays every listing and stat call, like a round trip to a file server."""
+    if seconds <= 0:
+        return
+
+    def delayed(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return func(*args, **kwargs)
+        return wrapper
+
+    os.stat = delayed(os.stat)
+    os.scandir = delayed(os.scandir)
+    os.listdir = delayed(os.listdir)
+
+
+def shape(node: Optional[FileNode]):
+    if node is None:
+        return None
+    return node.rel_path, [shape(c) for c in node.children or []]
+
+
+def count_nodes(node: Optional[FileNode]) -> int:
+    if node is None:
+        return 0
+    return 1 + sum(count_nodes(c) for c in node.children or [])
+
+
+def timed(func, repeat: int):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shows", type=int, default=50, help="Number of shows (and movies)")
+    parser.add_argument("--seasons", type=int, default=4)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Delay added to each listing/stat call")
+    parser.add_argument("--workers", type=int, default=settings.TREE_SCAN_WORKERS)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        make_library(root, args.shows, args.seasons, args.episodes)
+        settings.INPUT_ROOT = root
+        settings.TREE_SCAN_WORKERS = args.workers
+        add_latency(args.latency_ms / 1000)
+
+        legacy_time, legacy_tree = timed(lambda: build_tree(root, root), args.repeat)
+
+        def build_index():
+            index = TreeIndex(index_file=Path(tmp) / "tree_index.json")
+            index.build()
+            return index.get_tree()
+
+        scanner_time, scanner_tree = timed(build_index, args.repeat)
+
+    assert shape(legacy_tree) == shape(scanner_tree), "scanner produced a different tree"
+
+    print(f"folders in tree: {count_nodes(scanner_tree)}, latency: {args.latency_ms} ms/call, workers: {args.workers}")
+    print(f"legacy build_tree: {legacy_time * 1000:9.1f} ms")
+    print(f"parallel scanner : {scanner_time * 1000:9.1f} ms  ({legacy_time / scanner_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
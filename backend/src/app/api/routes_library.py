@@ -0,0 +1,137 @@
+import asyncio
+from pathlib import Path
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from ..core.models import LanguageCount, LanguageIndex, QueryResult, SearchResult, StreamQuery, VideoFile
+from ..core.name_index import name_index
+from ..core.probe_cache import FileIdentity, probe_cache
+from ..core.security_paths import get_input_path, settings
+
+router = APIRouter()
+
+def _resolve_dir(dir: str) -> Path:
+    try:
+        dir_path = get_input_path(dir)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not dir_path.is_dir():
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+    return dir_path
+
+def _rel_dir(folder: str) -> Optional[str]:
+    """probe_streams folder (absolute, trailing separator) -> rel_path as used by the tree, or None like _rel_file."""
+    try:
+        rel = Path(folder).relative_to(settings.INPUT_ROOT)
+    except ValueError:
+        return None
+    return "/" + str(rel).replace("\\", "/") if str(rel) != "." else "/"
+
+def _rel_file(path: str) -> Optional[str]:
+    """Cached file path -> rel_path, or None if it is not under INPUT_ROOT (e.g. the root was moved)."""
+    try:
+        rel = Path(path).relative_to(settings.INPUT_ROOT)
+    except ValueError:
+        return None
+    return "/" + str(rel).replace("\\", "/")
+
+@router.get("/languages", response_model=LanguageIndex)
+async def get_languages(
+    dir: str = Query("/", description="Relative path to directory"),
+    recursive: bool = Query(True, description="Include all sub-folders"),
+):
+    """
+    Aggregates stream languages over the probe cache, without probing anything:
+    per language the number of files with it (overall, in audio, in subtitles),
+    plus a per-folder rollup. Files that were not probed yet are not counted, and
+    files deleted or changed since they were probed may be until they are pruned.
+    """
+    dir_path = _resolve_dir(dir)
+    files, rows = await asyncio.to_thread(probe_cache.language_index, dir_path, recursive)
+
+    languages = {}
+    directories = {}
+    for folder, language, file_count, audio, subtitle in rows:
+        rel_dir = _rel_dir(folder)
+        if rel_dir is None:
+            # Cached before INPUT_ROOT moved; not part of the library any more
+            continue
+        total = languages.setdefault(language, LanguageCount(files=0, audio=0, subtitle=0))
+        # Each file belongs to one folder, so per-folder counts add up
+        total.files += file_count
+        total.audio += audio
+        total.subtitle += subtitle
+        directories.setdefault(rel_dir, {})[language] = file_count
+
+    return LanguageIndex(dir=dir, recursive=recursive, files=files, languages=languages, directories=directories)
+
+@router.get("/query", response_model=QueryResult)
+async def query_files(
+    dir: str = Query("/", description="Relative path to directory"),
+    recursive: bool = Query(True, description="Include all sub-folders"),
+    audio_language: List[str] = Query([], description="Has an audio stream in each language"),
+    subtitle_language: List[str] = Query([], description="Has a subtitle stream in each language"),
+    missing_audio_language: List[str] = Query([], description="Has no audio stream in any of these languages"),
+    missing_subtitle_language: List[str] = Query([], description="Has no subtitle stream in any of these languages"),
+    only_audio_language: List[str] = Query([], description="All audio streams are in these languages"),
+    only_subtitle_language: List[str] = Query([], description="All subtitle streams are in these languages"),
+    title: Optional[str] = Query(None, description="Substring of any stream title (case-insensitive)"),
+    min_audio: Optional[int] = Query(None, ge=0),
+    max_audio: Optional[int] = Query(None, ge=0),
+    min_subtitles: Optional[int] = Query(None, ge=0),
+    max_subtitles: Optional[int] = Query(None, ge=0),
+    offset: int = Query(0, ge=0, description="Index of the first file to return"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of files to return"),
+):
+    """
+    Finds probed files by their streams, e.g. files with more than 3 audio tracks
+    (min_audio=4) or whose only audio is unknown (only_audio_language=unknown).
+    Filters are combined with AND; results are ordered by path. Files changed
+    since they were probed are left out of the page, but `total` may still count them.
+    """
+    dir_path = _resolve_dir(dir)
+    query = StreamQuery(
+        audio_languages=audio_language,
+        subtitle_languages=subtitle_language,
+        missing_audio_languages=missing_audio_language,
+        missing_subtitle_languages=missing_subtitle_language,
+        only_audio_languages=only_audio_language,
+        only_subtitle_languages=only_subtitle_language,
+        title=title,
+        min_audio=min_audio,
+        max_audio=max_audio,
+        min_subtitles=min_subtitles,
+        max_subtitles=max_subtitles,
+    )
+    total, rows = await asyncio.to_thread(probe_cache.query_files, dir_path, recursive, query, offset, limit)
+    current = await asyncio.to_thread(lambda: [FileIdentity.of(Path(path)) for path, _, _ in rows])
+
+    files = []
+    for (path, identity, result), current_identity in zip(rows, current):
+        if current_identity != identity:
+            # Deleted or changed since it was probed; its new streams may not match. The row
+            # stays (deleting it would shift later pages); folder listings and the crawler prune it.
+            continue
+        rel_path = _rel_file(path)
+        if rel_path is None:
+            continue
+        files.append(VideoFile(
+            name=Path(path).name,
+            rel_path=rel_path,
+            audio_streams=result["audio"],
+            subtitle_streams=result["subtitle"],
+        ))
+    next_offset = offset + len(rows) if offset + len(rows) < total else None
+    return QueryResult(files=files, total=total, offset=offset, next_offset=next_offset)
+
+@router.get("/search", response_model=SearchResult)
+async def search_files(
+    q: str = Query(..., description="Words that must all appear in the file's path (case-insensitive)"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of paths to return"),
+):
+    """
+    Finds video files by name anywhere under INPUT_ROOT, using the filename
+    index instead of walking the library. Returns rel_paths, best match first.
+    """
+    total, results = await asyncio.to_thread(name_index.search, q, limit)
+    return SearchResult(query=q, total=total, results=results)
@@ -1,55 +1,196 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request
+from sse_starlette.sse import EventSourceResponse
+from pathlib import Path
+from typing import List, Literal, Optional, Tuple
 from ..core.security_paths import get_input_path, settings
 from ..core.models import DirectoryContent, VideoFile
 from ..core.ffprobe import probe_file
+from ..core.dir_cache import dir_cache
+from ..core.probe_cache import FileIdentity, probe_cache
+from ..core.singleflight import SingleFlight
 import asyncio
+import json
 
 router = APIRouter()
 
-@router.get("/list", response_model=DirectoryContent)
-async def list_directory(dir: str = Query(..., description="Relative path to directory")):
+ListEntry = Tuple[VideoFile, Path, FileIdentity]
+
+# Concurrent listings of the same directory share one scan
+_scan_flights = SingleFlight()
+
+# How often a plain /list request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+_SORT_KEYS = {
+    "name": None,  # listings are already sorted by name
+    "size": lambda entry: entry[2].size,
+    "mtime": lambda entry: entry[2].mtime_ns,
+}
+
+def _resolve_dir(dir: str) -> Path:
     try:
         dir_path = get_input_path(dir)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-        
+
     if not dir_path.is_dir():
         raise HTTPException(status_code=400, detail="Path is not a directory")
+    return dir_path
 
+async def _list_files(dir_path: Path) -> List[ListEntry]:
+    """Lists the video files in dir_path (cached per directory, sorted by name), without probing them."""
+    items = await _scan_flights.do(dir_path, lambda: asyncio.to_thread(dir_cache.list_videos, dir_path))
     files = []
-    languages = set()
-    
-    # List files
-    items = sorted(dir_path.iterdir(), key=lambda x: x.name)
-    
-    # Gather tasks for probing
-    probe_tasks = []
-    video_files_map = {} # path -> VideoFile
-    
     for item in items:
-        if item.is_file() and item.suffix.lower() in settings.VIDEO_EXTENSIONS:
-            rel_path = "/" + str(item.relative_to(settings.INPUT_ROOT)).replace("\\", "/")
-            vf = VideoFile(name=item.name, rel_path=rel_path)
-            files.append(vf)
-            video_files_map[str(item)] = vf
-            probe_tasks.append(probe_file(item))
-            
-    # Probe in parallel
-    if probe_tasks:
-        results = await asyncio.gather(*probe_tasks)
-        
+        item_path = dir_path / item.name
+        rel_path = "/" + str(item_path.relative_to(settings.INPUT_ROOT)).replace("\\", "/")
+        files.append((
+            VideoFile(name=item.name, rel_path=rel_path),
+            item_path,
+            FileIdentity(item.size, item.mtime_ns, item.inode),
+        ))
+    return files
+
+def _restat(page: List[ListEntry]) -> List[Tuple[VideoFile, Path, Optional[FileIdentity]]]:
+    """
+    Stats the page's files again: the directory listing is only revalidated by the
+    directory's mtime, which does not change when a file is rewritten in place.
+    """
+    return [(vf, path, FileIdentity.of(path)) for vf, path, _ in page]
+
+def _select_page(
+    listed: List[ListEntry], sort: str, order: str, offset: int, limit: Optional[int]
+) -> Tuple[List[ListEntry], Optional[int]]:
+    """Sorts the listing and returns the requested page plus the offset of the next page, if any."""
+    entries = listed
+    if _SORT_KEYS[sort] is not None:
+        entries = sorted(entries, key=_SORT_KEYS[sort])
+    if order == "desc":
+        entries = entries[::-1]
+    end = len(entries) if limit is None else offset + limit
+    next_offset = end if end < len(entries) else None
+    return entries[offset:end], next_offset
+
+async def _folder_languages(dir_path: Path, listed: List[ListEntry]) -> set:
+    """Languages of the whole folder from the probe cache, without probing anything."""
+    identities = {vf.name: identity for vf, _, identity in listed}
+    return await asyncio.to_thread(probe_cache.folder_languages, dir_path, identities)
+
+async def _until_disconnected(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+async def _probe_page(request: Request, page: List[ListEntry]) -> list:
+    """Probes the page in parallel; outstanding probes are cancelled (and their ffprobe killed) if the client disconnects."""
+    page = await asyncio.to_thread(_restat, page)
+    probes = asyncio.ensure_future(asyncio.gather(*(probe_file(path, identity) for _, path, identity in page)))
+    watcher = asyncio.create_task(_until_disconnected(request))
+    try:
+        await asyncio.wait({probes, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not probes.done():
+            probes.cancel()
+            # Nobody awaits the cancelled probes; mark their outcome as retrieved
+            probes.add_done_callback(lambda f: f.cancelled() or f.exception())
+    if not probes.done() or probes.cancelled():
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return probes.result()
+
+def _apply_probe(vf: VideoFile, res, languages: set):
+    vf.audio_streams = res["audio"]
+    vf.subtitle_streams = res["subtitle"]
+
+    for s in vf.audio_streams:
+        languages.add(s.language)
+    for s in vf.subtitle_streams:
+        languages.add(s.language)
+
+@router.get("/list", response_model=DirectoryContent)
+async def list_directory(
+    request: Request,
+    dir: str = Query(..., description="Relative path to directory"),
+    offset: int = Query(0, ge=0, description="Index of the first file to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of files to return (omit for all)"),
+    sort: Literal["name", "size", "mtime"] = Query("name"),
+    order: Literal["asc", "desc"] = Query("asc"),
+):
+    """
+    Lists video files in the directory with their streams. Only the requested page is probed;
+    for a partial page `languages` also covers files of other pages that are in the probe cache.
+    """
+    dir_path = _resolve_dir(dir)
+
+    languages = set()
+    listed = await _list_files(dir_path)
+    page, next_offset = _select_page(listed, sort, order, offset, limit)
+    files = [vf for vf, _, _ in page]
+
+    # Probe in parallel; unchanged files are answered from the probe cache without touching them
+    if page:
+        results = await _probe_page(request, page)
+
         # Assign results back
         for vf, res in zip(files, results):
-            vf.audio_streams = res["audio"]
-            vf.subtitle_streams = res["subtitle"]
-            
-            for s in vf.audio_streams:
-                languages.add(s.language)
-            for s in vf.subtitle_streams:
-                languages.add(s.language)
+            _apply_probe(vf, res, languages)
+
+    if len(page) < len(listed):
+        languages |= await _folder_languages(dir_path, listed)
 
     return DirectoryContent(
         dir=dir,
         files=files,
-        languages=languages
+        languages=languages,
+        total=len(listed),
+        offset=offset,
+        next_offset=next_offset,
     )
+
+@router.get("/list/events")
+async def list_directory_events(
+    dir: str = Query(..., description="Relative path to directory"),
+    offset: int = Query(0, ge=0, description="Index of the first file to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of files to return (omit for all)"),
+    sort: Literal["name", "size", "mtime"] = Query("name"),
+    order: Literal["asc", "desc"] = Query("asc"),
+):
+    """
+    Streams the directory contents as server-sent events:
+    `listing` with the page's files (no streams yet) right away, one `file`
+    event per file as its probe completes, and a final `languages` event.
+    """
+    dir_path = _resolve_dir(dir)
+    listed = await _list_files(dir_path)
+    page, next_offset = _select_page(listed, sort, order, offset, limit)
+
+    async def event_generator():
+        languages = set()
+        yield {
+            "event": "listing",
+            "data": json.dumps({
+                "dir": dir,
+                "files": [vf.model_dump() for vf, _, _ in page],
+                "total": len(listed),
+                "offset": offset,
+                "next_offset": next_offset,
+            }),
+        }
+
+        async def probe(vf: VideoFile, path: Path, identity: Optional[FileIdentity]):
+            return vf, await probe_file(path, identity)
+
+        tasks = [asyncio.create_task(probe(*entry)) for entry in await asyncio.to_thread(_restat, page)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                vf, res = await next_done
+                _apply_probe(vf, res, languages)
+                yield {"event": "file", "data": vf.model_dump_json()}
+            if len(page) < len(listed):
+                languages |= await _folder_languages(dir_path, listed)
+            yield {"event": "languages", "data": json.dumps(sorted(languages))}
+        finally:
+            # Client went away: stop probes that have not finished (kills their ffprobe)
+            for task in tasks:
+                task.cancel()
+
+    return EventSourceResponse(event_generator())
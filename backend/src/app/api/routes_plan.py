@@ -0,0 +1,133 @@
+from fastapi import APIRouter, HTTPException
+from sse_starlette.sse import EventSourceResponse
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+from ..core.security_paths import get_input_path, settings
+from ..core.models import PlanCollision, PlanRequest, PlanSummary, PlannedFile, ProcessRequest
+from ..core.ffprobe import probe_file
+from ..core.dir_cache import dir_cache
+from ..core.planner import plan_file
+from ..core.preflight import preflight
+from ..core.probe_cache import FileIdentity
+from ..core.tree_index import normalize_rel_path, tree_index
+from ..core.jobs.queue import job_queue
+from ..core.jobs.store import job_store
+from ..core.jobs.events import event_manager
+import asyncio
+
+router = APIRouter()
+
+# Files resolved at once; uncached ones beyond the probe pool's limit simply queue there
+PLAN_IN_FLIGHT = 64
+
+async def _iter_files(rel_dir: str, recursive: bool) -> AsyncIterator[Tuple[str, Path, FileIdentity]]:
+    """Yields (rel_path, path, identity) of the video files in rel_dir, and below it if recursive."""
+    if recursive:
+        if not tree_index.loaded:
+            await asyncio.to_thread(tree_index.ensure_loaded)
+        folders = sorted(await asyncio.to_thread(tree_index.directories, rel_dir))
+    else:
+        folders = [rel_dir]
+    for folder in folders:
+        folder_path = settings.INPUT_ROOT / folder.lstrip("/") if folder != "/" else settings.INPUT_ROOT
+        try:
+            items = await asyncio.to_thread(dir_cache.list_videos, folder_path)
+        except OSError:
+            continue
+        for item in items:
+            rel_path = folder.rstrip("/") + "/" + item.name
+            yield rel_path, folder_path / item.name, FileIdentity(item.size, item.mtime_ns, item.inode)
+
+@router.post("/plan")
+async def plan(request: PlanRequest):
+    """
+    Resolves per-file stream selections for a whole folder tree from language rules,
+    streamed as server-sent events: one `file` event per file that has streams to
+    drop, a `collision` event per changed file whose output name is already taken,
+    then a `summary` with the totals and a ProcessRequest for the changed files.
+    """
+    try:
+        dir_path = get_input_path(request.dir)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not dir_path.is_dir():
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+    rel_dir = normalize_rel_path(request.dir)
+
+    async def resolve(rel_path: str, path: Path, identity: FileIdentity) -> Tuple[Optional[PlannedFile], bool]:
+        streams = await probe_file(path, identity)
+        has_streams = bool(streams["audio"] or streams["subtitle"])
+        planned = plan_file(rel_path, identity.size, streams, request.audio_languages, request.subtitle_languages)
+        return planned, has_streams
+
+    async def event_generator():
+        summary = PlanSummary(
+            files=0,
+            files_changed=0,
+            files_without_streams=0,
+            streams_dropped=0,
+            estimated_bytes_saved=0,
+            request=ProcessRequest(
+                dir=request.dir,
+                output_dir=request.output_dir,
+                audio_languages=request.audio_languages,
+                subtitle_languages=request.subtitle_languages,
+                selections=[],
+            ),
+        )
+        files = _iter_files(rel_dir, request.recursive)
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < PLAN_IN_FLIGHT:
+                    try:
+                        entry = await files.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.create_task(resolve(*entry)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    planned, has_streams = task.result()
+                    summary.files += 1
+                    if not has_streams:
+                        summary.files_without_streams += 1
+                    if planned is None:
+                        continue
+                    summary.files_changed += 1
+                    summary.streams_dropped += planned.audio_dropped + planned.subtitles_dropped
+                    summary.estimated_bytes_saved += planned.estimated_bytes_saved
+                    summary.request.selections.append(planned.selection)
+                    yield {"event": "file", "data": planned.model_dump_json()}
+
+            summary.request.selections.sort(key=lambda s: s.rel_path)
+            # The worker writes every file into output_dir under its own name, so same-named
+            # files from different folders would overwrite each other. The first one by path
+            # stays in the job; the others are reported and need another output folder.
+            selections = []
+            outputs = {}
+            for selection in summary.request.selections:
+                other = outputs.setdefault(selection.rel_path.rsplit("/", 1)[-1], selection.rel_path)
+                if other == selection.rel_path:
+                    selections.append(selection)
+                    continue
+                summary.files_colliding += 1
+                collision = PlanCollision(rel_path=selection.rel_path, collides_with=other)
+                yield {"event": "collision", "data": collision.model_dump_json()}
+            summary.request.selections = selections
+            if request.enqueue and summary.request.selections:
+                summary.errors = await preflight(summary.request)
+                if not summary.errors:
+                    summary.job_id = await job_queue.enqueue(summary.request)
+                    await event_manager.emit_global(job_store.list_active_jobs())
+            yield {"event": "summary", "data": summary.model_dump_json()}
+        finally:
+            # Client went away: stop probes that have not finished
+            for task in pending:
+                task.cancel()
+            await files.aclose()
+
+    return EventSourceResponse(event_generator())
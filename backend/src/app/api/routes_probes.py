@@ -0,0 +1,55 @@
+import asyncio
+from pathlib import Path
+from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from ..core.crawler import probe_crawler
+from ..core.ffprobe import probe_flights
+from ..core.models import CrawlerStatus, ProbeStats, QuarantinedFile
+from ..core.probe_cache import probe_cache
+from ..core.probe_pool import probe_pool
+from ..core.security_paths import get_input_path, settings
+
+router = APIRouter()
+
+@router.get("/probes/stats", response_model=ProbeStats)
+async def get_probe_stats():
+    """
+    Returns ffprobe concurrency limits and queueing metrics.
+    """
+    stats = probe_pool.stats()
+    stats.coalesced = probe_flights.shared
+    return stats
+
+@router.get("/probes/crawler", response_model=CrawlerStatus)
+async def get_crawler_status():
+    """
+    Returns the progress of the background pre-probe crawler.
+    """
+    return probe_crawler.status
+
+@router.get("/probes/quarantine", response_model=List[QuarantinedFile])
+async def get_quarantined_files():
+    """
+    Lists files ffprobe failed on, with the reason. They are not probed again
+    (and list without streams) until they change or are released.
+    """
+    files = await asyncio.to_thread(probe_cache.quarantined)
+    for f in files:
+        try:
+            f.path = "/" + str(Path(f.path).relative_to(settings.INPUT_ROOT)).replace("\\", "/")
+        except ValueError:
+            pass
+    return files
+
+@router.delete("/probes/quarantine")
+async def release_quarantined_file(path: str = Query(..., description="Relative path of the file")):
+    """
+    Releases a file from the quarantine so the next listing probes it again.
+    """
+    try:
+        file_path = get_input_path(path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not await asyncio.to_thread(probe_cache.release, file_path):
+        raise HTTPException(status_code=404, detail="File is not quarantined")
+    return {"ok": True}
@@ -1,5 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from ..core.models import ProcessRequest
+from ..core.preflight import preflight
 from ..core.jobs.queue import job_queue
 from ..core.jobs.store import job_store
 from ..core.jobs.events import event_manager
@@ -8,6 +9,10 @@ router = APIRouter()
 
 @router.post("/process")
 async def start_process(request: ProcessRequest):
+    # Reject jobs the worker would fail on, before they are queued
+    issues = await preflight(request)
+    if issues:
+        raise HTTPException(status_code=422, detail=[issue.model_dump() for issue in issues])
     job_id = await job_queue.enqueue(request)
     await event_manager.emit_global(job_store.list_active_jobs())
     return {"jobId": job_id}
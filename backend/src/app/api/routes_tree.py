@@ -1,60 +1,28 @@
-from fastapi import APIRouter
-from pathlib import Path
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
-from ..core.config import settings
 from ..core.models import FileNode
+from ..core.security_paths import get_input_path
+from ..core.tree_index import tree_index
+import asyncio
 
 router = APIRouter()
 
-def build_tree(path: Path, root: Path) -> Optional[FileNode]:
-    """
-    Recursively builds a tree of FileNode objects containing only directories.
-    Only includes directories that contain video files or subdirectories with video files.
-    """
-    children = []
-    try:
-        # Get sub-directories and recursively build their trees
-        subdirs = sorted(
-            [item for item in path.iterdir() if item.is_dir() and not item.name.startswith(".")],
-            key=lambda x: x.name.lower()
-        )
-        for subdir in subdirs:
-            child_node = build_tree(subdir, root)
-            if child_node:
-                children.append(child_node)
-    except (PermissionError, FileNotFoundError):
-        pass
-
-    # Check if this directory itself contains any video files
-    has_videos = False
-    try:
-        has_videos = any(
-            item.is_file() and item.suffix.lower() in settings.VIDEO_EXTENSIONS 
-            for item in path.iterdir()
-        )
-    except (PermissionError, FileNotFoundError):
-        pass
-
-    # If this directory has no video files and no non-empty subdirectories, skip it
-    if not has_videos and not children:
-        return None
-
-    name = "/" if path == root else path.name
-    
-    # Standardize path to use forward slashes and ensure it starts with /
-    rel_path = "/" + str(path.relative_to(root)).replace("\\", "/")
-    if rel_path == "/.":
-        rel_path = "/"
-        
-    return FileNode(name=name, rel_path=rel_path, children=children)
-
 @router.get("/tree", response_model=FileNode)
-async def get_tree():
+async def get_tree(
+    path: str = Query("/", description="Relative path of the folder to return"),
+    depth: Optional[int] = Query(None, ge=0, description="Levels of sub-folders to include (omit for all)"),
+):
     """
-    Returns the directory tree (folders only) for the input root.
+    Returns the directory tree (folders only) below `path`.
+    Served from the in-memory tree index; the filesystem is only touched on first use.
+    Nodes cut off by `depth` have `children: null` and `has_children` set when they can be expanded.
     """
-    tree = build_tree(settings.INPUT_ROOT, settings.INPUT_ROOT)
-    if tree is None:
-        return FileNode(name="/", rel_path="/", children=[])
-    return tree
+    # Rejects traversal outside the input root
+    get_input_path(path)
 
+    if not tree_index.loaded:
+        await asyncio.to_thread(tree_index.ensure_loaded)
+    node = await asyncio.to_thread(tree_index.get_subtree, path, depth)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Folder not found")
+    return node
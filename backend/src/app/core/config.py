@@ -6,7 +6,51 @@ class Settings:
     OUTPUT_ROOT: Path = Path(os.getenv("OUTPUT_ROOT", "/media/output"))
     
     VIDEO_EXTENSIONS = {".mkv", ".mp4", ".avi", ".mov", ".ts", ".m4v"}
-    
+    # What the worker remuxes of a job that names only a folder (worker/src/worker/processor.py)
+    WORKER_FOLDER_EXTENSIONS = {".mkv", ".mp4", ".avi", ".mov"}
+
+    # How often (seconds) the tree index revalidates directory mtimes
+    TREE_INDEX_REFRESH_SECONDS: float = float(os.getenv("TREE_INDEX_REFRESH_SECONDS", "60"))
+
+    # Library change detection: 'auto', 'inotify', 'poll' or 'off'.
+    # 'auto' uses inotify on local Linux filesystems and mtime polling on network mounts.
+    LIBRARY_WATCHER: str = os.getenv("LIBRARY_WATCHER", "auto")
+
+    # Number of directory listings kept in memory for /api/list
+    DIR_CACHE_MAX_DIRS: int = int(os.getenv("DIR_CACHE_MAX_DIRS", "2048"))
+
+    # Parallel directory listings while scanning the library (higher helps on network mounts)
+    TREE_SCAN_WORKERS: int = int(os.getenv("TREE_SCAN_WORKERS", "8"))
+
+    # Number of files whose ffprobe results are kept in JOB_DATA_ROOT/probe_cache.db
+    PROBE_CACHE_MAX_ENTRIES: int = int(os.getenv("PROBE_CACHE_MAX_ENTRIES", "100000"))
+
+    # ffprobe processes running at once across all requests, and per storage device (0 = no per-device limit)
+    PROBE_CONCURRENCY: int = int(os.getenv("PROBE_CONCURRENCY", "4"))
+    PROBE_CONCURRENCY_PER_DEVICE: int = int(os.getenv("PROBE_CONCURRENCY_PER_DEVICE", "0"))
+
+    # ffprobe profile: 'fast' reads only stream headers (capped by the limits below), 'full' runs
+    # ffprobe's default analysis. MPEG-TS files and failed fast probes always use 'full'.
+    PROBE_PROFILE: str = os.getenv("PROBE_PROFILE", "fast")
+    PROBE_FAST_PROBESIZE: int = int(os.getenv("PROBE_FAST_PROBESIZE", str(1024 * 1024)))  # bytes
+    PROBE_FAST_ANALYZEDURATION: int = int(os.getenv("PROBE_FAST_ANALYZEDURATION", "1000000"))  # microseconds
+
+    # Read MKV/MP4 stream headers in-process instead of spawning ffprobe; files the parser
+    # cannot enumerate exactly like ffprobe still go to ffprobe
+    PROBE_NATIVE_PARSER: bool = os.getenv("PROBE_NATIVE_PARSER", "true").lower() in ("1", "true", "yes")
+
+    # A probe still running after this many seconds (e.g. a hung read on a sleeping disk) is killed; 0 = no limit
+    PROBE_TIMEOUT_SECONDS: float = float(os.getenv("PROBE_TIMEOUT_SECONDS", "30"))
+
+    # Background pre-probe crawler: files probed per second (0 disables it), seconds without
+    # API requests before it starts, and pause between complete passes over the library
+    CRAWLER_FILES_PER_SECOND: float = float(os.getenv("CRAWLER_FILES_PER_SECOND", "2"))
+    CRAWLER_IDLE_SECONDS: float = float(os.getenv("CRAWLER_IDLE_SECONDS", "60"))
+    CRAWLER_RESCAN_SECONDS: float = float(os.getenv("CRAWLER_RESCAN_SECONDS", "3600"))
+
+    # Largest `parallelism` a job may ask for; the worker clamps to its own JOB_PARALLELISM_MAX as well
+    JOB_PARALLELISM_MAX: int = int(os.getenv("JOB_PARALLELISM_MAX", "8"))
+
     # Ensure roots are absolute
     def __init__(self):
         self.INPUT_ROOT = self.INPUT_ROOT.resolve()
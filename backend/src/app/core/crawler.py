@@ -0,0 +1,136 @@
+import asyncio
+import time
+from typing import Callable, List, Optional
+from .config import settings
+from .dir_cache import scan_videos
+from .ffprobe import probe_file
+from .jobs.store import job_store
+from .models import CrawlerStatus
+from .probe_cache import FileIdentity, ProbeCache, probe_cache
+from .tree_index import TreeIndex, tree_index
+
+# How long the "no active jobs" answer is reused; reading status files is not free
+JOBS_CHECK_SECONDS = 5.0
+
+
+class ProbeCrawler:
+    """
+    Fills the probe cache in the background so folders are warm before anyone opens them.
+
+    Walks the folders known to the tree index and probes files that are not
+    cached yet, at most CRAWLER_FILES_PER_SECOND of them. It only runs while
+    the system is idle: no pending or processing jobs, and no API request for
+    CRAWLER_IDLE_SECONDS. After a complete pass it waits CRAWLER_RESCAN_SECONDS
+    before looking for new files again.
+    """
+
+    def __init__(
+        self,
+        index: TreeIndex,
+        probes: ProbeCache,
+        has_active_jobs: Optional[Callable[[], bool]] = None,
+    ):
+        self.index = index
+        self.probes = probes
+        self._has_active_jobs = has_active_jobs or (lambda: bool(job_store.list_active_jobs()))
+        self._last_activity = time.monotonic()
+        self._jobs_checked_at = 0.0
+        self._jobs_active = False
+        self.status = CrawlerStatus(state="disabled" if settings.CRAWLER_FILES_PER_SECOND <= 0 else "waiting")
+
+    def note_activity(self):
+        """Called for every API request; the crawler backs off while users are active."""
+        self._last_activity = time.monotonic()
+
+    def _is_idle(self) -> bool:
+        if time.monotonic() - self._last_activity < settings.CRAWLER_IDLE_SECONDS:
+            return False
+        now = time.monotonic()
+        if now - self._jobs_checked_at >= JOBS_CHECK_SECONDS:
+            try:
+                self._jobs_active = self._has_active_jobs()
+            except Exception as e:
+                print(f"Crawler job check error: {e}")
+                self._jobs_active = True
+            self._jobs_checked_at = now
+        return not self._jobs_active
+
+    async def _wait_until_idle(self):
+        while not self._is_idle():
+            self.status.state = "paused"
+            await asyncio.sleep(1)
+        self.status.state = "crawling"
+
+    async def run(self):
+        if settings.CRAWLER_FILES_PER_SECOND <= 0:
+            return
+        while True:
+            try:
+                await self.crawl()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Crawler error: {e}")
+            self.status.state = "waiting"
+            await asyncio.sleep(settings.CRAWLER_RESCAN_SECONDS)
+
+    async def crawl(self):
+        """Runs one pass over the library."""
+        if not self.index.loaded:
+            await asyncio.to_thread(self.index.ensure_loaded)
+        directories: List[str] = sorted(await asyncio.to_thread(self.index.directories, "/"))
+        root = settings.INPUT_ROOT
+        status = self.status
+        status.directories_total = len(directories)
+        status.directories_done = 0
+        status.files_seen = 0
+        status.files_probed = 0
+        status.files_cached = 0
+        status.pass_started_at = time.time()
+        min_interval = 1.0 / settings.CRAWLER_FILES_PER_SECOND
+        last_probe = 0.0
+
+        for rel_path in directories:
+            await self._wait_until_idle()
+            status.current_dir = rel_path
+            dir_path = root / rel_path.lstrip("/") if rel_path != "/" else root
+            # Listed directly: a pass over the whole library would evict the folders users
+            # have open from the directory cache
+            try:
+                items = await asyncio.to_thread(scan_videos, dir_path)
+            except OSError:
+                items = None
+            if items is not None:
+                # Cached probes of files deleted or changed since
+                await asyncio.to_thread(
+                    self.probes.prune_folder,
+                    dir_path,
+                    {f.name: FileIdentity(f.size, f.mtime_ns, f.inode) for f in items},
+                )
+            for item in items or []:
+                status.files_seen += 1
+                file_path = dir_path / item.name
+                identity = FileIdentity(item.size, item.mtime_ns, item.inode)
+                if await asyncio.to_thread(self.probes.contains, file_path, identity):
+                    status.files_cached += 1
+                    continue
+                await self._wait_until_idle()
+                # Spread probes out to stay within the IO budget
+                delay = last_probe + min_interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                last_probe = time.monotonic()
+                await probe_file(file_path, identity)
+                status.files_probed += 1
+            status.directories_done += 1
+
+        # Cached probes of folders deleted since (their files are not listed by anyone any more)
+        directories = await asyncio.to_thread(self.index.directories, "/")
+        folders = {str(root / rel_path.lstrip("/")) if rel_path != "/" else str(root) for rel_path in directories}
+        await asyncio.to_thread(self.probes.prune_folders, root, folders)
+
+        status.current_dir = None
+        status.pass_finished_at = time.time()
+
+
+probe_crawler = ProbeCrawler(tree_index, probe_cache)
@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional, Set, Tuple
+from .config import settings
+
+
+class CachedFile:
+    """A video file as seen by the last listing of its directory."""
+    __slots__ = ("name", "size", "mtime_ns", "inode")
+
+    def __init__(self, name: str, size: int, mtime_ns: int, inode: int):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+
+
+def scan_videos(dir_path: Path) -> List[CachedFile]:
+    """Lists the video files in dir_path sorted by name, without using or filling a cache."""
+    files = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if os.path.splitext(entry.name)[1].lower() not in settings.VIDEO_EXTENSIONS:
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            files.append(CachedFile(entry.name, st.st_size, st.st_mtime_ns, st.st_ino))
+    files.sort(key=lambda f: f.name)
+    return files
+
+
+class DirectoryCache:
+    """
+    LRU cache of video file listings per directory.
+
+    By default a cached listing is revalidated with a single stat of the
+    directory. When the library watcher receives reliable change notifications
+    it sets `trusted`, and listings are then served without touching the
+    filesystem until the watcher invalidates them. Directories the watcher
+    could not watch are listed in `unwatched` and still revalidated by mtime.
+    """
+
+    def __init__(self, max_dirs: Optional[int] = None):
+        self.max_dirs = max_dirs or settings.DIR_CACHE_MAX_DIRS
+        self.trusted = False
+        self.unwatched: Set[Path] = set()
+        self._listeners: List[Callable[[Path, List[CachedFile]], None]] = []
+        self._entries: "OrderedDict[Path, Tuple[int, List[CachedFile]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[Path, List[CachedFile]], None]):
+        """callback(dir_path, files) runs after every fresh scan of a directory."""
+        self._listeners.append(callback)
+
+    def _notify(self, dir_path: Path, files: List[CachedFile]):
+        for callback in self._listeners:
+            try:
+                callback(dir_path, files)
+            except Exception as e:
+                print(f"Directory cache listener error: {e}")
+
+    def list_videos(self, dir_path: Path) -> List[CachedFile]:
+        """Returns the video files in dir_path sorted by name."""
+        with self._lock:
+            cached = self._entries.get(dir_path)
+            if cached is not None and self.trusted and dir_path not in self.unwatched:
+                self._entries.move_to_end(dir_path)
+                return cached[1]
+
+        mtime_ns = dir_path.stat().st_mtime_ns
+        if cached is not None and cached[0] == mtime_ns:
+            with self._lock:
+                if dir_path in self._entries:
+                    self._entries.move_to_end(dir_path)
+            return cached[1]
+
+        files = scan_videos(dir_path)
+        with self._lock:
+            self._entries[dir_path] = (mtime_ns, files)
+            self._entries.move_to_end(dir_path)
+            while len(self._entries) > self.max_dirs:
+                self._entries.popitem(last=False)
+        self._notify(dir_path, files)
+        return files
+
+    def set_watched(self, dir_path: Path, watched: bool):
+        with self._lock:
+            if watched:
+                self.unwatched.discard(dir_path)
+            else:
+                self.unwatched.add(dir_path)
+
+    def invalidate(self, dir_path: Path):
+        with self._lock:
+            self._entries.pop(dir_path, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dir_cache = DirectoryCache()
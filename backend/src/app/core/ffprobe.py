@@ -1,42 +1,195 @@
 import json
-import subprocess
 import asyncio
+import subprocess
+import threading
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from .config import settings
+from .media_headers import parse_streams
 from .models import StreamInfo
+from .probe_cache import FileIdentity, probe_cache
+from .probe_pool import probe_pool
+from .singleflight import SingleFlight
+
+# Concurrent probes of the same unchanged file share one ffprobe run
+probe_flights = SingleFlight()
+
+class ProbeFailed(Exception):
+    """ffprobe could not read the file; the message is the reason recorded in the quarantine."""
+
+class ProbeError(Exception):
+    """The probe could not run (ffprobe missing, timed out); says nothing about the file, so it is not quarantined."""
 
-async def probe_file(file_path: Path) -> Dict[str, List[StreamInfo]]:
+
+# Containers without a global header: streams are only found by reading packets,
+# so a capped probe could miss some of them
+HEADERLESS_EXTENSIONS = {".ts"}
+
+def build_ffprobe_command(file_path: Path, profile: str) -> List[str]:
     """
-    Runs ffprobe on the file and returns a dict with 'audio' and 'subtitle' lists of StreamInfo.
+    'fast' asks only for the fields we use and caps how much of the file ffprobe
+    reads; stream index, type and tags come from the container header.
+    'full' is ffprobe's default analysis with every stream field.
     """
-    log_file = Path("ffprobe_debug.log")
-    
-    cmd = [
+    if profile == "fast":
+        return [
+            "ffprobe",
+            "-v", "error",
+            "-probesize", str(settings.PROBE_FAST_PROBESIZE),
+            "-analyzeduration", str(settings.PROBE_FAST_ANALYZEDURATION),
+            "-show_entries", "stream=index,codec_type:stream_tags=language,title",
+            "-print_format", "json",
+            str(file_path)
+        ]
+    return [
         "ffprobe",
         "-print_format", "json",
         "-show_streams",
         str(file_path)
     ]
 
+def choose_profile(file_path: Path) -> str:
+    if settings.PROBE_PROFILE == "fast" and file_path.suffix.lower() not in HEADERLESS_EXTENSIONS:
+        return "fast"
+    return "full"
+
+async def probe_file(
+    file_path: Path, identity: Optional[FileIdentity] = None, raise_errors: bool = False
+) -> Dict[str, List[StreamInfo]]:
+    """
+    Returns a dict with 'audio' and 'subtitle' lists of StreamInfo for the file.
+    Results are served from the persistent probe cache while the file is unchanged;
+    pass `identity` when the caller already has the file's stat data. Files that
+    failed to probe are quarantined and return empty lists until they change.
+    When the probe could not run at all, empty lists are returned without caching
+    anything, or ProbeError is raised with `raise_errors`.
+    """
+    if identity is None:
+        identity = await asyncio.to_thread(FileIdentity.of, file_path)
+    try:
+        if identity is not None:
+            cached = await asyncio.to_thread(probe_cache.get, file_path, identity)
+            if cached is not None:
+                return cached
+            result = await probe_flights.do((str(file_path), identity), lambda: _probe_and_cache(file_path, identity))
+        else:
+            try:
+                result = await _probe(file_path)
+            except ProbeFailed as e:
+                print(f"Probe error: {file_path}: {e}")
+                result = None
+    except ProbeError as e:
+        print(f"Probe error: {file_path}: {e}")
+        if raise_errors:
+            raise
+        result = None
+    if result is None:
+        return {"audio": [], "subtitle": []}
+    return result
+
+async def _probe_and_cache(file_path: Path, identity: FileIdentity) -> Optional[Dict[str, List[StreamInfo]]]:
+    if await asyncio.to_thread(probe_cache.is_quarantined, file_path, identity):
+        return None
     try:
-        # Run ffprobe in a thread to avoid event loop issues on Windows
-        def run_ffprobe():
-            return subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding="utf-8"
-            )
+        result = await _probe(file_path)
+    except ProbeFailed as e:
+        print(f"Probe error: {file_path}: {e}")
+        await asyncio.to_thread(probe_cache.quarantine, file_path, identity, str(e))
+        return None
+    await asyncio.to_thread(probe_cache.put, file_path, identity, result)
+    return result
 
-        result = await asyncio.to_thread(run_ffprobe)
+async def _probe(file_path: Path) -> Dict[str, List[StreamInfo]]:
+    """Reads MKV/MP4 headers directly when possible, otherwise runs ffprobe. Raises ProbeFailed or ProbeError."""
+    if settings.PROBE_NATIVE_PARSER:
+        try:
+            result = await probe_pool.run(file_path, lambda: parse_streams(file_path), _timeout())
+        except asyncio.TimeoutError:
+            raise ProbeError(f"reading the file headers timed out after {settings.PROBE_TIMEOUT_SECONDS}s")
+        if result is not None:
+            return result
+    return await _run_ffprobe(file_path)
+
+def _timeout() -> Optional[float]:
+    return settings.PROBE_TIMEOUT_SECONDS if settings.PROBE_TIMEOUT_SECONDS > 0 else None
+
+class _FfprobeRun:
+    """
+    One ffprobe process, run on a probe thread with subprocess (asyncio subprocesses
+    need the proactor event loop on Windows, which `uvicorn --reload` does not use).
+    """
 
-        if result.returncode != 0:
-            error_msg = f"ffprobe failed for {file_path} with code {result.returncode}\nStderr: {result.stderr}\n"
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(error_msg)
-            return {"audio": [], "subtitle": []}
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self._process: Optional[subprocess.Popen] = None
+        self._killed = False
+        self._lock = threading.Lock()
 
-        data = json.loads(result.stdout)
+    def run(self, timeout: Optional[float]) -> Tuple[int, str, str]:
+        """Returns (returncode, stdout, stderr); kills ffprobe and raises subprocess.TimeoutExpired after `timeout`."""
+        process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        with self._lock:
+            self._process = process
+            killed = self._killed
+        if killed:
+            process.kill()
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        return process.returncode, stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace")
+
+    def kill(self):
+        with self._lock:
+            self._killed = True
+            process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+async def _exec(file_path: Path, cmd: List[str]) -> Tuple[int, str, str]:
+    """
+    Runs ffprobe in a probe slot and returns (returncode, stdout, stderr). The
+    process is killed when it exceeds PROBE_TIMEOUT_SECONDS (raising
+    subprocess.TimeoutExpired) or when the caller is cancelled.
+    """
+    ffprobe_run = _FfprobeRun(cmd)
+    timeout = _timeout()
+    try:
+        return await probe_pool.run(file_path, lambda: ffprobe_run.run(timeout))
+    except asyncio.CancelledError:
+        ffprobe_run.kill()
+        raise
+
+async def _run_ffprobe(file_path: Path, profile: Optional[str] = None) -> Dict[str, List[StreamInfo]]:
+    """
+    Runs ffprobe on the file. Raises ProbeFailed if ffprobe rejected the file or
+    its output could not be parsed, and ProbeError if ffprobe could not run or
+    timed out. A failed fast probe is retried with the full profile.
+    """
+    profile = profile or choose_profile(file_path)
+    cmd = build_ffprobe_command(file_path, profile)
+
+    try:
+        # Waits for a free slot so large folders do not start hundreds of ffprobe processes
+        returncode, stdout, stderr = await _exec(file_path, cmd)
+
+        if returncode != 0 and profile == "fast":
+            return await _run_ffprobe(file_path, "full")
+
+        if returncode != 0:
+            # The last stderr line is usually the actual error
+            lines = stderr.strip().splitlines()
+            detail = lines[-1] if lines else "no output"
+            raise ProbeFailed(f"ffprobe exited with code {returncode}: {detail}")
+
+        data = json.loads(stdout)
 
         streams = data.get("streams", [])
 
@@ -73,9 +226,17 @@ async def probe_file(file_path: Path) -> Dict[str, List[StreamInfo]]:
 
         return {"audio": audio_streams, "subtitle": subtitle_streams}
 
-    except Exception as e:
-        error_msg = f"Error probing {file_path}: {type(e).__name__}: {str(e)}\n"
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(error_msg)
-        return {"audio": [], "subtitle": []}
+    except ProbeFailed:
+        raise
+
+    except subprocess.TimeoutExpired:
+        # Usually a slow or sleeping disk rather than a broken file
+        raise ProbeError(f"ffprobe timed out after {settings.PROBE_TIMEOUT_SECONDS}s")
+
+    except (OSError, NotImplementedError) as e:
+        # ffprobe is not installed or cannot be started here
+        raise ProbeError(f"could not run ffprobe: {type(e).__name__}: {e}")
+
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ProbeFailed(f"unreadable ffprobe output: {type(e).__name__}: {e}")
 
@@ -1,13 +1,20 @@
+import asyncio
 import json
 import os
+import time
 from pathlib import Path
+from fastapi import HTTPException
+from ..config import settings
 from ..models import ProcessRequest, JobStatus
+from ..security_paths import get_input_path
 from .store import job_store
 import uuid
 
 JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
 
 class JobQueue:
+    _last_sequence = 0
+
     def __init__(self):
         self.pending_dir = JOB_DATA_ROOT / "pending"
 
@@ -32,14 +39,51 @@ class JobQueue:
         # Create job payload for worker
         payload = request.model_dump(mode='json')
         payload["job_id"] = job_id
+        # Scheduling fields, see scheduler.schedule_key
+        payload["sequence"] = self._next_sequence()
+        payload["enqueued_at"] = time.time()
+        payload["estimated_bytes"] = await asyncio.to_thread(_estimate_bytes, request)
         
         # Write to pending file
         self._ensure_dirs()
+        # Written under another name and renamed into place, so the worker never sees half a job
         job_file = self.pending_dir / f"{job_id}.json"
-        with open(job_file, "w", encoding="utf-8") as f:
+        tmp_file = job_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_file, job_file)
             
         return job_id
 
+    def _next_sequence(self) -> int:
+        # Strictly increasing even when two jobs arrive within the clock's resolution
+        self._last_sequence = max(time.time_ns(), self._last_sequence + 1)
+        return self._last_sequence
+
+
+def _estimate_bytes(request: ProcessRequest) -> int:
+    """Total size of the job's input files, the measure the scheduler compares jobs by."""
+    if request.selections:
+        paths = [s.rel_path for s in request.selections]
+    elif request.files:
+        paths = request.files
+    else:
+        # The worker remuxes the video files directly in the folder
+        try:
+            source_dir = get_input_path(request.dir or "")
+            return sum(
+                p.stat().st_size for p in source_dir.iterdir()
+                if p.suffix.lower() in settings.WORKER_FOLDER_EXTENSIONS and p.is_file()
+            )
+        except (HTTPException, OSError):
+            return 0
+    total = 0
+    for rel_path in paths:
+        try:
+            total += get_input_path(rel_path).stat().st_size
+        except (HTTPException, OSError):
+            pass
+    return total
+
 job_queue = JobQueue()
 
@@ -3,12 +3,14 @@ import os
 from pathlib import Path
 from typing import Optional, List
 from ..models import JobStatus
+from worker.scheduler import PendingQueue
 
 JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
 
 class JobStore:
     def __init__(self):
         self.status_dir = JOB_DATA_ROOT / "status"
+        self.pending_queue = PendingQueue(JOB_DATA_ROOT / "pending")
 
     def get_job(self, job_id: str) -> Optional[JobStatus]:
         status_file = self.status_dir / f"{job_id}.json"
@@ -16,7 +18,10 @@ class JobStore:
             try:
                 with open(status_file, "r", encoding="utf-8") as f:
                     data = json.load(f)
-                return JobStatus(**data)
+                job = JobStatus(**data)
+                if job.status == "pending":
+                    job.queue_position = self.pending_queue.positions().get(job_id)
+                return job
             except Exception:
                 return None
         # Fallback to check if it's pending?
@@ -42,6 +47,11 @@ class JobStore:
                         jobs.append(JobStatus(**json.load(fp)))
                 except Exception:
                     pass
+        if any(j.status == "pending" for j in jobs):
+            positions = self.pending_queue.positions()
+            for job in jobs:
+                if job.status == "pending":
+                    job.queue_position = positions.get(job.job_id)
         return jobs
 
     def list_active_jobs(self) -> List[JobStatus]:
@@ -0,0 +1,338 @@
+"""
+In-process stream enumeration for Matroska and MP4 files.
+
+Reads only the Matroska `Tracks` element or the MP4 `moov` box, using seeks
+over everything else, and returns the same audio/subtitle StreamInfo lists as
+`probe_file`. Stream ids follow ffprobe's numbering (track order in the file).
+
+Anything unusual returns None so the caller falls back to ffprobe: tracks that
+ffmpeg would drop or renumber, encrypted tracks, chapter tracks, language
+fields ffmpeg maps differently, and malformed or truncated files.
+"""
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from .models import StreamInfo
+
+MKV_EXTENSIONS = {".mkv", ".webm"}
+MP4_EXTENSIONS = {".mp4", ".m4v", ".mov"}
+
+# Upper bound for the one element/box we read into memory
+MAX_HEADER_BYTES = 32 * 1024 * 1024
+
+
+class _Unsupported(Exception):
+    """The file is valid but not something we can enumerate exactly like ffprobe."""
+
+
+def parse_streams(file_path: Path) -> Optional[Dict[str, List[StreamInfo]]]:
+    """Returns {'audio': [...], 'subtitle': [...]} or None if ffprobe should be used instead."""
+    suffix = file_path.suffix.lower()
+    try:
+        with open(file_path, "rb") as f:
+            if suffix in MKV_EXTENSIONS:
+                tracks = _mkv_tracks(f)
+            elif suffix in MP4_EXTENSIONS:
+                tracks = _mp4_tracks(f)
+            else:
+                return None
+    except (OSError, _Unsupported, ValueError, struct.error, UnicodeDecodeError):
+        return None
+
+    result: Dict[str, List[StreamInfo]] = {"audio": [], "subtitle": []}
+    for index, (codec_type, language, title) in enumerate(tracks):
+        if codec_type in result:
+            result[codec_type].append(StreamInfo(id=index, language=language, title=title, codec_type=codec_type))
+    return result
+
+
+# --- Matroska ---------------------------------------------------------------
+
+_EBML = 0x1A45DFA3
+_EBML_DOCTYPE = 0x4282
+_SEGMENT = 0x18538067
+_SEEK_HEAD = 0x114D9B74
+_SEEK = 0x4DBB
+_SEEK_ID = 0x53AB
+_SEEK_POSITION = 0x53AC
+_TRACKS = 0x1654AE6B
+_CLUSTER = 0x1F43B675
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_NAME = 0x536E
+_LANGUAGE = 0x22B59C
+_LANGUAGE_BCP47 = 0x22B59D
+_CONTENT_ENCODINGS = 0x6D80
+_CONTENT_ENCODING = 0x6240
+_CONTENT_COMPRESSION = 0x5034
+_CONTENT_COMP_ALGO = 0x4254
+_CONTENT_ENCRYPTION = 0x5035
+
+# Track types ffmpeg turns into a stream; anything else is skipped and shifts the numbering
+_MKV_TRACK_TYPES = {1: "video", 2: "audio", 0x11: "subtitle", 0x21: "data"}
+# zlib and header stripping; other compressions may not be built into ffmpeg
+_MKV_COMPRESSIONS = {0, 3}
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[int, int, bool]:
+    """Returns (value, new position, is 'unknown size')."""
+    first = data[pos]
+    if first == 0:
+        raise ValueError("invalid EBML varint")
+    length = 1
+    mask = 0x80
+    while not first & mask:
+        mask >>= 1
+        length += 1
+    if pos + length > len(data):
+        raise ValueError("truncated EBML varint")
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+    return value, pos + length, all_ones
+
+
+def _read_element_header(f: BinaryIO) -> Optional[Tuple[int, Optional[int], int]]:
+    """Reads an element header at the current position: (id, size or None if unknown, header length)."""
+    head = f.read(12)
+    if len(head) < 2:
+        return None
+    element_id, pos, _ = _read_vint(head, 0, keep_marker=True)
+    size, pos, unknown = _read_vint(head, pos, keep_marker=False)
+    f.seek(pos - len(head), 1)
+    return element_id, None if unknown else size, pos
+
+
+def _iter_elements(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    pos = 0
+    while pos < len(data):
+        element_id, pos, _ = _read_vint(data, pos, keep_marker=True)
+        size, pos, unknown = _read_vint(data, pos, keep_marker=False)
+        if unknown or pos + size > len(data):
+            raise ValueError("element exceeds its parent")
+        yield element_id, data[pos:pos + size]
+        pos += size
+
+
+def _read_payload(f: BinaryIO, size: int) -> bytes:
+    if size > MAX_HEADER_BYTES:
+        raise _Unsupported("element too large")
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated element")
+    return data
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big") if data else 0
+
+
+def _string(data: bytes) -> str:
+    return data.split(b"\0", 1)[0].decode("utf-8")
+
+
+def _mkv_tracks(f: BinaryIO) -> List[Tuple[str, str, Optional[str]]]:
+    header = _read_element_header(f)
+    if header is None or header[0] != _EBML or header[1] is None:
+        raise _Unsupported("not an EBML file")
+    doc_type = None
+    for element_id, value in _iter_elements(_read_payload(f, header[1])):
+        if element_id == _EBML_DOCTYPE:
+            doc_type = _string(value)
+    if doc_type not in ("matroska", "webm"):
+        raise _Unsupported(f"unknown DocType {doc_type}")
+
+    header = _read_element_header(f)
+    if header is None or header[0] != _SEGMENT:
+        raise _Unsupported("no Segment")
+    segment_start = f.tell()
+    segment_end = segment_start + header[1] if header[1] is not None else None
+
+    seek_positions: Dict[int, int] = {}
+    while segment_end is None or f.tell() < segment_end:
+        element_start = f.tell()
+        header = _read_element_header(f)
+        if header is None:
+            break
+        element_id, size, _ = header
+        if element_id == _TRACKS and size is not None:
+            return _mkv_parse_tracks(_read_payload(f, size))
+        if element_id == _SEEK_HEAD and size is not None:
+            for seek_id, seek in _iter_elements(_read_payload(f, size)):
+                if seek_id != _SEEK:
+                    continue
+                fields = dict(_iter_elements(seek))
+                if _SEEK_ID in fields and _SEEK_POSITION in fields:
+                    seek_positions[_uint(fields[_SEEK_ID])] = _uint(fields[_SEEK_POSITION])
+            continue
+        if element_id == _CLUSTER or size is None:
+            # Media data starts; Tracks must be found through the SeekHead
+            break
+        f.seek(element_start + header[2] + size)
+
+    if _TRACKS not in seek_positions:
+        raise _Unsupported("Tracks not found before the first Cluster")
+    f.seek(segment_start + seek_positions[_TRACKS])
+    header = _read_element_header(f)
+    if header is None or header[0] != _TRACKS or header[1] is None:
+        raise ValueError("SeekHead points to something else than Tracks")
+    return _mkv_parse_tracks(_read_payload(f, header[1]))
+
+
+def _mkv_parse_tracks(data: bytes) -> List[Tuple[str, str, Optional[str]]]:
+    tracks = []
+    for element_id, entry in _iter_elements(data):
+        if element_id != _TRACK_ENTRY:
+            continue
+        fields = {}
+        for field_id, value in _iter_elements(entry):
+            fields.setdefault(field_id, value)
+        track_type = _uint(fields.get(_TRACK_TYPE, b""))
+        if track_type not in _MKV_TRACK_TYPES or not fields.get(_CODEC_ID):
+            raise _Unsupported("track ffmpeg would skip")
+        if _CONTENT_ENCODINGS in fields:
+            _mkv_check_encodings(fields[_CONTENT_ENCODINGS])
+        if _LANGUAGE in fields:
+            language = _string(fields[_LANGUAGE])
+        elif _LANGUAGE_BCP47 in fields:
+            raise _Unsupported("BCP47-only language")
+        else:
+            language = "eng"  # Matroska default
+        if language == "und":
+            # ffmpeg does not set a language tag for 'und'
+            language = "unknown"
+        title = _string(fields[_NAME]) if _NAME in fields else None
+        tracks.append((_MKV_TRACK_TYPES[track_type], language, title))
+    return tracks
+
+
+def _mkv_check_encodings(data: bytes):
+    for element_id, encoding in _iter_elements(data):
+        if element_id != _CONTENT_ENCODING:
+            continue
+        for field_id, value in _iter_elements(encoding):
+            if field_id == _CONTENT_ENCRYPTION:
+                raise _Unsupported("encrypted track")
+            if field_id == _CONTENT_COMPRESSION:
+                algo = dict(_iter_elements(value)).get(_CONTENT_COMP_ALGO, b"")
+                if _uint(algo) not in _MKV_COMPRESSIONS:
+                    raise _Unsupported("unsupported compression")
+
+
+# --- MP4 --------------------------------------------------------------------
+
+_MP4_HANDLERS = {
+    b"vide": "video",
+    b"soun": "audio",
+    b"sbtl": "subtitle",
+    b"subt": "subtitle",
+    b"text": "subtitle",
+    b"subp": "subtitle",
+    b"clcp": "subtitle",
+}
+# Boxes that may appear before moov at the top level and are simply skipped
+_MP4_TOP_LEVEL = {b"ftyp", b"free", b"skip", b"mdat", b"wide", b"pdin", b"uuid", b"styp", b"sidx", b"moof", b"mfra", b"meta"}
+
+
+def _mp4_box_header(f: BinaryIO) -> Optional[Tuple[bytes, int, int]]:
+    """Reads a box header at the current position: (type, total size or 0 = to end of file, header length)."""
+    head = f.read(8)
+    if len(head) < 8:
+        return None
+    size, box_type = struct.unpack(">I4s", head)
+    header_len = 8
+    if size == 1:
+        size = struct.unpack(">Q", f.read(8))[0]
+        header_len = 16
+    elif size != 0 and size < 8:
+        raise ValueError("invalid box size")
+    return box_type, size, header_len
+
+
+def _iter_boxes(data: bytes) -> Iterator[Tuple[bytes, bytes]]:
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header_len = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header_len = 16
+        elif size == 0:
+            size = len(data) - pos
+        if size < header_len or pos + size > len(data):
+            raise ValueError("box exceeds its parent")
+        yield box_type, data[pos + header_len:pos + size]
+        pos += size
+
+
+def _mp4_tracks(f: BinaryIO) -> List[Tuple[str, str, Optional[str]]]:
+    first = True
+    while True:
+        box_start = f.tell()
+        header = _mp4_box_header(f)
+        if header is None:
+            raise _Unsupported("no moov box")
+        box_type, size, header_len = header
+        if first and box_type not in (b"ftyp", b"moov", b"free", b"skip", b"wide", b"mdat", b"pdin", b"styp"):
+            raise _Unsupported("not an MP4 file")
+        first = False
+        if box_type == b"moov":
+            if size == 0:
+                raise _Unsupported("moov without size")
+            return _mp4_parse_moov(_read_payload(f, size - header_len))
+        if box_type not in _MP4_TOP_LEVEL or size == 0:
+            raise _Unsupported(f"unexpected top-level box {box_type!r}")
+        f.seek(box_start + size)
+
+
+def _mp4_parse_moov(data: bytes) -> List[Tuple[str, str, Optional[str]]]:
+    tracks = []
+    for box_type, trak in _iter_boxes(data):
+        if box_type == b"cmov":
+            raise _Unsupported("compressed moov")
+        if box_type == b"trak":
+            tracks.append(_mp4_parse_trak(trak))
+    return tracks
+
+
+def _mp4_parse_trak(data: bytes) -> Tuple[str, str, Optional[str]]:
+    boxes = dict(_iter_boxes(data))
+    if b"tref" in boxes and b"chap" in dict(_iter_boxes(boxes[b"tref"])):
+        raise _Unsupported("chapter track reference")
+    mdia = dict(_iter_boxes(boxes.get(b"mdia", b"")))
+    if b"hdlr" not in mdia or b"mdhd" not in mdia:
+        raise ValueError("trak without hdlr/mdhd")
+    handler = mdia[b"hdlr"][8:12]
+    codec_type = _MP4_HANDLERS.get(handler, "data")
+
+    mdhd = mdia[b"mdhd"]
+    # version 1 uses 64-bit times: 4 (version/flags) + 8 + 8 + 4 + 8, else 4 + 4 + 4 + 4 + 4
+    lang_offset = 32 if mdhd[0] == 1 else 20
+    language = _mp4_language(struct.unpack_from(">H", mdhd, lang_offset)[0])
+    if b"elng" in mdia:
+        language = _string(mdia[b"elng"][4:])
+
+    title = None
+    if b"udta" in boxes:
+        for box_type, value in _iter_boxes(boxes[b"udta"]):
+            if box_type == b"name":
+                title = _string(value)
+            elif box_type == b"\xa9nam":
+                length = struct.unpack_from(">H", value, 0)[0]
+                title = value[4:4 + length].decode("utf-8")
+            else:
+                raise _Unsupported(f"track metadata {box_type!r}")
+    return codec_type, language, title
+
+
+def _mp4_language(code: int) -> str:
+    if code == 0x7FFF or (code < 0x400 and code != 0):
+        # Unset or old Macintosh language code; leave the mapping to ffprobe
+        raise _Unsupported("Macintosh language code")
+    if code == 0:
+        return "eng"  # Macintosh 'English'
+    chars = "".join(chr(((code >> shift) & 0x1F) + 0x60) for shift in (10, 5, 0))
+    return "unknown" if not chars.isalpha() else chars
@@ -1,10 +1,13 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
+from .config import settings
 
 class FileNode(BaseModel):
     name: str
     rel_path: str
     children: Optional[List['FileNode']] = None
+    # True if the folder has visible sub-folders, even when `children` was not loaded
+    has_children: bool = False
 
 FileNode.model_rebuild()
 
@@ -24,6 +27,10 @@ class DirectoryContent(BaseModel):
     dir: str
     files: List[VideoFile]
     languages: List[str]
+    # Pagination: number of files in the directory, and where the next page starts (None on the last page)
+    total: int = 0
+    offset: int = 0
+    next_offset: Optional[int] = None
 
 class FileSelection(BaseModel):
     rel_path: str
@@ -39,11 +46,129 @@ class ProcessRequest(BaseModel):
     subtitle_languages: List[str]
     # Specific per-file selections
     selections: Optional[List[FileSelection]] = None
+    # Files remuxed at the same time; the worker's JOB_PARALLELISM when not set
+    parallelism: Optional[int] = Field(None, ge=1, le=settings.JOB_PARALLELISM_MAX)
+    # Jobs with a higher priority run first
+    priority: int = Field(0, ge=-100, le=100)
+
+class ValidationIssue(BaseModel):
+    """One problem found by the preflight check of a ProcessRequest (same shape as FastAPI's 422 items)."""
+    loc: List[Union[str, int]] # e.g. ["body", "selections", 3, "audio_stream_ids"]
+    msg: str
+    type: str
+
+class PlanRequest(BaseModel):
+    dir: str
+    recursive: bool = True
+    output_dir: str
+    # Languages to KEEP, as in ProcessRequest
+    audio_languages: List[str]
+    subtitle_languages: List[str]
+    # Enqueue the resulting job as soon as planning finishes
+    enqueue: bool = False
+
+class PlannedFile(BaseModel):
+    selection: FileSelection
+    audio_dropped: int
+    subtitles_dropped: int
+    # Heuristic: AUDIO_STREAM_SHARE (SUBTITLE_STREAM_SHARE) of the file size per dropped stream
+    estimated_bytes_saved: int
+
+class PlanCollision(BaseModel):
+    rel_path: str # changed file left out of the job
+    collides_with: str # file kept in the job that has the same output name
+
+class PlanSummary(BaseModel):
+    files: int # video files under the folder
+    files_changed: int # files with at least one stream to drop
+    files_without_streams: int # no audio or subtitle streams, or could not be probed
+    files_colliding: int = 0 # changed files left out of the job, see PlanCollision
+    streams_dropped: int
+    estimated_bytes_saved: int # heuristic, sum over the changed files as in PlannedFile
+    request: ProcessRequest # job for the changed files; can be POSTed to /api/process as is
+    job_id: Optional[str] = None # set when the plan was enqueued
+    errors: List[ValidationIssue] = [] # why the plan was not enqueued, if it failed the preflight check
+
+class ProbeStats(BaseModel):
+    max_concurrency: int
+    max_per_device: Optional[int] = None
+    active: int
+    queued: int
+    completed: int
+    max_queued: int
+    avg_wait_ms: float
+    max_wait_ms: float
+    # Probe requests that joined an identical probe already in flight
+    coalesced: int = 0
+
+class LanguageCount(BaseModel):
+    files: int # files with at least one stream in the language
+    audio: int # files with an audio stream in the language
+    subtitle: int # files with a subtitle stream in the language
+
+class LanguageIndex(BaseModel):
+    dir: str
+    recursive: bool
+    files: int # probed files covered by the counts
+    languages: Dict[str, LanguageCount]
+    # Per-folder rollup: folder rel_path -> language -> files
+    directories: Dict[str, Dict[str, int]]
+
+class StreamQuery(BaseModel):
+    # Has an audio/subtitle stream in each of these languages
+    audio_languages: List[str] = []
+    subtitle_languages: List[str] = []
+    # Has no audio/subtitle stream in any of these languages
+    missing_audio_languages: List[str] = []
+    missing_subtitle_languages: List[str] = []
+    # Has at least one audio/subtitle stream, all in these languages
+    only_audio_languages: List[str] = []
+    only_subtitle_languages: List[str] = []
+    # Case-insensitive substring of any stream title
+    title: Optional[str] = None
+    min_audio: Optional[int] = None
+    max_audio: Optional[int] = None
+    min_subtitles: Optional[int] = None
+    max_subtitles: Optional[int] = None
+
+class QueryResult(BaseModel):
+    files: List[VideoFile]
+    total: int
+    offset: int = 0
+    next_offset: Optional[int] = None
+
+class SearchResult(BaseModel):
+    query: str
+    # Number of matching files; `results` holds the best `limit` of them, best first
+    total: int
+    results: List[str]
+
+class QuarantinedFile(BaseModel):
+    path: str # relative to INPUT_ROOT in API responses
+    size: int
+    mtime_ns: int
+    reason: str
+    failed_at: float
+
+class CrawlerStatus(BaseModel):
+    state: str # 'disabled', 'waiting', 'paused' or 'crawling'
+    directories_total: int = 0
+    directories_done: int = 0
+    files_seen: int = 0
+    files_probed: int = 0
+    files_cached: int = 0
+    current_dir: Optional[str] = None
+    pass_started_at: Optional[float] = None
+    pass_finished_at: Optional[float] = None
 
 class JobStatus(BaseModel):
     job_id: str
     status: str # 'pending', 'processing', 'completed', 'failed'
     overall_percent: float
     current_file: Optional[str] = None
+    # All files being remuxed right now (several for parallel jobs); current_file is the first
+    current_files: List[str] = []
     dir: str = ""
     first_file: Optional[str] = None
+    # 1-based place among pending jobs in the order workers take them
+    queue_position: Optional[int] = None
@@ -0,0 +1,262 @@
+import os
+from bisect import bisect_right
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from .config import settings
+from .tree_index import TreeIndex, tree_index
+
+GRAM = 3
+
+# "The.Matrix.1999" should rank like "The Matrix 1999" for the query "the matrix"
+_SEPARATORS = str.maketrans("._-", "   ")
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def _list_video_names(dir_path: Path) -> Optional[List[str]]:
+    """Names of the video files directly in dir_path, or None if it is gone."""
+    names = []
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if os.path.splitext(entry.name)[1].lower() not in settings.VIDEO_EXTENSIONS:
+                    continue
+                try:
+                    if entry.is_file():
+                        names.append(entry.name)
+                except OSError:
+                    continue
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return None
+    names.sort()
+    return names
+
+
+class _IndexedDir:
+    __slots__ = ("id", "rel_path", "names", "folded_dir", "folded", "blob", "starts", "min_len", "grams")
+
+    def __init__(self, dir_id: int, rel_path: str, names: List[str]):
+        self.id = dir_id
+        self.rel_path = rel_path
+        self.names = names
+        # Everything is matched case-insensitively against these
+        self.folded_dir = ("" if rel_path == "/" else rel_path).casefold() + "/"
+        self.folded = [n.casefold() for n in names]
+        # All names as one string, so a term is found with str.find instead of
+        # a Python-level loop over every file; starts[i] is where name i begins
+        self.blob = "\n".join(self.folded) + "\n"
+        self.starts = [0]
+        for name in self.folded:
+            self.starts.append(self.starts[-1] + len(name) + 1)
+        self.min_len = min(len(n) for n in self.folded)
+        # The directory path once, plus every name with the two characters before it,
+        # so grams spanning the last separator are covered too
+        grams = _trigrams(self.folded_dir)
+        tail = self.folded_dir[-(GRAM - 1):]
+        for name in self.folded:
+            grams |= _trigrams(tail + name)
+        self.grams = grams
+
+    def matching_lines(self, terms: List[str]) -> List[int]:
+        """Indexes of the names containing all terms."""
+        driver = max(terms, key=len)
+        others = [t for t in terms if t is not driver]
+        lines = []
+        pos = self.blob.find(driver)
+        while pos >= 0:
+            line = bisect_right(self.starts, pos) - 1
+            if all(t in self.folded[line] for t in others):
+                lines.append(line)
+            pos = self.blob.find(driver, self.starts[line + 1])
+        return lines
+
+
+class NameIndex:
+    """
+    Trigram index over the names of all video files under INPUT_ROOT.
+
+    Posting lists map each trigram to the directories whose path or file names
+    contain it, which keeps the index small (episodes of a series share almost
+    all of their trigrams) and lets it be updated one directory at a time: the
+    tree index reports every directory it rescans or drops, and those are
+    relisted before the next search. A query intersects the posting lists of
+    its trigrams and only compares the files of the remaining directories.
+    """
+
+    def __init__(self, index: TreeIndex):
+        self.index = index
+        self._dirs: Dict[str, _IndexedDir] = {}
+        self._by_id: Dict[int, _IndexedDir] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._root: Optional[Path] = None
+        self._lock = threading.Lock()
+        # Directories reported by the tree index since the last sync
+        self._stale: Set[str] = set()
+        self._stale_lock = threading.Lock()
+        index.add_listener(self._on_dir_changed)
+
+    @property
+    def built(self) -> bool:
+        return self._root is not None and self._root == settings.INPUT_ROOT
+
+    @property
+    def file_count(self) -> int:
+        return sum(len(d.names) for d in self._dirs.values())
+
+    def _on_dir_changed(self, rel_path: str):
+        # Runs under the tree index lock: just remember the directory
+        with self._stale_lock:
+            self._stale.add(rel_path)
+
+    def _abs_path(self, rel_path: str) -> Path:
+        return settings.INPUT_ROOT / rel_path.lstrip("/") if rel_path != "/" else settings.INPUT_ROOT
+
+    def _remove_dir(self, rel_path: str):
+        old = self._dirs.pop(rel_path, None)
+        if old is None:
+            return
+        del self._by_id[old.id]
+        for gram in old.grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(old.id)
+                if not posting:
+                    del self._postings[gram]
+
+    def _set_dir(self, rel_path: str, names: List[str]):
+        self._remove_dir(rel_path)
+        if not names:
+            return
+        indexed = _IndexedDir(self._next_id, rel_path, names)
+        self._next_id += 1
+        self._dirs[rel_path] = indexed
+        self._by_id[indexed.id] = indexed
+        for gram in indexed.grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                self._postings[gram] = {indexed.id}
+            else:
+                posting.add(indexed.id)
+
+    def _refresh_dir(self, rel_path: str):
+        entry = self.index.entry(rel_path)
+        names = _list_video_names(self._abs_path(rel_path)) if entry is not None and entry.has_videos else None
+        if names:
+            self._set_dir(rel_path, names)
+        else:
+            self._remove_dir(rel_path)
+
+    def build(self):
+        """Indexes every directory known to the tree index from scratch."""
+        self.index.ensure_loaded()
+        with self._stale_lock:
+            self._stale.clear()
+        directories = self.index.directories()
+        with self._lock:
+            self._dirs = {}
+            self._by_id = {}
+            self._postings = {}
+            self._root = settings.INPUT_ROOT
+            for rel_path in directories:
+                self._refresh_dir(rel_path)
+
+    def sync(self):
+        """Relists the directories the tree index reported since the last sync."""
+        if not self.built:
+            self.build()
+            return
+        with self._stale_lock:
+            stale, self._stale = self._stale, set()
+        if not stale:
+            return
+        with self._lock:
+            for rel_path in stale:
+                self._refresh_dir(rel_path)
+
+    def _candidates(self, grams: Set[str]) -> List[_IndexedDir]:
+        if not grams:
+            return list(self._dirs.values())
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            ids &= posting
+            if not ids:
+                return []
+        return [self._by_id[i] for i in ids]
+
+    def search(self, query: str, limit: int = 50) -> Tuple[int, List[str]]:
+        """
+        Returns (number of matches, best `limit` rel_paths) for files whose path
+        contains every whitespace-separated term of the query, ignoring case.
+
+        Files are ranked by how many terms appear in the file name itself, then
+        whether the name contains the query as a phrase, whether it starts with
+        the first term, and finally by shorter path.
+        """
+        terms = query.casefold().split()
+        if not terms:
+            return 0, []
+        self.sync()
+        grams = set()
+        for term in terms:
+            grams |= _trigrams(term)
+        phrase = " ".join(terms)
+
+        n = len(terms)
+        total = 0
+        # (score, dir, line); scores above `cutoff` can no longer make the first `limit`
+        kept = []
+        cutoff = None
+        with self._lock:
+            for indexed in self._candidates(grams):
+                if any("/" in t for t in terms):
+                    lines = [
+                        i for i, name in enumerate(indexed.folded)
+                        if all(t in indexed.folded_dir + name for t in terms)
+                    ]
+                    name_terms = terms
+                else:
+                    name_terms = [t for t in terms if t not in indexed.folded_dir]
+                    lines = indexed.matching_lines(name_terms) if name_terms else range(len(indexed.names))
+                total += len(lines)
+
+                dir_len = len(indexed.folded_dir)
+                if cutoff is not None and dir_len + indexed.min_len > cutoff:
+                    continue
+                for line in lines:
+                    name = indexed.folded[line]
+                    missing = 0 if len(name_terms) == n else sum(1 for t in terms if t not in name)
+                    if missing:
+                        no_phrase = 1
+                    else:
+                        no_phrase = 0 if n == 1 or phrase in name.translate(_SEPARATORS) else 1
+                    tier = missing * 4 + no_phrase * 2 + (0 if name.startswith(terms[0]) else 1)
+                    score = tier << 32 | (dir_len + len(name))
+                    if cutoff is not None and score > cutoff:
+                        continue
+                    kept.append((score, indexed, line))
+                    if len(kept) >= 4 * limit:
+                        kept = self._rank(kept)[:limit]
+                        cutoff = kept[-1][0]
+        best = self._rank(kept)[:limit]
+        return total, [
+            f"{'' if indexed.rel_path == '/' else indexed.rel_path}/{indexed.names[line]}"
+            for _, indexed, line in best
+        ]
+
+    @staticmethod
+    def _rank(kept: list) -> list:
+        return sorted(kept, key=lambda k: (k[0], k[1].folded_dir, k[1].folded[k[2]]))
+
+
+name_index = NameIndex(tree_index)
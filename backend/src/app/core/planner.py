@@ -0,0 +1,37 @@
+from typing import Dict, List, Optional
+from .models import FileSelection, PlannedFile, StreamInfo
+
+# Rough share of a typical file taken by one audio or subtitle stream, used to estimate
+# savings: probes do not report per-stream sizes (a 640 kbit/s AC-3 track next to
+# ~8 Mbit/s of video is about 7%; text subtitles are a few hundred kB at most)
+AUDIO_STREAM_SHARE = 0.07
+SUBTITLE_STREAM_SHARE = 0.001
+# Video is never dropped, so an estimate never exceeds this share of the file
+MAX_SAVED_SHARE = 0.5
+
+
+def plan_file(
+    rel_path: str,
+    size: int,
+    streams: Dict[str, List[StreamInfo]],
+    audio_languages: List[str],
+    subtitle_languages: List[str],
+) -> Optional[PlannedFile]:
+    """
+    Applies the language rules to one file the same way the UI does: streams in a
+    kept language are selected, all others dropped. Returns None if nothing would
+    be dropped, since remuxing the file would not change it.
+    """
+    keep_audio = [s.id for s in streams["audio"] if s.language in audio_languages]
+    keep_subtitles = [s.id for s in streams["subtitle"] if s.language in subtitle_languages]
+    audio_dropped = len(streams["audio"]) - len(keep_audio)
+    subtitles_dropped = len(streams["subtitle"]) - len(keep_subtitles)
+    if not audio_dropped and not subtitles_dropped:
+        return None
+    share = min(MAX_SAVED_SHARE, audio_dropped * AUDIO_STREAM_SHARE + subtitles_dropped * SUBTITLE_STREAM_SHARE)
+    return PlannedFile(
+        selection=FileSelection(rel_path=rel_path, audio_stream_ids=keep_audio, subtitle_stream_ids=keep_subtitles),
+        audio_dropped=audio_dropped,
+        subtitles_dropped=subtitles_dropped,
+        estimated_bytes_saved=int(size * share),
+    )
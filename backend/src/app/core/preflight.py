@@ -0,0 +1,147 @@
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from .config import settings
+from .ffprobe import ProbeError, probe_file
+from .models import FileSelection, ProcessRequest, StreamInfo, ValidationIssue
+from .probe_cache import FileIdentity, probe_cache
+from .security_paths import get_input_path, get_output_path
+
+
+class _Entry:
+    """One input file of a request, as the worker will resolve it."""
+    __slots__ = ("loc", "path_loc", "rel_path", "selection", "path", "identity", "quarantined")
+
+    def __init__(self, loc: List, rel_path: str, selection: Optional[FileSelection]):
+        self.loc = loc
+        # Where path problems are reported: the selection's rel_path, or the files item
+        self.path_loc = loc + ["rel_path"] if selection is not None else loc
+        self.rel_path = rel_path
+        self.selection = selection
+        self.path: Optional[Path] = None
+        self.identity: Optional[FileIdentity] = None
+        self.quarantined = False
+
+
+def _issue(loc: List, msg: str, type: str) -> ValidationIssue:
+    return ValidationIssue(loc=["body", *loc], msg=msg, type=type)
+
+
+def _rel_output(path: Path) -> str:
+    try:
+        return "/" + str(path.relative_to(settings.OUTPUT_ROOT)).replace("\\", "/")
+    except ValueError:
+        return str(path)
+
+
+def _check_files(entries: List[_Entry], output_dir: Optional[Path]) -> List[ValidationIssue]:
+    """Path, existence, quarantine and output checks; fills in path and identity of usable entries."""
+    issues = []
+    outputs: Dict[Path, _Entry] = {}
+    for entry in entries:
+        try:
+            path = get_input_path(entry.rel_path)
+        except HTTPException:
+            issues.append(_issue(entry.path_loc, f"{entry.rel_path}: path escapes the input folder", "path_invalid"))
+            continue
+        if not path.is_file():
+            issues.append(_issue(entry.path_loc, f"{entry.rel_path}: file not found", "file_not_found"))
+            continue
+        entry.path = path
+        entry.identity = FileIdentity.of(path)
+        reason = probe_cache.quarantine_reason(path, entry.identity) if entry.identity else None
+        if reason is not None:
+            entry.quarantined = True
+            issues.append(_issue(entry.path_loc, f"{entry.rel_path}: file could not be probed ({reason})", "probe_failed"))
+
+        if output_dir is None:
+            continue
+        # The worker writes every file into output_dir under its own name
+        output = (output_dir / path.name).resolve()
+        if output == path:
+            issues.append(_issue(entry.path_loc, f"{entry.rel_path}: output would overwrite the input file", "output_is_input"))
+        other = outputs.setdefault(output, entry)
+        if other is entry:
+            continue
+        if other.path == path:
+            issues.append(_issue(entry.path_loc, f"{entry.rel_path}: file is selected more than once", "duplicate_file"))
+        else:
+            issues.append(_issue(
+                entry.path_loc,
+                f"{entry.rel_path}: output {_rel_output(output)} would also be written for {other.rel_path}",
+                "output_collision",
+            ))
+    return issues
+
+
+def _check_streams(entry: _Entry, streams: Dict[str, List[StreamInfo]]) -> List[ValidationIssue]:
+    issues = []
+    by_id = {s.id: s for s in streams["audio"] + streams["subtitle"]}
+    for field, codec_type in (("audio_stream_ids", "audio"), ("subtitle_stream_ids", "subtitle")):
+        for stream_id in getattr(entry.selection, field):
+            stream = by_id.get(stream_id)
+            if stream is None:
+                available = ", ".join(str(s.id) for s in streams[codec_type]) or "none"
+                issues.append(_issue(
+                    [*entry.loc, field],
+                    f"{entry.rel_path}: no stream with id {stream_id} ({codec_type} streams: {available})",
+                    "stream_not_found",
+                ))
+            elif stream.codec_type != codec_type:
+                issues.append(_issue(
+                    [*entry.loc, field],
+                    f"{entry.rel_path}: stream {stream_id} has codec_type {stream.codec_type}, expected {codec_type}",
+                    "stream_type_mismatch",
+                ))
+    return issues
+
+
+async def preflight(request: ProcessRequest) -> List[ValidationIssue]:
+    """
+    Checks a processing request the way the worker will execute it, so a job that
+    would fail (or silently skip files) is rejected before it is queued: input
+    files exist, selected stream ids exist with the right codec_type, and no two
+    files are written to the same output. Stream ids are checked against the probe
+    cache; files that are not cached yet are probed, and skipped if the probe
+    cannot run. Returns every issue found.
+    """
+    issues = []
+    try:
+        output_dir: Optional[Path] = get_output_path(request.output_dir)
+    except HTTPException:
+        output_dir = None
+        issues.append(_issue(["output_dir"], f"{request.output_dir}: path escapes the output folder", "path_invalid"))
+
+    if request.selections:
+        entries = [_Entry(["selections", i], s.rel_path, s) for i, s in enumerate(request.selections)]
+    elif request.files:
+        entries = [_Entry(["files", i], rel_path, None) for i, rel_path in enumerate(request.files)]
+    else:
+        # The worker lists the folder itself
+        try:
+            dir_ok = await asyncio.to_thread(get_input_path(request.dir or "").is_dir)
+        except HTTPException:
+            dir_ok = False
+        if not request.dir or not dir_ok:
+            issues.append(_issue(["dir"], f"{request.dir or ''}: folder not found", "not_a_directory"))
+        return issues
+
+    issues += await asyncio.to_thread(_check_files, entries, output_dir)
+
+    to_check = [
+        e for e in entries
+        if e.path is not None and not e.quarantined and e.selection is not None
+        and (e.selection.audio_stream_ids or e.selection.subtitle_stream_ids)
+    ]
+    results = await asyncio.gather(
+        *(probe_file(e.path, e.identity, raise_errors=True) for e in to_check), return_exceptions=True
+    )
+    for entry, streams in zip(to_check, results):
+        if isinstance(streams, ProbeError):
+            # Not the request's fault (ffprobe missing, sleeping disk); the worker checks streams again
+            continue
+        if isinstance(streams, BaseException):
+            raise streams
+        issues += _check_streams(entry, streams)
+    return issues
@@ -0,0 +1,574 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from .config import settings
+from .models import QuarantinedFile, StreamInfo, StreamQuery
+
+JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
+
+SCHEMA_VERSION = 3
+
+# Hits refresh last_used at most this often: eviction only needs a coarse order,
+# and a write per hit would contend with the worker for the database lock
+LAST_USED_RESOLUTION_SECONDS = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    -- Parent folder of path, with trailing separator (see folder_of)
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    -- JSON array of the languages of all streams, for cheap per-folder aggregates
+    languages TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS probes_last_used ON probes (last_used);
+-- Files ffprobe failed on; skipped until their identity changes
+CREATE TABLE IF NOT EXISTS probe_failures (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    failed_at REAL NOT NULL
+);
+-- One row per audio/subtitle stream of every cached file, kept in sync with `probes`
+-- by triggers (so any process writing `probes` maintains it) for library-wide queries
+CREATE TABLE IF NOT EXISTS probe_streams (
+    path TEXT NOT NULL,
+    -- Parent folder of path, with trailing separator
+    dir TEXT NOT NULL,
+    stream_id INTEGER NOT NULL,
+    codec_type TEXT NOT NULL,
+    language TEXT NOT NULL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS probe_streams_file ON probe_streams (path, codec_type, language, title);
+CREATE INDEX IF NOT EXISTS probe_streams_dir ON probe_streams (dir, language);
+-- Stream counts per cached file, also maintained by triggers
+CREATE TABLE IF NOT EXISTS probe_files (
+    path TEXT PRIMARY KEY,
+    audio_count INTEGER NOT NULL,
+    subtitle_count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS probe_streams_insert AFTER INSERT ON probes BEGIN
+    DELETE FROM probe_streams WHERE path = new.path;
+    INSERT INTO probe_streams {streams_of_new};
+END;
+CREATE TRIGGER IF NOT EXISTS probe_streams_update AFTER UPDATE OF result ON probes BEGIN
+    DELETE FROM probe_streams WHERE path = new.path;
+    INSERT INTO probe_streams {streams_of_new};
+END;
+CREATE TRIGGER IF NOT EXISTS probe_streams_delete AFTER DELETE ON probes BEGIN
+    DELETE FROM probe_streams WHERE path = old.path;
+END;
+CREATE TRIGGER IF NOT EXISTS probe_files_insert AFTER INSERT ON probes BEGIN
+    INSERT OR REPLACE INTO probe_files {files_of_new};
+END;
+CREATE TRIGGER IF NOT EXISTS probe_files_update AFTER UPDATE OF result ON probes BEGIN
+    INSERT OR REPLACE INTO probe_files {files_of_new};
+END;
+CREATE TRIGGER IF NOT EXISTS probe_files_delete AFTER DELETE ON probes BEGIN
+    DELETE FROM probe_files WHERE path = old.path;
+END;
+"""
+
+# Rows of probe_streams for the probes row `{row}`
+_STREAMS_OF = " UNION ALL ".join(
+    """
+    SELECT {row}.path,
+           {row}.dir,
+           json_extract(s.value, '$.id'),
+           json_extract(s.value, '$.codec_type'),
+           json_extract(s.value, '$.language'),
+           json_extract(s.value, '$.title')
+    FROM {source} json_each({row}.result, '$.%s') AS s
+    """ % kind
+    for kind in ("audio", "subtitle")
+)
+
+_FILES_OF = """
+    SELECT {row}.path, json_array_length({row}.result, '$.audio'), json_array_length({row}.result, '$.subtitle')
+    {source}
+"""
+
+_SCHEMA = (
+    _SCHEMA
+    .replace("{streams_of_new}", _STREAMS_OF.format(row="new", source="").strip())
+    .replace("{files_of_new}", _FILES_OF.format(row="new", source="").strip())
+)
+
+# Derived tables and how to rebuild them from `probes`
+_DERIVED = {
+    "probe_streams": _STREAMS_OF.format(row="p", source="probes AS p,"),
+    "probe_files": _FILES_OF.format(row="p", source="FROM probes AS p"),
+}
+
+
+def folder_of(file_path: Path) -> str:
+    """Value of the `dir` column: the parent folder of file_path with a trailing separator."""
+    return os.path.join(os.path.dirname(str(file_path)), "")
+
+
+def _decode(result: str) -> Dict[str, List[StreamInfo]]:
+    data = json.loads(result)
+    return {
+        "audio": [StreamInfo(**s) for s in data["audio"]],
+        "subtitle": [StreamInfo(**s) for s in data["subtitle"]],
+    }
+
+
+def _placeholders(values: List) -> str:
+    return ", ".join("?" * len(values))
+
+
+class FileIdentity(NamedTuple):
+    """What has to match for a cached probe result to still be valid."""
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def of(cls, file_path: Path) -> Optional["FileIdentity"]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return cls(st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class ProbeCache:
+    """
+    Persistent cache of ffprobe results in SQLite.
+
+    Results are keyed by absolute path and only returned while the file's size,
+    mtime and inode are unchanged, so a replaced or re-muxed file is probed
+    again. The least recently used rows are evicted once the cache holds more
+    than PROBE_CACHE_MAX_ENTRIES files. If the database cannot be opened the
+    cache disables itself and every lookup is a miss.
+
+    Failed probes are kept separately with their reason (the quarantine), so a
+    broken file is not probed again on every listing until it changes.
+    """
+
+    def __init__(self, db_file: Optional[Path] = None, max_entries: Optional[int] = None):
+        self.db_file = db_file or JOB_DATA_ROOT / "probe_cache.db"
+        self.max_entries = max_entries or settings.PROBE_CACHE_MAX_ENTRIES
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+        # Last COUNT(*) plus this process's own inserts and deletes. The worker writes
+        # too, so it only decides when to recount, never how much to evict
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                self.db_file.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.db_file, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    # Derived tables go too: they are rebuilt from the (empty) new probes table
+                    conn.executescript(
+                        "DROP TABLE IF EXISTS probes; DROP TABLE IF EXISTS probe_streams; "
+                        "DROP TABLE IF EXISTS probe_files;"
+                    )
+                    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                conn.executescript(_SCHEMA)
+                for table, rows in _DERIVED.items():
+                    if table not in existing:
+                        # Database written before the table existed (or by a process that does not create it)
+                        conn.execute(f"INSERT INTO {table} {rows}")
+                conn.commit()
+                self._count = conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"Probe cache error: {e}")
+                self._disabled = True
+        return self._conn
+
+    def get(self, file_path: Path, identity: FileIdentity) -> Optional[Dict[str, List[StreamInfo]]]:
+        """Returns the cached result, or None if the file is unknown or changed since it was probed."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT size, mtime_ns, inode, result, last_used FROM probes WHERE path = ?",
+                    (str(file_path),),
+                ).fetchone()
+                if row is None or FileIdentity(*row[:3]) != identity:
+                    return None
+                now = time.time()
+                if now - row[4] >= LAST_USED_RESOLUTION_SECONDS:
+                    conn.execute("UPDATE probes SET last_used = ? WHERE path = ?", (now, str(file_path)))
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return None
+        return _decode(row[3])
+
+    def _matches(self, table: str, file_path: Path, identity: FileIdentity) -> bool:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            try:
+                row = conn.execute(
+                    f"SELECT size, mtime_ns, inode FROM {table} WHERE path = ?", (str(file_path),)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return False
+        return row is not None and FileIdentity(*row) == identity
+
+    def contains(self, file_path: Path, identity: FileIdentity) -> bool:
+        """
+        True if the unchanged file has a cached result or is quarantined, i.e. probing it
+        again would not help. Does not decode the result or count as a use.
+        """
+        return self._matches("probes", file_path, identity) or self.is_quarantined(file_path, identity)
+
+    def is_quarantined(self, file_path: Path, identity: FileIdentity) -> bool:
+        """True if probing the file failed and it has not changed since."""
+        return self._matches("probe_failures", file_path, identity)
+
+    def quarantine_reason(self, file_path: Path, identity: FileIdentity) -> Optional[str]:
+        """Why probing the file failed, or None if it is not quarantined (or changed since)."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT size, mtime_ns, inode, reason FROM probe_failures WHERE path = ?", (str(file_path),)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return None
+        if row is None or FileIdentity(*row[:3]) != identity:
+            return None
+        return row[3]
+
+    def quarantine(self, file_path: Path, identity: FileIdentity, reason: str):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO probe_failures (path, size, mtime_ns, inode, reason, failed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (str(file_path), *identity, reason, time.time()),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+
+    def quarantined(self) -> List[QuarantinedFile]:
+        """All quarantined files, most recent failure first. Entries of changed files are included."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            try:
+                rows = conn.execute(
+                    "SELECT path, size, mtime_ns, reason, failed_at FROM probe_failures ORDER BY failed_at DESC"
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return []
+        return [
+            QuarantinedFile(path=path, size=size, mtime_ns=mtime_ns, reason=reason, failed_at=failed_at)
+            for path, size, mtime_ns, reason, failed_at in rows
+        ]
+
+    def release(self, file_path: Path) -> bool:
+        """Removes the file from the quarantine so the next listing probes it again."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return False
+            try:
+                released = conn.execute(
+                    "DELETE FROM probe_failures WHERE path = ?", (str(file_path),)
+                ).rowcount > 0
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return False
+        return released
+
+    def put(self, file_path: Path, identity: FileIdentity, result: Dict[str, List[StreamInfo]]):
+        payload = json.dumps({
+            "audio": [s.model_dump() for s in result["audio"]],
+            "subtitle": [s.model_dump() for s in result["subtitle"]],
+        })
+        languages = json.dumps(sorted({s.language for s in result["audio"] + result["subtitle"]}))
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                existed = conn.execute(
+                    "SELECT 1 FROM probes WHERE path = ?", (str(file_path),)
+                ).fetchone() is not None
+                conn.execute(
+                    "INSERT OR REPLACE INTO probes (path, dir, size, mtime_ns, inode, result, languages, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (str(file_path), folder_of(file_path), *identity, payload, languages, time.time()),
+                )
+                conn.execute("DELETE FROM probe_failures WHERE path = ?", (str(file_path),))
+                if not existed:
+                    self._count += 1
+                if self._count > self.max_entries:
+                    self._count = conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+                    if self._count > self.max_entries:
+                        self._evict(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+
+    def folder_languages(self, dir_path: Path, files: Dict[str, FileIdentity]) -> Set[str]:
+        """
+        Returns the languages of every file in dir_path that has a valid cached probe.
+        `files` maps file names to their current identity; other rows are ignored.
+        """
+        prefix = str(dir_path).rstrip(os.sep) + os.sep
+        # Every path starting with prefix sorts below prefix with its last character bumped
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        languages: Set[str] = set()
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return languages
+            try:
+                rows = conn.execute(
+                    "SELECT path, size, mtime_ns, inode, languages FROM probes WHERE path >= ? AND path < ?",
+                    (prefix, upper),
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return languages
+        for path, size, mtime_ns, inode, langs in rows:
+            if files.get(path[len(prefix):]) == (size, mtime_ns, inode):
+                languages.update(json.loads(langs))
+        return languages
+
+    def _prune(self, dir_path: Path, is_stale: Callable[[str, FileIdentity], bool]) -> int:
+        """Deletes cached results and quarantine entries under dir_path for which is_stale(path, identity) holds."""
+        prefix = str(dir_path).rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        removed = 0
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            try:
+                for table in ("probes", "probe_failures"):
+                    rows = conn.execute(
+                        f"SELECT path, size, mtime_ns, inode FROM {table} WHERE path >= ? AND path < ?",
+                        (prefix, upper),
+                    ).fetchall()
+                    stale = [(path,) for path, *identity in rows if is_stale(path, FileIdentity(*identity))]
+                    conn.executemany(f"DELETE FROM {table} WHERE path = ?", stale)
+                    if table == "probes":
+                        removed = len(stale)
+                        self._count -= removed
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return 0
+        return removed
+
+    def prune_folder(self, dir_path: Path, files: Dict[str, FileIdentity]) -> int:
+        """
+        Forgets files directly in dir_path that were deleted or changed. `files` maps
+        the names of a fresh listing of the folder to their identity. Returns the
+        number of cached results removed.
+        """
+        prefix_len = len(str(dir_path).rstrip(os.sep)) + 1
+        return self._prune(
+            dir_path,
+            lambda path, identity: os.sep not in path[prefix_len:] and files.get(path[prefix_len:]) != identity,
+        )
+
+    def prune_folders(self, root: Path, folders: Set[str]) -> int:
+        """
+        Forgets files under root whose folder is not in `folders` (absolute paths),
+        e.g. deleted folders. Files below hidden folders are kept: the tree index
+        does not list those, so their absence from `folders` says nothing.
+        Returns the number of cached results removed.
+        """
+        prefix = str(root).rstrip(os.sep) + os.sep
+
+        def is_stale(path: str, identity: FileIdentity) -> bool:
+            folder = os.path.dirname(path)
+            if folder in folders:
+                return False
+            return not any(part.startswith(".") for part in folder[len(prefix):].split(os.sep))
+
+        return self._prune(root, is_stale)
+
+    def language_index(self, dir_path: Path, recursive: bool) -> Tuple[int, List[Tuple[str, str, int, int, int]]]:
+        """
+        Aggregates the cached probes under dir_path (only directly in it unless recursive).
+        Returns the number of cached files and, per folder and language, a row
+        (folder path, language, files, files with such audio, files with such subtitles).
+        The counts are approximate: files deleted or changed since they were probed
+        count until a fresh listing of their folder or a crawler pass prunes them.
+        """
+        prefix = str(dir_path).rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        if recursive:
+            files_where, files_args = "path >= ? AND path < ?", (prefix, upper)
+            streams_where, streams_args = "dir >= ? AND dir < ?", (prefix, upper)
+        else:
+            files_where = "path >= ? AND path < ? AND instr(substr(path, ?), ?) = 0"
+            files_args = (prefix, upper, len(prefix) + 1, os.sep)
+            streams_where, streams_args = "dir = ?", (prefix,)
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0, []
+            try:
+                files = conn.execute(f"SELECT COUNT(*) FROM probes WHERE {files_where}", files_args).fetchone()[0]
+                rows = conn.execute(
+                    "SELECT dir, language, COUNT(DISTINCT path), "
+                    "COUNT(DISTINCT CASE WHEN codec_type = 'audio' THEN path END), "
+                    "COUNT(DISTINCT CASE WHEN codec_type = 'subtitle' THEN path END) "
+                    f"FROM probe_streams WHERE {streams_where} GROUP BY dir, language",
+                    streams_args,
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return 0, []
+        return files, rows
+
+    def query_files(
+        self, dir_path: Path, recursive: bool, query: StreamQuery, offset: int, limit: int
+    ) -> Tuple[int, List[Tuple[str, FileIdentity, Dict[str, List[StreamInfo]]]]]:
+        """
+        Finds cached files under dir_path whose streams match `query`, ordered by path.
+        Returns the total number of matches and the (path, identity, probe result) of
+        the page. Like language_index this only sees the cache: rows of files deleted
+        or changed since they were probed count until pruned, so callers should check
+        the page's identities against the files.
+        """
+        prefix = str(dir_path).rstrip(os.sep) + os.sep
+        where = ["f.path >= ? AND f.path < ?"]
+        args: List = [prefix, prefix[:-1] + chr(ord(os.sep) + 1)]
+        if not recursive:
+            where.append("instr(substr(f.path, ?), ?) = 0")
+            args += [len(prefix) + 1, os.sep]
+
+        # Correlated lookups on the covering probe_streams_file index: cheap per file,
+        # so scoped queries only touch the files of their folder
+        stream = "SELECT 1 FROM probe_streams AS s WHERE s.path = f.path"
+        for codec_type, required, missing, only in (
+            ("audio", query.audio_languages, query.missing_audio_languages, query.only_audio_languages),
+            ("subtitle", query.subtitle_languages, query.missing_subtitle_languages, query.only_subtitle_languages),
+        ):
+            for language in required:
+                where.append(f"EXISTS ({stream} AND s.codec_type = ? AND s.language = ?)")
+                args += [codec_type, language]
+            if missing:
+                where.append(f"NOT EXISTS ({stream} AND s.codec_type = ? AND s.language IN ({_placeholders(missing)}))")
+                args += [codec_type, *missing]
+            if only:
+                where.append(
+                    f"f.{codec_type}_count > 0 AND "
+                    f"NOT EXISTS ({stream} AND s.codec_type = ? AND s.language NOT IN ({_placeholders(only)}))"
+                )
+                args += [codec_type, *only]
+        if query.title:
+            pattern = query.title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append(f"EXISTS ({stream} AND s.title LIKE ? ESCAPE '\\')")
+            args.append(f"%{pattern}%")
+        for column, op, value in (
+            ("audio_count", ">=", query.min_audio),
+            ("audio_count", "<=", query.max_audio),
+            ("subtitle_count", ">=", query.min_subtitles),
+            ("subtitle_count", "<=", query.max_subtitles),
+        ):
+            if value is not None:
+                where.append(f"f.{column} {op} ?")
+                args.append(value)
+
+        condition = " AND ".join(where)
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0, []
+            try:
+                # Page and total in one pass; results are only loaded for the page
+                rows = conn.execute(
+                    "SELECT m.path, m.total, p.size, p.mtime_ns, p.inode, p.result FROM ("
+                    f"SELECT f.path, COUNT(*) OVER () AS total FROM probe_files AS f WHERE {condition} "
+                    "ORDER BY f.path LIMIT ? OFFSET ?"
+                    ") AS m JOIN probes AS p ON p.path = m.path ORDER BY m.path",
+                    (*args, limit, offset),
+                ).fetchall()
+                if rows:
+                    total = rows[0][1]
+                else:
+                    total = conn.execute(
+                        f"SELECT COUNT(*) FROM probe_files AS f WHERE {condition}", args
+                    ).fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return 0, []
+        return total, [(path, FileIdentity(*identity), _decode(result)) for path, _, *identity, result in rows]
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Evict a little more than needed so we do not run this on every insert
+        excess = self._count - self.max_entries + max(1, self.max_entries // 20)
+        conn.execute(
+            "DELETE FROM probes WHERE path IN "
+            "(SELECT path FROM probes ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+        self._count = conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+
+    def discard(self, file_path: Path):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                if conn.execute("DELETE FROM probes WHERE path = ?", (str(file_path),)).rowcount:
+                    self._count -= 1
+                conn.execute("DELETE FROM probe_failures WHERE path = ?", (str(file_path),))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return 0
+            try:
+                self._count = conn.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+            return self._count
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+probe_cache = ProbeCache()
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Deque, Dict, Optional, Tuple, TypeVar
+from .config import settings
+from .models import ProbeStats
+
+T = TypeVar("T")
+
+
+class ProbePool:
+    """
+    Limits how many ffprobe processes run at once, across all requests.
+
+    Callers wait in FIFO order for a slot. With `max_per_device` set, files on
+    the same storage device (st_dev of their folder) share a smaller limit so
+    one busy disk cannot take every slot. The limiter is not bound to an event
+    loop; waiters are woken on whichever loop they are waiting on.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_per_device: Optional[int] = None):
+        self.max_concurrency = max(1, max_concurrency or settings.PROBE_CONCURRENCY)
+        per_device = settings.PROBE_CONCURRENCY_PER_DEVICE if max_per_device is None else max_per_device
+        self.max_per_device = per_device if per_device > 0 else None
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ffprobe")
+        self._lock = threading.RLock()
+        self._active = 0
+        self._device_active: Dict[Optional[int], int] = {}
+        self._waiters: Deque[Tuple[Optional[int], asyncio.Future]] = deque()
+        self._devices: Dict[str, int] = {}
+        # Metrics
+        self._completed = 0
+        self._max_queued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _device_of(self, file_path: Path) -> Optional[int]:
+        if self.max_per_device is None:
+            return None
+        folder = str(file_path.parent)
+        device = self._devices.get(folder)
+        if device is None:
+            try:
+                device = os.stat(folder).st_dev
+            except OSError:
+                return None
+            self._devices[folder] = device
+        return device
+
+    def _can_run(self, device: Optional[int]) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        return self.max_per_device is None or self._device_active.get(device, 0) < self.max_per_device
+
+    def _take(self, device: Optional[int]):
+        self._active += 1
+        self._device_active[device] = self._device_active.get(device, 0) + 1
+
+    def _release(self, device: Optional[int]):
+        with self._lock:
+            self._active -= 1
+            self._device_active[device] -= 1
+            if not self._device_active[device]:
+                del self._device_active[device]
+            # Wake the oldest waiter that is allowed to run now
+            for waiter in list(self._waiters):
+                if self._active >= self.max_concurrency:
+                    break
+                waiting_device, future = waiter
+                if waiter not in self._waiters or not self._can_run(waiting_device):
+                    continue
+                self._waiters.remove(waiter)
+                self._take(waiting_device)
+                try:
+                    future.get_loop().call_soon_threadsafe(self._grant, waiting_device, future)
+                except RuntimeError:
+                    # The waiter's event loop is gone
+                    self._release(waiting_device)
+
+    def _grant(self, device: Optional[int], future: asyncio.Future):
+        if future.cancelled():
+            # The waiter gave up after it was picked; pass the slot on
+            self._release(device)
+        else:
+            future.set_result(None)
+
+    async def _acquire(self, device: Optional[int]):
+        with self._lock:
+            # Remaining waiters are blocked on a full device or a full pool,
+            # so taking a free slot here never overtakes one that could run
+            if self._can_run(device):
+                self._take(device)
+                return
+            future = asyncio.get_running_loop().create_future()
+            waiter = (device, future)
+            self._waiters.append(waiter)
+            self._max_queued = max(self._max_queued, len(self._waiters))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if future.done() and not future.cancelled():
+                self._release(device)
+            raise
+
+    async def _enter(self, file_path: Path) -> Optional[int]:
+        device = self._device_of(file_path)
+        queued_at = time.monotonic()
+        await self._acquire(device)
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return device
+
+    def _exit(self, device: Optional[int]):
+        with self._lock:
+            self._completed += 1
+        self._release(device)
+
+    @asynccontextmanager
+    async def slot(self, file_path: Path):
+        """Waits for a free probe slot for file_path and holds it for the duration of the block."""
+        device = await self._enter(file_path)
+        try:
+            yield
+        finally:
+            self._exit(device)
+
+    async def run(self, file_path: Path, func: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Runs a blocking probe of file_path on the probe threads once a slot is free.
+        Raises asyncio.TimeoutError after `timeout` seconds. The slot is held until
+        func returns, even when the caller timed out or was cancelled: a thread
+        stuck on a sleeping disk still counts against the limits.
+        """
+        device = await self._enter(file_path)
+        try:
+            future = self._executor.submit(func)
+        except BaseException:
+            self._exit(device)
+            raise
+        future.add_done_callback(lambda _: self._exit(device))
+        result = asyncio.wrap_future(future)
+        # The caller may be gone by the time func finishes
+        result.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return await asyncio.wait_for(asyncio.shield(result), timeout)
+
+    def stats(self) -> ProbeStats:
+        with self._lock:
+            started = self._completed + self._active
+            return ProbeStats(
+                max_concurrency=self.max_concurrency,
+                max_per_device=self.max_per_device,
+                active=self._active,
+                queued=len(self._waiters),
+                completed=self._completed,
+                max_queued=self._max_queued,
+                avg_wait_ms=self._total_wait / started * 1000 if started else 0.0,
+                max_wait_ms=self._max_wait * 1000,
+            )
+
+
+probe_pool = ProbePool()
@@ -0,0 +1,93 @@
+"""
+Directory scanner used by the tree index.
+
+Each directory is listed exactly once with `os.scandir`, using the file type
+reported by the directory entry instead of a separate stat per item. Sibling
+directories are listed in parallel on a bounded thread pool, which hides the
+per-request latency of SMB/NFS mounts.
+"""
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+from .config import settings
+
+
+class DirEntry:
+    """Scan result for a single directory."""
+    __slots__ = ("mtime_ns", "has_videos", "subdirs")
+
+    def __init__(self, mtime_ns: int, has_videos: bool, subdirs: List[str]):
+        self.mtime_ns = mtime_ns
+        self.has_videos = has_videos
+        # Names of non-hidden sub-directories, sorted case-insensitively
+        self.subdirs = subdirs
+
+
+def child_rel_path(rel_path: str, name: str) -> str:
+    return f"/{name}" if rel_path == "/" else f"{rel_path}/{name}"
+
+
+def scan_dir(path: Path) -> Optional[DirEntry]:
+    """Lists one directory in a single pass. Returns None if it is unreadable."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+        subdirs = []
+        has_videos = False
+        with os.scandir(path) as it:
+            for item in it:
+                # is_dir()/is_file() come from the dirent type; only symlinks need a stat
+                try:
+                    if item.is_dir():
+                        if not item.name.startswith("."):
+                            subdirs.append(item.name)
+                    elif not has_videos and os.path.splitext(item.name)[1].lower() in settings.VIDEO_EXTENSIONS:
+                        has_videos = item.is_file()
+                except OSError:
+                    continue
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return None
+    subdirs.sort(key=str.lower)
+    return DirEntry(mtime_ns, has_videos, subdirs)
+
+
+def scan_tree(
+    root: Path,
+    rel_path: str = "/",
+    max_workers: Optional[int] = None,
+) -> Dict[str, Optional[DirEntry]]:
+    """
+    Scans rel_path (relative to root) and every directory below it.
+
+    Returns a mapping of rel_path -> DirEntry, with None for directories that
+    could not be read. Directories are submitted to the pool as soon as their
+    parent has been listed, so at most `max_workers` listings are in flight.
+    """
+    workers = max_workers or settings.TREE_SCAN_WORKERS
+
+    def abs_path(rel: str) -> Path:
+        return root / rel.lstrip("/") if rel != "/" else root
+
+    results: Dict[str, Optional[DirEntry]] = {}
+    if workers <= 1:
+        stack = [rel_path]
+        while stack:
+            current = stack.pop()
+            entry = results[current] = scan_dir(abs_path(current))
+            if entry is not None:
+                stack.extend(child_rel_path(current, name) for name in entry.subdirs)
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tree-scan") as pool:
+        pending: Dict[Future, str] = {pool.submit(scan_dir, abs_path(rel_path)): rel_path}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                current = pending.pop(future)
+                entry = results[current] = future.result()
+                if entry is None:
+                    continue
+                for name in entry.subdirs:
+                    child = child_rel_path(current, name)
+                    pending[pool.submit(scan_dir, abs_path(child))] = child
+    return results
@@ -0,0 +1,268 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from .config import settings
+from .models import FileNode
+from .scanner import DirEntry, child_rel_path, scan_dir, scan_tree
+
+JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
+
+INDEX_VERSION = 1
+
+
+def normalize_rel_path(rel_path: str) -> str:
+    """Normalizes '', 'a/b/', '\\a\\b' etc. to the '/a/b' form used as index keys."""
+    clean = rel_path.replace("\\", "/").strip("/")
+    return "/" + clean if clean else "/"
+
+
+class TreeIndex:
+    """
+    In-memory index of the directory tree under INPUT_ROOT.
+
+    Every directory is scanned once and remembered together with its mtime.
+    `refresh()` only stats known directories and rescans the ones whose mtime
+    changed, so keeping the index current costs one stat per directory instead
+    of a full listing of the library. The index is persisted under
+    JOB_DATA_ROOT so a restart does not have to rescan everything.
+    """
+
+    def __init__(self, index_file: Optional[Path] = None):
+        self.index_file = index_file or JOB_DATA_ROOT / "tree_index.json"
+        self._entries: Dict[str, DirEntry] = {}
+        self._root: Optional[Path] = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = False
+        # Derived data, reset whenever an entry changes
+        self._visible: Dict[str, bool] = {}
+        self._tree: Optional[FileNode] = None
+        # Called with the rel_path of every directory that was rescanned or removed
+        self._listeners: List[Callable[[str], None]] = []
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded and self._root == settings.INPUT_ROOT
+
+    def add_listener(self, callback: Callable[[str], None]):
+        self._listeners.append(callback)
+
+    def _notify(self, rel_path: str):
+        for callback in self._listeners:
+            try:
+                callback(rel_path)
+            except Exception as e:
+                print(f"Tree index listener error: {e}")
+
+    def _abs_path(self, rel_path: str) -> Path:
+        return self._root / rel_path.lstrip("/") if rel_path != "/" else self._root
+
+    def _scan_subtree(self, rel_path: str):
+        """Scans rel_path and every directory below it, replacing existing entries."""
+        results = scan_tree(self._root, rel_path)
+        # Parents always come before their children in the results
+        for current, entry in results.items():
+            if entry is None:
+                self._remove_subtree(current)
+                continue
+            old = self._entries.get(current)
+            self._entries[current] = entry
+            self._notify(current)
+            if old is not None:
+                for name in set(old.subdirs) - set(entry.subdirs):
+                    self._remove_subtree(child_rel_path(current, name))
+        self._mark_changed()
+
+    def _remove_subtree(self, rel_path: str):
+        prefix = rel_path.rstrip("/") + "/"
+        for key in [k for k in self._entries if k == rel_path or k.startswith(prefix)]:
+            del self._entries[key]
+            self._notify(key)
+        self._mark_changed()
+
+    def _mark_changed(self):
+        self._dirty = True
+        self._visible.clear()
+        self._tree = None
+
+    def build(self):
+        """Scans the whole input root from scratch."""
+        with self._lock:
+            self._root = settings.INPUT_ROOT
+            self._entries = {}
+            self._scan_subtree("/")
+            self._loaded = True
+
+    def load(self) -> bool:
+        """Loads a persisted index. Returns False if there is none for the current root."""
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("root") != str(settings.INPUT_ROOT):
+            return False
+        with self._lock:
+            self._root = settings.INPUT_ROOT
+            self._entries = {
+                rel: DirEntry(mtime_ns, has_videos, subdirs)
+                for rel, (mtime_ns, has_videos, subdirs) in data.get("dirs", {}).items()
+            }
+            self._loaded = True
+            self._mark_changed()
+            self._dirty = False
+        return True
+
+    def save(self):
+        """Persists the index if it changed since the last save."""
+        with self._lock:
+            if not self._dirty or not self._loaded:
+                return
+            data = {
+                "version": INDEX_VERSION,
+                "root": str(self._root),
+                "dirs": {
+                    rel: [e.mtime_ns, e.has_videos, e.subdirs]
+                    for rel, e in self._entries.items()
+                },
+            }
+            self._dirty = False
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Tree index save error: {e}")
+
+    def ensure_loaded(self):
+        """Loads the persisted index or builds a fresh one if the index is empty."""
+        with self._lock:
+            if self.loaded:
+                return
+            if self.load():
+                # The library may have changed while we were not running
+                self.refresh()
+            else:
+                self.build()
+
+    def _stat_mtime(self, rel_path: str) -> Optional[int]:
+        try:
+            return self._abs_path(rel_path).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self) -> int:
+        """
+        Revalidates every known directory by mtime and rescans the ones that changed.
+        Returns the number of directories that were rescanned.
+        """
+        with self._lock:
+            if not self.loaded:
+                self.build()
+                return len(self._entries)
+            snapshot = [(rel_path, e.mtime_ns) for rel_path, e in self._entries.items()]
+        # Stat outside the lock so readers are not blocked by a slow share
+        changed = [rel_path for rel_path, mtime_ns in snapshot if self._stat_mtime(rel_path) != mtime_ns]
+        with self._lock:
+            for rel_path in changed:
+                # A parent rescan may already have dropped this entry
+                if rel_path in self._entries:
+                    self.invalidate(rel_path)
+        return len(changed)
+
+    def invalidate(self, rel_path: str):
+        """Rescans a single directory, picking up new sub-directories recursively."""
+        with self._lock:
+            if not self.loaded:
+                return
+            rel_path = normalize_rel_path(rel_path)
+            entry = scan_dir(self._abs_path(rel_path))
+            if entry is None:
+                self._remove_subtree(rel_path)
+                return
+            old = self._entries.get(rel_path)
+            self._entries[rel_path] = entry
+            self._notify(rel_path)
+            old_subdirs = set(old.subdirs) if old else set()
+            for name in old_subdirs - set(entry.subdirs):
+                self._remove_subtree(child_rel_path(rel_path, name))
+            for name in entry.subdirs:
+                child = child_rel_path(rel_path, name)
+                if child not in self._entries:
+                    self._scan_subtree(child)
+            self._mark_changed()
+
+    def entry(self, rel_path: str) -> Optional[DirEntry]:
+        """Returns the scan result for an indexed directory, or None."""
+        with self._lock:
+            return self._entries.get(rel_path)
+
+    def directories(self, rel_path: str = "/") -> List[str]:
+        """Returns rel_path and all indexed directories below it."""
+        prefix = "/" if rel_path == "/" else rel_path.rstrip("/") + "/"
+        with self._lock:
+            return [k for k in self._entries if k == rel_path or k.startswith(prefix)]
+
+    def _is_visible(self, rel_path: str) -> bool:
+        """A directory is shown if it or any descendant contains video files."""
+        cached = self._visible.get(rel_path)
+        if cached is not None:
+            return cached
+        entry = self._entries.get(rel_path)
+        visible = False
+        if entry is not None:
+            # Evaluate every child so their results are cached for the tree build
+            children = [self._is_visible(child_rel_path(rel_path, n)) for n in entry.subdirs]
+            visible = entry.has_videos or any(children)
+        self._visible[rel_path] = visible
+        return visible
+
+    def _build_node(self, rel_path: str, depth: Optional[int] = None) -> FileNode:
+        entry = self._entries[rel_path]
+        visible = [
+            child
+            for child in (child_rel_path(rel_path, n) for n in entry.subdirs)
+            if self._is_visible(child)
+        ]
+        name = "/" if rel_path == "/" else rel_path.rsplit("/", 1)[-1]
+        if depth is not None and depth <= 0:
+            # Cut-off level: children are left unloaded for the client to expand
+            return FileNode(name=name, rel_path=rel_path, children=None, has_children=bool(visible))
+        next_depth = None if depth is None else depth - 1
+        children = [self._build_node(child, next_depth) for child in visible]
+        return FileNode(name=name, rel_path=rel_path, children=children, has_children=bool(children))
+
+    def get_tree(self) -> FileNode:
+        """Returns the folder tree (only directories leading to video files)."""
+        tree = self._tree
+        if tree is not None:
+            return tree
+        with self._lock:
+            if self._tree is None:
+                if "/" in self._entries and self._is_visible("/"):
+                    self._tree = self._build_node("/")
+                else:
+                    self._tree = FileNode(name="/", rel_path="/", children=[])
+            return self._tree
+
+    def get_subtree(self, rel_path: str = "/", depth: Optional[int] = None) -> Optional[FileNode]:
+        """
+        Returns the node at rel_path with `depth` levels of children (None means unlimited).
+        Returns None if the folder is not indexed or leads to no video files.
+        """
+        rel_path = normalize_rel_path(rel_path)
+        if rel_path == "/" and depth is None:
+            return self.get_tree()
+        with self._lock:
+            if rel_path in self._entries and self._is_visible(rel_path):
+                return self._build_node(rel_path, depth)
+        if rel_path == "/":
+            return FileNode(name="/", rel_path="/", children=[])
+        return None
+
+
+tree_index = TreeIndex()
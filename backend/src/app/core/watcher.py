@@ -0,0 +1,245 @@
+import asyncio
+import errno
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+from . import inotify
+from .config import settings
+from .dir_cache import DirectoryCache, dir_cache
+from .tree_index import TreeIndex, tree_index
+
+WATCH_MASK = (
+    inotify.IN_CREATE | inotify.IN_DELETE | inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO
+    | inotify.IN_CLOSE_WRITE | inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF | inotify.IN_ONLYDIR
+)
+
+# Filesystems where inotify only sees local changes, so remote edits would be missed
+NETWORK_FS_TYPES = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs",
+    "fuse.sshfs", "fuse.rclone", "davfs", "fuse.glusterfs",
+}
+
+
+def filesystem_type(path: Path, mounts_file: str = "/proc/mounts") -> Optional[str]:
+    """Returns the type of the filesystem path lives on, or None if unknown."""
+    try:
+        with open(mounts_file, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    path_str = str(path)
+    best, best_type = "", None
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        # Spaces in mount points are escaped as \040
+        mount_point = parts[1].replace("\\040", " ")
+        prefix = mount_point.rstrip("/") + "/"
+        if (path_str == mount_point or path_str.startswith(prefix)) and len(mount_point) >= len(best):
+            best, best_type = mount_point, parts[2]
+    return best_type
+
+
+class LibraryWatcher:
+    """
+    Keeps the tree index and directory-listing cache in sync with INPUT_ROOT.
+
+    In 'inotify' mode every indexed directory is watched and only directories
+    that report events are rescanned. In 'poll' mode (network mounts, non-Linux
+    platforms, or when inotify watches run out) the tree index is revalidated
+    by mtime every TREE_INDEX_REFRESH_SECONDS.
+    """
+
+    def __init__(self, index: TreeIndex, cache: DirectoryCache, debounce: float = 0.5):
+        self.index = index
+        self.cache = cache
+        self.debounce = debounce
+        self.mode: Optional[str] = None
+        self._inotify: Optional[inotify.Inotify] = None
+        self._wd_to_rel: Dict[int, str] = {}
+        self._rel_to_wd: Dict[str, int] = {}
+        # Directories add_watch failed on (e.g. permission denied); retried on every sync
+        self._unwatched: Set[str] = set()
+        self._watch_lock = threading.Lock()
+        self._pending: Set[str] = set()
+        self._overflow = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fallback: Optional[asyncio.Event] = None
+        index.add_listener(self._on_dir_rescanned)
+
+    def _abs_path(self, rel_path: str) -> Path:
+        return settings.INPUT_ROOT / rel_path.lstrip("/") if rel_path != "/" else settings.INPUT_ROOT
+
+    def _on_dir_rescanned(self, rel_path: str):
+        self.cache.invalidate(self._abs_path(rel_path))
+
+    def choose_mode(self) -> str:
+        mode = settings.LIBRARY_WATCHER.lower()
+        if mode in ("off", "poll"):
+            return mode
+        if not inotify.is_available():
+            return "poll"
+        if mode == "auto" and filesystem_type(settings.INPUT_ROOT) in NETWORK_FS_TYPES:
+            return "poll"
+        return "inotify"
+
+    async def run(self):
+        """Runs until cancelled. Expects the tree index to be loaded already."""
+        self._loop = asyncio.get_running_loop()
+        self._fallback = asyncio.Event()
+        self.mode = self.choose_mode()
+        if self.mode == "inotify":
+            try:
+                await asyncio.to_thread(self._start_inotify)
+            except OSError as e:
+                print(f"Library watcher: inotify unavailable ({e}), falling back to polling")
+                self._stop_inotify()
+                self.mode = "poll"
+        print(f"Library watcher running in '{self.mode}' mode")
+        try:
+            if self.mode == "inotify":
+                self.cache.trusted = True
+                await self._fallback.wait()
+                print("Library watcher: ran out of inotify watches, falling back to polling")
+                self.cache.trusted = False
+                self._stop_inotify()
+                self.mode = "poll"
+            if self.mode == "poll":
+                await self._poll_loop()
+        finally:
+            self.cache.trusted = False
+            self._stop_inotify()
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(settings.TREE_INDEX_REFRESH_SECONDS)
+            try:
+                changed = await asyncio.to_thread(self.index.refresh)
+                if changed:
+                    await asyncio.to_thread(self.index.save)
+            except Exception as e:
+                print(f"Tree index refresh error: {e}")
+
+    # --- inotify mode ---
+
+    def _start_inotify(self):
+        self._inotify = inotify.Inotify()
+        self._sync_watches()
+        # add_reader must be called from the event loop thread
+        self._loop.call_soon_threadsafe(
+            self._loop.add_reader, self._inotify.fileno(), self._on_readable
+        )
+
+    def _stop_inotify(self):
+        if self._inotify is None:
+            return
+        try:
+            self._loop.remove_reader(self._inotify.fileno())
+        except Exception:
+            pass
+        self._inotify.close()
+        self._inotify = None
+        with self._watch_lock:
+            self._wd_to_rel.clear()
+            self._rel_to_wd.clear()
+        for rel_path in self._unwatched:
+            self.cache.set_watched(self._abs_path(rel_path), True)
+        self._unwatched.clear()
+
+    def _sync_watches(self):
+        """
+        Adds watches for newly indexed directories and drops watches for removed ones.
+        Directories that cannot be watched are retried here on every sync; until then
+        their listings are revalidated by mtime.
+        """
+        known = set(self.index.directories())
+        with self._watch_lock:
+            watched = set(self._rel_to_wd)
+        for rel_path in sorted(known - watched):
+            abs_path = self._abs_path(rel_path)
+            try:
+                wd = self._inotify.add_watch(str(abs_path), WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    # Out of inotify watches: let run() fall back to polling
+                    raise
+                if rel_path not in self._unwatched:
+                    print(f"Library watcher: cannot watch {rel_path} ({e}), checking it by mtime instead")
+                    self._unwatched.add(rel_path)
+                    self.cache.set_watched(abs_path, False)
+                continue
+            with self._watch_lock:
+                self._wd_to_rel[wd] = rel_path
+                self._rel_to_wd[rel_path] = wd
+            if rel_path in self._unwatched:
+                self._unwatched.discard(rel_path)
+                self.cache.set_watched(abs_path, True)
+        for rel_path in self._unwatched - known:
+            self._unwatched.discard(rel_path)
+            self.cache.set_watched(self._abs_path(rel_path), True)
+        for rel_path in watched - known:
+            with self._watch_lock:
+                wd = self._rel_to_wd.pop(rel_path, None)
+                self._wd_to_rel.pop(wd, None)
+            if wd is not None:
+                self._inotify.rm_watch(wd)
+
+    def _on_readable(self):
+        if self._inotify is None:
+            return
+        for event in self._inotify.read_events():
+            if event.mask & inotify.IN_Q_OVERFLOW:
+                self._overflow = True
+                continue
+            with self._watch_lock:
+                rel_path = self._wd_to_rel.get(event.wd)
+                if event.mask & inotify.IN_IGNORED:
+                    self._wd_to_rel.pop(event.wd, None)
+                    if rel_path is not None:
+                        self._rel_to_wd.pop(rel_path, None)
+            if rel_path is None or event.mask & inotify.IN_IGNORED:
+                continue
+            if event.mask & (inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF):
+                rel_path = rel_path.rsplit("/", 1)[0] or "/"
+            # Drop the listing right away; the tree rescan is debounced
+            self.cache.invalidate(self._abs_path(rel_path))
+            self._pending.add(rel_path)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if (self._pending or self._overflow) and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = self._loop.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(self.debounce)
+        pending, self._pending = self._pending, set()
+        overflow, self._overflow = self._overflow, False
+        try:
+            await asyncio.to_thread(self._apply, pending, overflow)
+        except Exception as e:
+            if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+                self._fallback.set()
+                return
+            print(f"Library watcher error: {e}")
+            # Retried by the next flush rather than lost
+            self._pending |= pending
+            self._overflow = self._overflow or overflow
+        # Events that arrived while applying are handled by another flush; this task is
+        # still running, so it must not count as the pending one
+        self._flush_task = None
+        self._schedule_flush()
+
+    def _apply(self, pending: Set[str], overflow: bool):
+        if overflow:
+            self.cache.clear()
+            self.index.refresh()
+        for rel_path in sorted(pending):
+            self.index.invalidate(rel_path)
+        if self._inotify is not None:
+            self._sync_watches()
+        self.index.save()
+
+
+library_watcher = LibraryWatcher(tree_index, dir_cache)
@@ -5,19 +5,32 @@ import os
 import time
 from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from .api import routes_tree, routes_list, routes_process, routes_jobs
+from .api import routes_tree, routes_list, routes_process, routes_jobs, routes_probes, routes_library, routes_plan
 from .core.jobs.events import event_manager
 from .core.jobs.store import job_store
 from .core.models import JobStatus
+from .core.tree_index import tree_index
+from .core.dir_cache import dir_cache
+from .core.probe_cache import FileIdentity, probe_cache
+from .core.name_index import name_index
+from .core.crawler import probe_crawler
+from .core.watcher import library_watcher
 
 JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
 
+# Fresh folder listings tell which cached probes belong to deleted or changed files
+dir_cache.add_listener(
+    lambda dir_path, files: probe_cache.prune_folder(
+        dir_path, {f.name: FileIdentity(f.size, f.mtime_ns, f.inode) for f in files}
+    )
+)
+
 async def _poll_status_files():
     """Background task: watch status dir and log files, push updates into SSE queues."""
     status_dir = JOB_DATA_ROOT / "status"
@@ -94,13 +107,30 @@ async def _cleanup_old_jobs():
         except Exception as e:
             print(f"Cleanup error: {e}")
 
+async def _maintain_tree_index():
+    """Background task: build the tree index at startup, then keep it current via the library watcher."""
+    try:
+        await asyncio.to_thread(tree_index.ensure_loaded)
+        await asyncio.to_thread(tree_index.save)
+    except Exception as e:
+        print(f"Tree index build error: {e}")
+    try:
+        await asyncio.to_thread(name_index.build)
+    except Exception as e:
+        print(f"Name index build error: {e}")
+    await library_watcher.run()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     task1 = asyncio.create_task(_poll_status_files())
     task2 = asyncio.create_task(_cleanup_old_jobs())
+    task3 = asyncio.create_task(_maintain_tree_index())
+    task4 = asyncio.create_task(probe_crawler.run())
     yield
     task1.cancel()
     task2.cancel()
+    task3.cancel()
+    task4.cancel()
 
 
 app = FastAPI(title="Video Cleaner API", lifespan=lifespan)
@@ -114,10 +144,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def track_api_activity(request: Request, call_next):
+    # The pre-probe crawler only runs while nobody is using the API (diagnostics polling aside)
+    if request.url.path.startswith("/api/") and not request.url.path.startswith("/api/probes/"):
+        probe_crawler.note_activity()
+    return await call_next(request)
+
 app.include_router(routes_tree.router, prefix="/api")
 app.include_router(routes_list.router, prefix="/api")
 app.include_router(routes_process.router, prefix="/api")
 app.include_router(routes_jobs.router, prefix="/api")
+app.include_router(routes_probes.router, prefix="/api")
+app.include_router(routes_library.router, prefix="/api")
+app.include_router(routes_plan.router, prefix="/api")
 
 @app.get("/")
 async def root():
@@ -1,6 +1,7 @@
 import os
 import pytest
 from pathlib import Path
+from unittest.mock import MagicMock
 
 
 @pytest.fixture(scope="session")
@@ -20,6 +21,37 @@ def patch_env(tmp_media):
     os.environ["JOB_DATA_ROOT"] = str(tmp_media / "job-data")
 
 
+@pytest.fixture
+def make_streams():
+    """make_streams(audio, subtitle=(), titles=None): a probe result with one stream per language."""
+    from app.core.models import StreamInfo
+
+    def _make(audio, subtitle=(), titles=None):
+        titles = titles or {}
+        return {
+            "audio": [
+                StreamInfo(id=i + 1, language=lang, title=titles.get(i + 1), codec_type="audio")
+                for i, lang in enumerate(audio)
+            ],
+            "subtitle": [StreamInfo(id=10 + i, language=lang, codec_type="subtitle") for i, lang in enumerate(subtitle)],
+        }
+    return _make
+
+
+@pytest.fixture
+def fake_esr():
+    """
+    fake_esr(captured): replacement for EventSourceResponse when a route is called
+    directly. It saves the event generator in captured["gen"] for the test to drain.
+    """
+    def _make(captured: dict):
+        def _inner(gen):
+            captured["gen"] = gen
+            return MagicMock()
+        return _inner
+    return _make
+
+
 @pytest.fixture(scope="session")
 def app_client(patch_env):
     from app.main import app
@@ -27,6 +59,19 @@ def app_client(patch_env):
 
     config.settings.INPUT_ROOT = Path(os.environ["INPUT_ROOT"])
     config.settings.OUTPUT_ROOT = Path(os.environ["OUTPUT_ROOT"])
+    # Listings are revalidated by mtime; tests do not rely on filesystem events
+    config.settings.LIBRARY_WATCHER = "poll"
+    # No background pre-probing while tests run
+    config.settings.CRAWLER_FILES_PER_SECOND = 0
+
+    from app.core.tree_index import tree_index
+
+    tree_index.index_file = Path(os.environ["JOB_DATA_ROOT"]) / "tree_index.json"
+
+    from app.core.probe_cache import probe_cache
+
+    probe_cache.close()
+    probe_cache.db_file = Path(os.environ["JOB_DATA_ROOT"]) / "probe_cache.db"
 
     from fastapi.testclient import TestClient
 
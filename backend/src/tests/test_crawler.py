@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core import config
+from app.core.crawler import ProbeCrawler
+from app.core.dir_cache import dir_cache
+from app.core.models import StreamInfo
+from app.core.probe_cache import FileIdentity, ProbeCache
+from app.core.tree_index import TreeIndex
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    (root / "Movies").mkdir(parents=True)
+    (root / "Movies" / "a.mkv").write_bytes(b"a")
+    (root / "Movies" / "b.mkv").write_bytes(b"b")
+    (root / "Shows" / "S1").mkdir(parents=True)
+    (root / "Shows" / "S1" / "e1.mkv").write_bytes(b"e1")
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    monkeypatch.setattr(config.settings, "CRAWLER_IDLE_SECONDS", 0)
+    monkeypatch.setattr(config.settings, "CRAWLER_FILES_PER_SECOND", 1000)
+    return root
+
+
+@pytest.fixture
+def probes(tmp_path):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def probed(monkeypatch, probes):
+    """Replaces ffprobe: records the file and stores a result in the cache."""
+    calls = []
+
+    async def fake_probe(path, identity=None):
+        calls.append(path.name)
+        result = {"audio": [StreamInfo(id=1, language="eng", codec_type="audio")], "subtitle": []}
+        probes.put(path, identity, result)
+        return result
+
+    monkeypatch.setattr("app.core.crawler.probe_file", fake_probe)
+    return calls
+
+
+def _crawler(tmp_path, probes, has_active_jobs=lambda: False):
+    index = TreeIndex(index_file=tmp_path / "tree_index.json")
+    index.build()
+    return ProbeCrawler(index, probes, has_active_jobs=has_active_jobs)
+
+
+async def test_crawl_probes_every_uncached_file(tmp_path, library, probes, probed):
+    crawler = _crawler(tmp_path, probes)
+
+    await crawler.crawl()
+
+    assert sorted(probed) == ["a.mkv", "b.mkv", "e1.mkv"]
+    status = crawler.status
+    assert status.files_seen == 3
+    assert status.files_probed == 3
+    assert status.directories_done == status.directories_total == 4
+    assert status.current_dir is None
+    assert status.pass_finished_at is not None
+
+
+async def test_crawl_skips_cached_files(tmp_path, library, probes, probed):
+    movie = library / "Movies" / "a.mkv"
+    probes.put(movie, FileIdentity.of(movie), {"audio": [], "subtitle": []})
+    crawler = _crawler(tmp_path, probes)
+
+    await crawler.crawl()
+
+    assert sorted(probed) == ["b.mkv", "e1.mkv"]
+    assert crawler.status.files_cached == 1
+
+    await crawler.crawl()
+    assert len(probed) == 2
+    assert crawler.status.files_cached == 3
+
+
+async def test_crawl_prunes_probes_of_deleted_files_and_folders(tmp_path, library, probes, probed):
+    crawler = _crawler(tmp_path, probes)
+    await crawler.crawl()
+    assert len(probes) == 3
+
+    (library / "Movies" / "b.mkv").unlink()
+    (library / "Shows" / "S1" / "e1.mkv").unlink()
+    (library / "Shows" / "S1").rmdir()
+    crawler.index.refresh()
+    await crawler.crawl()
+
+    assert len(probes) == 1
+    movie = library / "Movies" / "a.mkv"
+    assert probes.contains(movie, FileIdentity.of(movie))
+
+
+async def test_crawl_leaves_directory_cache_alone(tmp_path, library, probes, probed):
+    dir_cache.clear()
+    crawler = _crawler(tmp_path, probes)
+
+    await crawler.crawl()
+
+    assert len(probed) == 3
+    assert not dir_cache._entries
+
+
+async def test_crawl_respects_files_per_second_budget(tmp_path, library, probes, probed, monkeypatch):
+    monkeypatch.setattr(config.settings, "CRAWLER_FILES_PER_SECOND", 20)
+    crawler = _crawler(tmp_path, probes)
+
+    start = time.monotonic()
+    await crawler.crawl()
+
+    # Three probes at 20/s: at least two 50 ms gaps
+    assert time.monotonic() - start >= 0.1
+
+
+async def test_crawl_pauses_while_jobs_are_active(tmp_path, library, probes, probed, monkeypatch):
+    monkeypatch.setattr("app.core.crawler.JOBS_CHECK_SECONDS", 0)
+    active = {"jobs": True}
+    crawler = _crawler(tmp_path, probes, has_active_jobs=lambda: active["jobs"])
+
+    task = asyncio.create_task(crawler.crawl())
+    await asyncio.sleep(0.05)
+    assert crawler.status.state == "paused"
+    assert probed == []
+
+    active["jobs"] = False
+    await asyncio.wait_for(task, timeout=5)
+    assert len(probed) == 3
+
+
+async def test_api_activity_pauses_crawler(tmp_path, library, probes, probed, monkeypatch):
+    monkeypatch.setattr(config.settings, "CRAWLER_IDLE_SECONDS", 60)
+    crawler = _crawler(tmp_path, probes)
+    crawler.note_activity()
+
+    task = asyncio.create_task(crawler.crawl())
+    await asyncio.sleep(0.05)
+    assert crawler.status.state == "paused"
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert probed == []
+
+
+async def test_run_does_nothing_when_disabled(tmp_path, library, probes, probed, monkeypatch):
+    monkeypatch.setattr(config.settings, "CRAWLER_FILES_PER_SECOND", 0)
+    crawler = _crawler(tmp_path, probes)
+
+    await asyncio.wait_for(crawler.run(), timeout=1)
+
+    assert probed == []
+
+
+def test_crawler_status_endpoint(app_client):
+    response = app_client.get("/api/probes/crawler")
+
+    assert response.status_code == 200
+    assert response.json()["state"] in ("disabled", "waiting", "paused", "crawling")
@@ -0,0 +1,90 @@
+import os
+
+from app.core.dir_cache import DirectoryCache
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _names(files):
+    return [f.name for f in files]
+
+
+def test_list_videos_returns_sorted_video_files_with_stats(tmp_path):
+    (tmp_path / "b.mkv").write_bytes(b"12345")
+    (tmp_path / "a.MP4").touch()
+    (tmp_path / "notes.txt").touch()
+    (tmp_path / "folder.mkv").mkdir()
+
+    files = DirectoryCache().list_videos(tmp_path)
+
+    assert _names(files) == ["a.MP4", "b.mkv"]
+    assert files[1].size == 5
+    assert files[1].inode == (tmp_path / "b.mkv").stat().st_ino
+    assert files[1].mtime_ns == (tmp_path / "b.mkv").stat().st_mtime_ns
+
+
+def test_list_videos_reuses_listing_while_mtime_unchanged(tmp_path):
+    cache = DirectoryCache()
+    (tmp_path / "a.mkv").touch()
+    first = cache.list_videos(tmp_path)
+
+    assert cache.list_videos(tmp_path) is first
+
+
+def test_list_videos_rescans_when_directory_mtime_changes(tmp_path):
+    cache = DirectoryCache()
+    (tmp_path / "a.mkv").touch()
+    cache.list_videos(tmp_path)
+
+    (tmp_path / "b.mkv").touch()
+    _bump_mtime(tmp_path)
+
+    assert _names(cache.list_videos(tmp_path)) == ["a.mkv", "b.mkv"]
+
+
+def test_listeners_see_fresh_scans_only(tmp_path):
+    cache = DirectoryCache()
+    scans = []
+    cache.add_listener(lambda dir_path, files: scans.append((dir_path, _names(files))))
+    cache.add_listener(lambda dir_path, files: 1 / 0)
+    (tmp_path / "a.mkv").touch()
+
+    cache.list_videos(tmp_path)
+    cache.list_videos(tmp_path)
+
+    assert scans == [(tmp_path, ["a.mkv"])]
+
+
+def test_trusted_cache_serves_listing_until_invalidated(tmp_path):
+    cache = DirectoryCache()
+    cache.trusted = True
+    (tmp_path / "a.mkv").touch()
+    cache.list_videos(tmp_path)
+
+    (tmp_path / "b.mkv").touch()
+    _bump_mtime(tmp_path)
+    assert _names(cache.list_videos(tmp_path)) == ["a.mkv"]
+
+    cache.invalidate(tmp_path)
+    assert _names(cache.list_videos(tmp_path)) == ["a.mkv", "b.mkv"]
+
+
+def test_cache_evicts_least_recently_used_directory(tmp_path):
+    cache = DirectoryCache(max_dirs=2)
+    dirs = []
+    for name in ("one", "two", "three"):
+        d = tmp_path / name
+        d.mkdir()
+        dirs.append(d)
+
+    cache.list_videos(dirs[0])
+    cache.list_videos(dirs[1])
+    cache.list_videos(dirs[0])
+    cache.list_videos(dirs[2])
+
+    assert dirs[0] in cache._entries
+    assert dirs[1] not in cache._entries
+    assert dirs[2] in cache._entries
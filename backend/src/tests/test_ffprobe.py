@@ -1,16 +1,43 @@
+import asyncio
 import json
+import subprocess
+import threading
+import pytest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 
 
 def _make_ffprobe_result(streams, returncode=0):
+    """A finished ffprobe process as returned by subprocess.Popen."""
     result = MagicMock()
     result.returncode = returncode
-    result.stdout = json.dumps({"streams": streams})
-    result.stderr = "some error" if returncode != 0 else ""
+    stderr = b"some error" if returncode != 0 else b""
+    result.communicate = MagicMock(return_value=(json.dumps({"streams": streams}).encode(), stderr))
+    result.poll = MagicMock(return_value=returncode)
     return result
 
 
+class _HangingProcess:
+    """An ffprobe that never finishes (e.g. stuck reading a sleeping disk) until killed."""
+
+    def __init__(self):
+        self.returncode = None
+        self.killed = threading.Event()
+
+    def communicate(self, timeout=None):
+        if not self.killed.wait(timeout):
+            raise subprocess.TimeoutExpired("ffprobe", timeout)
+        return b"", b""
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+        self.killed.set()
+
+
 async def test_probe_file_returns_audio_and_subtitle_streams(tmp_path):
     from app.core.ffprobe import probe_file
 
@@ -20,7 +47,7 @@ async def test_probe_file_returns_audio_and_subtitle_streams(tmp_path):
         {"codec_type": "subtitle", "index": 2, "tags": {"language": "fra", "title": "French"}},
     ]
 
-    with patch("app.core.ffprobe.subprocess.run", return_value=_make_ffprobe_result(streams)):
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_make_ffprobe_result(streams)):
         result = await probe_file(tmp_path / "test.mkv")
 
     assert len(result["audio"]) == 1
@@ -43,7 +70,7 @@ async def test_probe_file_ignores_non_audio_subtitle_streams(tmp_path):
         {"codec_type": "data", "index": 3, "tags": {}},
     ]
 
-    with patch("app.core.ffprobe.subprocess.run", return_value=_make_ffprobe_result(streams)):
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_make_ffprobe_result(streams)):
         result = await probe_file(tmp_path / "test.mkv")
 
     assert result["audio"] == []
@@ -53,7 +80,7 @@ async def test_probe_file_ignores_non_audio_subtitle_streams(tmp_path):
 async def test_probe_file_nonzero_returncode_returns_empty(tmp_path):
     from app.core.ffprobe import probe_file
 
-    with patch("app.core.ffprobe.subprocess.run", return_value=_make_ffprobe_result([], returncode=1)):
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_make_ffprobe_result([], returncode=1)):
         result = await probe_file(tmp_path / "fail.mkv")
 
     assert result == {"audio": [], "subtitle": []}
@@ -67,7 +94,7 @@ async def test_probe_file_skips_stream_missing_index(tmp_path):
         {"codec_type": "audio", "tags": {"language": "eng", "title": "English"}},
     ]
 
-    with patch("app.core.ffprobe.subprocess.run", return_value=_make_ffprobe_result(streams)):
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_make_ffprobe_result(streams)):
         result = await probe_file(tmp_path / "test.mkv")
 
     assert result["audio"] == []
@@ -80,8 +107,98 @@ async def test_probe_file_language_defaults_to_unknown(tmp_path):
         {"codec_type": "audio", "index": 1, "tags": {}},  # no "language" tag
     ]
 
-    with patch("app.core.ffprobe.subprocess.run", return_value=_make_ffprobe_result(streams)):
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_make_ffprobe_result(streams)):
         result = await probe_file(tmp_path / "test.mkv")
 
     assert len(result["audio"]) == 1
     assert result["audio"][0].language == "unknown"
+
+
+def test_fast_profile_requests_only_needed_entries(monkeypatch):
+    from app.core import ffprobe
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_FAST_PROBESIZE", 4096)
+    cmd = ffprobe.build_ffprobe_command(Path("/media/a.mkv"), "fast")
+
+    assert cmd[0] == "ffprobe"
+    assert cmd[-1] == "/media/a.mkv"
+    assert cmd[cmd.index("-probesize") + 1] == "4096"
+    assert "-analyzeduration" in cmd
+    assert cmd[cmd.index("-show_entries") + 1] == "stream=index,codec_type:stream_tags=language,title"
+    assert "-show_streams" not in cmd
+
+
+def test_full_profile_shows_all_stream_fields():
+    from app.core import ffprobe
+
+    cmd = ffprobe.build_ffprobe_command(Path("/media/a.mkv"), "full")
+
+    assert "-show_streams" in cmd
+    assert "-probesize" not in cmd
+
+
+def test_choose_profile(monkeypatch):
+    from app.core import ffprobe
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_PROFILE", "fast")
+    assert ffprobe.choose_profile(Path("a.mkv")) == "fast"
+    assert ffprobe.choose_profile(Path("a.MP4")) == "fast"
+    # MPEG-TS has no header listing the streams
+    assert ffprobe.choose_profile(Path("a.ts")) == "full"
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_PROFILE", "full")
+    assert ffprobe.choose_profile(Path("a.mkv")) == "full"
+
+
+async def test_failed_fast_probe_is_retried_with_full_profile(tmp_path, monkeypatch):
+    from app.core.ffprobe import probe_file
+    from app.core import ffprobe
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_PROFILE", "fast")
+    streams = [{"codec_type": "audio", "index": 1, "tags": {"language": "eng"}}]
+    results = [_make_ffprobe_result([], returncode=1), _make_ffprobe_result(streams)]
+
+    with patch("app.core.ffprobe.subprocess.Popen", side_effect=results) as run:
+        result = await probe_file(tmp_path / "odd.mkv")
+
+    assert "-show_entries" in run.call_args_list[0].args[0]
+    assert "-show_streams" in run.call_args_list[1].args[0]
+    assert result["audio"][0].language == "eng"
+
+
+async def test_probe_times_out_and_kills_ffprobe(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(ffprobe.settings, "PROBE_PROFILE", "fast")
+    process = _HangingProcess()
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=process) as run:
+        with pytest.raises(ffprobe.ProbeError, match="timed out"):
+            await ffprobe._run_ffprobe(tmp_path / "sleepy.mkv")
+
+    assert process.returncode == -9
+    # A timed-out fast probe is not retried with the full profile
+    assert run.call_count == 1
+
+
+async def test_cancelled_probe_kills_ffprobe(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    monkeypatch.setattr(ffprobe.settings, "PROBE_TIMEOUT_SECONDS", 0)
+    process = _HangingProcess()
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=process):
+        task = asyncio.create_task(ffprobe._run_ffprobe(tmp_path / "abandoned.mkv"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The probe thread gives its slot back once the killed ffprobe has exited
+        for _ in range(100):
+            if ffprobe.probe_pool.stats().active == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    assert process.returncode == -9
+    assert ffprobe.probe_pool.stats().active == 0
@@ -46,6 +46,8 @@ async def test_enqueue_creates_pending_file(queue, mock_job_store, tmp_media):
 
     pending_file = tmp_media / "job-data" / "pending" / f"{job_id}.json"
     assert pending_file.exists()
+    # Renamed into place, nothing left under the temporary name
+    assert not pending_file.with_suffix(".tmp").exists()
 
     with open(pending_file, encoding="utf-8") as f:
         payload = json.load(f)
@@ -96,3 +98,36 @@ async def test_enqueue_saves_job_with_pending_status(queue, mock_job_store):
     saved_job = mock_job_store.save_job.call_args[0][0]
     assert saved_job.status == "pending"
     assert saved_job.overall_percent == 0.0
+
+
+async def test_enqueue_writes_scheduling_fields(queue, mock_job_store, tmp_path, monkeypatch):
+    from app.core import config
+
+    (tmp_path / "Show").mkdir()
+    (tmp_path / "Show" / "e1.mkv").write_bytes(b"x" * 100)
+    (tmp_path / "Show" / "e2.mkv").write_bytes(b"x" * 50)
+    (tmp_path / "Show" / "notes.txt").write_bytes(b"x" * 1000)
+    # Listed by the library but not remuxed by the worker for a folder job
+    (tmp_path / "Show" / "e3.ts").write_bytes(b"x" * 1000)
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", tmp_path)
+
+    def payload(job_id):
+        with open(queue.pending_dir / f"{job_id}.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    base = {"output_dir": "Output", "audio_languages": ["eng"], "subtitle_languages": []}
+    first = payload(await queue.enqueue(ProcessRequest(dir="/Show", **base)))
+    second = payload(await queue.enqueue(ProcessRequest(files=["/Show/e2.mkv", "/Show/gone.mkv"], priority=5, **base)))
+
+    assert first["estimated_bytes"] == 150
+    assert first["priority"] == 0
+    assert second["estimated_bytes"] == 50
+    assert second["priority"] == 5
+    assert second["sequence"] > first["sequence"]
+    assert second["enqueued_at"] >= first["enqueued_at"]
+
+
+@pytest.mark.parametrize("priority", [-101, 101])
+def test_priority_is_bounded(priority):
+    with pytest.raises(ValueError):
+        ProcessRequest(dir="/Show", output_dir="Output", audio_languages=[], subtitle_languages=[], priority=priority)
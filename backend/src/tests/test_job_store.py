@@ -1,5 +1,9 @@
+import json
+import time
+
 import pytest
 
+from worker.scheduler import PendingQueue
 from app.core.jobs.store import JobStore
 from app.core.models import JobStatus
 
@@ -8,6 +12,7 @@ from app.core.models import JobStatus
 def job_store(tmp_media):
     store = JobStore.__new__(JobStore)
     store.status_dir = tmp_media / "job-data" / "status"
+    store.pending_queue = PendingQueue(tmp_media / "job-data" / "pending")
     return store
 
 
@@ -71,3 +76,24 @@ def test_list_active_jobs_returns_only_pending_and_processing(job_store):
     assert "active-processing" in active_ids
     assert "active-completed" not in active_ids
     assert "active-failed" not in active_ids
+
+
+def test_pending_jobs_report_queue_position(tmp_path):
+    store = JobStore.__new__(JobStore)
+    store.status_dir = tmp_path / "status"
+    store.pending_queue = PendingQueue(tmp_path / "pending")
+    (tmp_path / "pending").mkdir()
+    now = time.time()
+    for job_id, fields in {
+        "big": {"sequence": 1, "estimated_bytes": 10_000},
+        "small": {"sequence": 2, "estimated_bytes": 10},
+        "urgent": {"sequence": 3, "estimated_bytes": 10_000, "priority": 1},
+    }.items():
+        (tmp_path / "pending" / f"{job_id}.json").write_text(json.dumps({"job_id": job_id, "enqueued_at": now, **fields}))
+        store.save_job(_make_job(job_id, "pending"))
+    store.save_job(_make_job("running", "processing"))
+
+    positions = {j.job_id: j.queue_position for j in store.list_active_jobs()}
+
+    assert positions == {"urgent": 1, "small": 2, "big": 3, "running": None}
+    assert store.get_job("small").queue_position == 2
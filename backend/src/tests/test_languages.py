@@ -0,0 +1,44 @@
+import pytest
+
+from app.api.routes_library import _rel_dir
+from app.core.probe_cache import FileIdentity, probe_cache
+
+
+@pytest.fixture(scope="module")
+def library(tmp_media):
+    root = tmp_media / "input" / "Library"
+    (root / "Anime" / "S01").mkdir(parents=True, exist_ok=True)
+    (root / "Movies").mkdir(exist_ok=True)
+    return root
+
+
+def test_languages_recursive_rollup(library, app_client, make_streams):
+    probe_cache.put(library / "Anime" / "S01" / "e1.mkv", FileIdentity(1, 1, 101), make_streams(["jpn", "eng"], ["eng"]))
+    probe_cache.put(library / "Anime" / "S01" / "e2.mkv", FileIdentity(1, 1, 102), make_streams(["jpn"], ["eng", "spa"]))
+    probe_cache.put(library / "Movies" / "m.mkv", FileIdentity(1, 1, 103), make_streams(["eng"]))
+
+    data = app_client.get("/api/languages", params={"dir": "/Library"}).json()
+
+    assert data["files"] == 3
+    assert data["languages"]["eng"] == {"files": 3, "audio": 2, "subtitle": 2}
+    assert data["languages"]["jpn"] == {"files": 2, "audio": 2, "subtitle": 0}
+    assert data["directories"] == {
+        "/Library/Anime/S01": {"eng": 2, "jpn": 2, "spa": 1},
+        "/Library/Movies": {"eng": 1},
+    }
+
+
+def test_languages_non_recursive(library, app_client):
+    data = app_client.get("/api/languages", params={"dir": "/Library/Anime", "recursive": "false"}).json()
+
+    assert data["files"] == 0
+    assert data["languages"] == {}
+
+
+def test_rel_dir_of_folder_outside_input_root(library):
+    assert _rel_dir(str(library / "Anime") + "/") == "/Library/Anime"
+    assert _rel_dir("/elsewhere/Anime/") is None
+
+
+def test_languages_rejects_missing_directory(app_client):
+    assert app_client.get("/api/languages", params={"dir": "/NoSuchFolder"}).status_code == 400
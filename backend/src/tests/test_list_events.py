@@ -0,0 +1,127 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.core import config
+
+
+# Query defaults are not applied when the route is called directly
+PAGE_ALL = {"offset": 0, "limit": None, "sort": "name", "order": "asc"}
+
+
+@pytest.fixture
+def season(tmp_path, monkeypatch):
+    root = tmp_path / "input"
+    folder = root / "Show"
+    folder.mkdir(parents=True)
+    for name in ("e1.mkv", "e2.mkv", "e3.mkv"):
+        (folder / name).touch()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    return folder
+
+
+async def test_list_events_sends_listing_then_files_as_probed(season, make_streams, fake_esr):
+    from app.api.routes_list import list_directory_events
+
+    delays = {"e1.mkv": 0.05, "e2.mkv": 0.0, "e3.mkv": 0.02}
+    langs = {"e1.mkv": "eng", "e2.mkv": "fra", "e3.mkv": "eng"}
+
+    async def fake_probe(path, identity=None):
+        await asyncio.sleep(delays[path.name])
+        return make_streams([langs[path.name]])
+
+    captured = {}
+    with patch("app.api.routes_list.EventSourceResponse", fake_esr(captured)), \
+         patch("app.api.routes_list.probe_file", fake_probe):
+        await list_directory_events("Show", **PAGE_ALL)
+        events = [event async for event in captured["gen"]]
+
+    assert [e["event"] for e in events] == ["listing", "file", "file", "file", "languages"]
+
+    listing = json.loads(events[0]["data"])
+    assert listing["dir"] == "Show"
+    assert [f["name"] for f in listing["files"]] == ["e1.mkv", "e2.mkv", "e3.mkv"]
+    assert all(f["audio_streams"] == [] for f in listing["files"])
+
+    # Fastest probe first, slowest last
+    probed = [json.loads(e["data"]) for e in events[1:4]]
+    assert [f["name"] for f in probed] == ["e2.mkv", "e3.mkv", "e1.mkv"]
+    assert probed[0]["rel_path"] == "/Show/e2.mkv"
+    assert probed[0]["audio_streams"][0]["language"] == "fra"
+
+    assert json.loads(events[4]["data"]) == ["eng", "fra"]
+
+
+async def test_list_events_cancels_probes_when_client_disconnects(season, fake_esr):
+    from app.api.routes_list import list_directory_events
+
+    cancelled = []
+
+    async def slow_probe(path, identity=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(path.name)
+            raise
+
+    captured = {}
+    with patch("app.api.routes_list.EventSourceResponse", fake_esr(captured)), \
+         patch("app.api.routes_list.probe_file", slow_probe):
+        await list_directory_events("Show", **PAGE_ALL)
+        gen = captured["gen"]
+        first = await gen.__anext__()
+        assert first["event"] == "listing"
+        next_event = asyncio.ensure_future(gen.__anext__())
+        await asyncio.sleep(0.01)
+        next_event.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await next_event
+        await gen.aclose()
+        await asyncio.sleep(0)
+
+    assert sorted(cancelled) == ["e1.mkv", "e2.mkv", "e3.mkv"]
+
+
+async def test_list_events_empty_directory(tmp_path, monkeypatch, fake_esr):
+    from app.api.routes_list import list_directory_events
+
+    (tmp_path / "Empty").mkdir()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", tmp_path)
+
+    captured = {}
+    with patch("app.api.routes_list.EventSourceResponse", fake_esr(captured)):
+        await list_directory_events("Empty", **PAGE_ALL)
+        events = [event async for event in captured["gen"]]
+
+    assert [e["event"] for e in events] == ["listing", "languages"]
+    assert json.loads(events[1]["data"]) == []
+
+
+def test_list_events_invalid_path(app_client):
+    response = app_client.get("/api/list/events?dir=InvalidPath")
+    assert response.status_code == 400
+
+
+async def test_list_events_streams_only_the_requested_page(season, make_streams, fake_esr):
+    from app.api.routes_list import list_directory_events
+
+    probed = []
+
+    async def fake_probe(path, identity=None):
+        probed.append(path.name)
+        return make_streams(["eng"])
+
+    captured = {}
+    with patch("app.api.routes_list.EventSourceResponse", fake_esr(captured)), \
+         patch("app.api.routes_list.probe_file", fake_probe):
+        await list_directory_events("Show", **{**PAGE_ALL, "limit": 2, "order": "desc"})
+        events = [event async for event in captured["gen"]]
+
+    listing = json.loads(events[0]["data"])
+    assert [f["name"] for f in listing["files"]] == ["e3.mkv", "e2.mkv"]
+    assert listing["total"] == 3
+    assert listing["next_offset"] == 2
+    assert sorted(probed) == ["e2.mkv", "e3.mkv"]
+    assert [e["event"] for e in events] == ["listing", "file", "file", "languages"]
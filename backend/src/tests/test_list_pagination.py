@@ -0,0 +1,138 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.core.probe_cache import FileIdentity, probe_cache
+
+
+@pytest.fixture(scope="module")
+def paged_dir(tmp_media):
+    folder = tmp_media / "input" / "Paged"
+    folder.mkdir(exist_ok=True)
+    # Sizes and mtimes run opposite to the names
+    for i, name in enumerate(["a.mkv", "b.mkv", "c.mkv", "d.mkv", "e.mkv"]):
+        path = folder / name
+        path.write_bytes(b"x" * (50 - i * 10))
+        os.utime(path, ns=(1_000_000_000, (10 - i) * 1_000_000_000))
+    return folder
+
+
+@pytest.fixture
+def fake_probe(make_streams):
+    async def _probe(path, identity=None):
+        return make_streams(["eng"])
+    return _probe
+
+
+def test_list_returns_requested_page_only(paged_dir, app_client, fake_probe):
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe) as probe:
+        response = app_client.get("/api/list", params={"dir": "Paged", "offset": 1, "limit": 2})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [f["name"] for f in data["files"]] == ["b.mkv", "c.mkv"]
+    assert data["total"] == 5
+    assert data["offset"] == 1
+    assert data["next_offset"] == 3
+    # Only the page is probed
+    assert sorted(call.args[0].name for call in probe.call_args_list) == ["b.mkv", "c.mkv"]
+
+
+def test_list_last_page_has_no_next_offset(paged_dir, app_client, fake_probe):
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe):
+        data = app_client.get("/api/list", params={"dir": "Paged", "offset": 4, "limit": 2}).json()
+
+    assert [f["name"] for f in data["files"]] == ["e.mkv"]
+    assert data["next_offset"] is None
+
+
+def test_list_without_limit_returns_everything(paged_dir, app_client, fake_probe):
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe) as probe:
+        data = app_client.get("/api/list", params={"dir": "Paged"}).json()
+
+    assert len(data["files"]) == 5
+    assert data["total"] == 5
+    assert data["next_offset"] is None
+    assert probe.call_count == 5
+
+
+@pytest.mark.parametrize("sort, order, expected", [
+    ("name", "desc", ["e.mkv", "d.mkv"]),
+    ("size", "asc", ["e.mkv", "d.mkv"]),
+    ("size", "desc", ["a.mkv", "b.mkv"]),
+    ("mtime", "asc", ["e.mkv", "d.mkv"]),
+])
+def test_list_sorting(paged_dir, app_client, fake_probe, sort, order, expected):
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe):
+        data = app_client.get(
+            "/api/list", params={"dir": "Paged", "limit": 2, "sort": sort, "order": order}
+        ).json()
+
+    assert [f["name"] for f in data["files"]] == expected
+
+
+def test_list_page_languages_include_cached_files_of_other_pages(paged_dir, app_client, fake_probe, make_streams):
+    other = paged_dir / "e.mkv"
+    probe_cache.put(other, FileIdentity.of(other), make_streams(["jpn"]))
+    try:
+        with patch("app.api.routes_list.probe_file", side_effect=fake_probe):
+            data = app_client.get("/api/list", params={"dir": "Paged", "limit": 2}).json()
+    finally:
+        probe_cache.discard(other)
+
+    assert sorted(data["languages"]) == ["eng", "jpn"]
+
+
+def test_list_probes_files_rewritten_in_place(tmp_media, app_client, fake_probe):
+    folder = tmp_media / "input" / "Rewritten"
+    folder.mkdir(exist_ok=True)
+    movie = folder / "movie.mkv"
+    movie.write_bytes(b"old")
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe):
+        app_client.get("/api/list", params={"dir": "Rewritten"})
+
+    # Same name and directory mtime, so the cached listing is still served
+    dir_mtime = folder.stat().st_mtime_ns
+    with open(movie, "r+b") as f:
+        f.write(b"remuxed")
+    os.utime(folder, ns=(dir_mtime, dir_mtime))
+    with patch("app.api.routes_list.probe_file", side_effect=fake_probe) as probe:
+        app_client.get("/api/list", params={"dir": "Rewritten"})
+
+    assert probe.call_args.args[1] == FileIdentity.of(movie)
+    assert probe.call_args.args[1].size == len(b"remuxed")
+
+
+def test_list_rejects_invalid_paging(app_client):
+    assert app_client.get("/api/list", params={"dir": "Paged", "offset": -1}).status_code == 422
+    assert app_client.get("/api/list", params={"dir": "Paged", "limit": 0}).status_code == 422
+    assert app_client.get("/api/list", params={"dir": "Paged", "sort": "color"}).status_code == 422
+
+
+async def test_list_cancels_probes_when_client_disconnects(monkeypatch, tmp_path):
+    import asyncio
+    from fastapi import HTTPException
+    from app.api import routes_list
+
+    monkeypatch.setattr(routes_list, "DISCONNECT_POLL_SECONDS", 0.01)
+    cancelled = asyncio.Event()
+
+    async def hanging_probe(path, identity=None):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    class GoneRequest:
+        async def is_disconnected(self):
+            return True
+
+    page = [(None, tmp_path / "a.mkv", FileIdentity(1, 2, 3))]
+    with patch("app.api.routes_list.probe_file", side_effect=hanging_probe):
+        with pytest.raises(HTTPException) as exc:
+            await routes_list._probe_page(GoneRequest(), page)
+
+    assert exc.value.status_code == 499
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
@@ -0,0 +1,267 @@
+import json
+import shutil
+import struct
+import subprocess
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from app.core import ffprobe
+from app.core.config import settings
+from app.core.media_headers import parse_streams
+
+
+# --- Minimal Matroska writer ---
+
+def _ebml(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (0x01 << 56 | len(payload)).to_bytes(8, "big") + payload
+
+
+def _ebml_uint(element_id: int, value: int) -> bytes:
+    return _ebml(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def _ebml_str(element_id: int, value: str) -> bytes:
+    return _ebml(element_id, value.encode("utf-8"))
+
+
+def _mkv_track(track_type: int, codec: str, language=None, name=None, extra=b"") -> bytes:
+    payload = _ebml_uint(0xD7, 1) + _ebml_uint(0x83, track_type) + _ebml_str(0x86, codec)
+    if language is not None:
+        payload += _ebml_str(0x22B59C, language)
+    if name is not None:
+        payload += _ebml_str(0x536E, name)
+    return _ebml(0xAE, payload + extra)
+
+
+def _mkv(*tracks: bytes, doc_type="matroska", tracks_after_cluster=False) -> bytes:
+    header = _ebml(0x1A45DFA3, _ebml_str(0x4282, doc_type))
+    info = _ebml(0x1549A966, _ebml_uint(0x2AD7B1, 1000000))
+    tracks_element = _ebml(0x1654AE6B, b"".join(tracks))
+    cluster = _ebml(0x1F43B675, _ebml_uint(0xE7, 0) + b"\0" * 64)
+    if not tracks_after_cluster:
+        return header + _ebml(0x18538067, info + tracks_element + cluster)
+    # SeekHead (fixed size) pointing past the Cluster, like a remuxed file with trailing Tracks
+    seek_head_len = len(_ebml(0x114D9B74, _ebml(0x4DBB, _ebml(0x53AB, b"\x16\x54\xae\x6b") + _ebml_uint(0x53AC, 1 << 24))))
+    position = seek_head_len + len(info) + len(cluster)
+    seek_head = _ebml(0x114D9B74, _ebml(0x4DBB, _ebml(0x53AB, b"\x16\x54\xae\x6b") + _ebml(0x53AC, position.to_bytes(4, "big"))))
+    assert len(seek_head) == seek_head_len
+    return header + _ebml(0x18538067, seek_head + info + cluster + tracks_element)
+
+
+# --- Minimal MP4 writer ---
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def _mp4_lang(code: str) -> int:
+    return sum((ord(c) - 0x60) << shift for c, shift in zip(code, (10, 5, 0)))
+
+
+def _mp4_trak(handler: bytes, language="und", name=None) -> bytes:
+    mdhd = _box(b"mdhd", b"\0" * 4 + struct.pack(">IIII", 0, 0, 1000, 0) + struct.pack(">HH", _mp4_lang(language), 0))
+    hdlr = _box(b"hdlr", b"\0" * 8 + handler + b"\0" * 12 + b"Handler\0")
+    trak = _box(b"tkhd", b"\0" * 84) + _box(b"mdia", mdhd + hdlr)
+    if name is not None:
+        trak += _box(b"udta", _box(b"name", name.encode("utf-8")))
+    return _box(b"trak", trak)
+
+
+def _mp4(*traks: bytes, moov_last=False) -> bytes:
+    ftyp = _box(b"ftyp", b"isom\0\0\x02\0isomiso2mp41")
+    moov = _box(b"moov", _box(b"mvhd", b"\0" * 100) + b"".join(traks))
+    mdat = _box(b"mdat", b"\0" * 256)
+    return ftyp + (mdat + moov if moov_last else moov + mdat)
+
+
+def _summary(result):
+    return {
+        kind: [(s.id, s.language, s.title) for s in streams]
+        for kind, streams in result.items()
+    }
+
+
+# --- Matroska ---
+
+def test_mkv_tracks_numbered_like_ffprobe(tmp_path):
+    f = tmp_path / "a.mkv"
+    f.write_bytes(_mkv(
+        _mkv_track(1, "V_MPEG4/ISO/AVC"),
+        _mkv_track(2, "A_AAC", "eng", "Stereo"),
+        _mkv_track(2, "A_AC3", "fre"),
+        _mkv_track(0x11, "S_TEXT/UTF8", "spa", "Forced"),
+    ))
+
+    assert _summary(parse_streams(f)) == {
+        "audio": [(1, "eng", "Stereo"), (2, "fre", None)],
+        "subtitle": [(3, "spa", "Forced")],
+    }
+
+
+def test_mkv_language_defaults(tmp_path):
+    f = tmp_path / "a.webm"
+    f.write_bytes(_mkv(_mkv_track(2, "A_OPUS"), _mkv_track(2, "A_OPUS", "und"), doc_type="webm"))
+
+    # Missing Language means 'eng' in Matroska; ffprobe reports no tag for 'und'
+    assert _summary(parse_streams(f))["audio"] == [(0, "eng", None), (1, "unknown", None)]
+
+
+def test_mkv_tracks_found_through_seek_head(tmp_path):
+    f = tmp_path / "a.mkv"
+    f.write_bytes(_mkv(_mkv_track(1, "V_VP9"), _mkv_track(2, "A_OPUS", "ger"), tracks_after_cluster=True))
+
+    assert _summary(parse_streams(f))["audio"] == [(1, "ger", None)]
+
+
+@pytest.mark.parametrize("track", [
+    _mkv_track(0x10, "L_LOGO"),  # track type ffmpeg skips
+    _mkv_track(2, ""),  # no codec: skipped by ffmpeg
+    _mkv_track(2, "A_AAC", extra=_ebml(0x6D80, _ebml(0x6240, _ebml(0x5035, b"")))),  # encrypted
+    _mkv_track(2, "A_AAC", extra=_ebml(0x6D80, _ebml(0x6240, _ebml(0x5034, _ebml_uint(0x4254, 2))))),  # LZO
+])
+def test_mkv_falls_back_when_numbering_would_differ(tmp_path, track):
+    f = tmp_path / "a.mkv"
+    f.write_bytes(_mkv(_mkv_track(1, "V_MPEG4/ISO/AVC"), track))
+
+    assert parse_streams(f) is None
+
+
+def test_mkv_header_stripping_is_supported(tmp_path):
+    f = tmp_path / "a.mkv"
+    encodings = _ebml(0x6D80, _ebml(0x6240, _ebml(0x5034, _ebml_uint(0x4254, 3))))
+    f.write_bytes(_mkv(_mkv_track(2, "A_AAC", "jpn", extra=encodings)))
+
+    assert _summary(parse_streams(f))["audio"] == [(0, "jpn", None)]
+
+
+def test_truncated_and_foreign_files_return_none(tmp_path):
+    data = _mkv(_mkv_track(2, "A_AAC", "eng"))
+    truncated = tmp_path / "truncated.mkv"
+    truncated.write_bytes(data[:40])
+    garbage = tmp_path / "garbage.mkv"
+    garbage.write_bytes(b"not a video file")
+    other = tmp_path / "a.avi"
+    other.write_bytes(b"RIFF")
+
+    assert parse_streams(truncated) is None
+    assert parse_streams(garbage) is None
+    assert parse_streams(other) is None
+    assert parse_streams(tmp_path / "missing.mkv") is None
+
+
+# --- MP4 ---
+
+def test_mp4_tracks(tmp_path):
+    f = tmp_path / "a.mp4"
+    f.write_bytes(_mp4(
+        _mp4_trak(b"vide", "und"),
+        _mp4_trak(b"soun", "eng", "Surround"),
+        _mp4_trak(b"soun", "fra"),
+        _mp4_trak(b"sbtl", "deu"),
+        _mp4_trak(b"text", "ita", "Signs"),
+    ))
+
+    assert _summary(parse_streams(f)) == {
+        "audio": [(1, "eng", "Surround"), (2, "fra", None)],
+        "subtitle": [(3, "deu", None), (4, "ita", "Signs")],
+    }
+
+
+def test_mp4_moov_after_mdat(tmp_path):
+    f = tmp_path / "a.m4v"
+    f.write_bytes(_mp4(_mp4_trak(b"vide"), _mp4_trak(b"soun", "und"), moov_last=True))
+
+    # ffprobe reports 'und' as-is for MP4
+    assert _summary(parse_streams(f))["audio"] == [(1, "und", None)]
+
+
+def test_mp4_chapter_tracks_fall_back(tmp_path):
+    trak = _mp4_trak(b"vide")
+    chapters = _box(b"tref", _box(b"chap", struct.pack(">I", 2)))
+    trak = _box(b"trak", trak[8:] + chapters)
+    f = tmp_path / "a.mov"
+    f.write_bytes(_mp4(trak, _mp4_trak(b"text", "eng")))
+
+    assert parse_streams(f) is None
+
+
+# --- Integration with probe_file ---
+
+async def test_probe_file_uses_parser_without_ffprobe(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROBE_NATIVE_PARSER", True)
+    f = tmp_path / "native.mkv"
+    f.write_bytes(_mkv(_mkv_track(1, "V_MPEG4/ISO/AVC"), _mkv_track(2, "A_AAC", "eng")))
+
+    with patch("app.core.ffprobe.subprocess.Popen") as run:
+        result = await ffprobe._probe(f)
+
+    run.assert_not_called()
+    assert _summary(result)["audio"] == [(1, "eng", None)]
+
+
+async def test_header_read_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROBE_NATIVE_PARSER", True)
+    monkeypatch.setattr(settings, "PROBE_TIMEOUT_SECONDS", 0.05)
+    release = threading.Event()
+
+    with patch("app.core.ffprobe.parse_streams", side_effect=lambda path: release.wait()), \
+         patch("app.core.ffprobe.subprocess.Popen") as run:
+        with pytest.raises(ffprobe.ProbeError, match="timed out"):
+            await ffprobe._probe(tmp_path / "sleepy.mkv")
+        release.set()
+
+    run.assert_not_called()
+
+
+async def test_probe_file_falls_back_to_ffprobe(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROBE_NATIVE_PARSER", True)
+    f = tmp_path / "odd.mkv"
+    f.write_bytes(b"\0" * 64)
+    streams = [{"index": 1, "codec_type": "audio", "tags": {"language": "eng"}}]
+    process = MagicMock(returncode=0)
+    process.communicate = MagicMock(return_value=(json.dumps({"streams": streams}).encode(), b""))
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=process) as run:
+        result = await ffprobe._probe(f)
+
+    run.assert_called_once()
+    assert _summary(result)["audio"] == [(1, "eng", None)]
+
+
+# --- Conformance with ffprobe ---
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None, reason="ffmpeg not installed")
+@pytest.mark.parametrize("name,subtitle_codec", [
+    ("conformance.mkv", "srt"),
+    ("conformance.webm", "webvtt"),
+    ("conformance.mp4", "mov_text"),
+    ("conformance.mov", "mov_text"),
+])
+async def test_matches_ffprobe(tmp_path, monkeypatch, name, subtitle_codec):
+    srt = tmp_path / "subs.srt"
+    srt.write_text("1\n00:00:01,000 --> 00:00:02,000\nHello\n", encoding="utf-8")
+    target = tmp_path / name
+    audio_codec = "libopus" if name.endswith(".webm") else "aac"
+    video_codec = "libvpx-vp9" if name.endswith(".webm") else "mpeg4"
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y",
+         "-f", "lavfi", "-i", "testsrc=duration=1:size=160x120:rate=5",
+         "-f", "lavfi", "-i", "sine=duration=1",
+         "-f", "lavfi", "-i", "sine=frequency=660:duration=1",
+         "-i", str(srt), "-i", str(srt),
+         "-map", "0:v", "-map", "1:a", "-map", "2:a", "-map", "3:s", "-map", "4:s",
+         "-c:v", video_codec, "-c:a", audio_codec, "-c:s", subtitle_codec,
+         "-metadata:s:a:0", "language=eng", "-metadata:s:a:0", "title=Stereo",
+         "-metadata:s:a:1", "language=fra",
+         "-metadata:s:s:0", "language=spa", "-metadata:s:s:0", "title=Forced",
+         str(target)],
+        check=True,
+    )
+
+    native = parse_streams(target)
+    monkeypatch.setattr(settings, "PROBE_PROFILE", "full")
+    expected = await ffprobe._run_ffprobe(target)
+
+    assert native is not None
+    assert _summary(native) == _summary(expected)
@@ -0,0 +1,134 @@
+import os
+import shutil
+
+import pytest
+
+from app.core import config
+from app.core.name_index import NameIndex
+from app.core.tree_index import TreeIndex
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    (root / "Movies").mkdir(parents=True)
+    (root / "Movies" / "The.Matrix.1999.mkv").touch()
+    (root / "Movies" / "The Matrix Reloaded.mkv").touch()
+    (root / "Movies" / "notes.txt").touch()
+    (root / "Shows" / "Breaking Bad" / "Season 1").mkdir(parents=True)
+    (root / "Shows" / "Breaking Bad" / "Season 1" / "S01E01.mkv").touch()
+    (root / "Shows" / "Breaking Bad" / "Season 1" / "S01E02.mkv").touch()
+    (root / "Shows" / "Matrix Docs").mkdir()
+    (root / "Shows" / "Matrix Docs" / "making of.mp4").touch()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    return root
+
+
+@pytest.fixture
+def tree(tmp_path, library):
+    idx = TreeIndex(index_file=tmp_path / "job-data" / "tree_index.json")
+    idx.build()
+    return idx
+
+
+@pytest.fixture
+def names(tree):
+    idx = NameIndex(tree)
+    idx.build()
+    return idx
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_build_indexes_video_files_only(names):
+    assert names.file_count == 5
+    assert names.search("notes") == (0, [])
+
+
+def test_search_is_case_insensitive_and_matches_all_terms(names):
+    total, results = names.search("matrix RELOADED")
+
+    assert total == 1
+    assert results == ["/Movies/The Matrix Reloaded.mkv"]
+
+
+def test_terms_can_match_folder_names(names):
+    total, results = names.search("breaking s01e02")
+
+    assert total == 1
+    assert results == ["/Shows/Breaking Bad/Season 1/S01E02.mkv"]
+
+
+def test_ranking_prefers_matches_in_the_file_name(names):
+    total, results = names.search("the matrix")
+
+    assert total == 2
+    # "The.Matrix.1999" contains the phrase once separators are ignored
+    assert results == ["/Movies/The.Matrix.1999.mkv", "/Movies/The Matrix Reloaded.mkv"]
+
+    total, results = names.search("matrix")
+    assert total == 3
+    # The folder-only match comes last
+    assert results[-1] == "/Shows/Matrix Docs/making of.mp4"
+
+
+def test_short_terms_and_limit(names):
+    total, results = names.search("s0", limit=1)
+
+    assert total == 2
+    assert results == ["/Shows/Breaking Bad/Season 1/S01E01.mkv"]
+
+
+def test_term_spanning_the_last_separator(names):
+    assert names.search("docs/making")[0] == 1
+    assert names.search("1/s01e01")[0] == 1
+
+
+def test_updates_follow_tree_index_rescans(library, tree, names):
+    season = library / "Shows" / "Breaking Bad" / "Season 1"
+    (season / "S01E03.mkv").touch()
+    (season / "S01E01.mkv").unlink()
+    _bump_mtime(season)
+    tree.refresh()
+
+    assert names.search("s01e")[1] == [
+        "/Shows/Breaking Bad/Season 1/S01E02.mkv",
+        "/Shows/Breaking Bad/Season 1/S01E03.mkv",
+    ]
+
+
+def test_removed_directories_are_dropped(library, tree, names):
+    shutil.rmtree(library / "Shows" / "Breaking Bad")
+    _bump_mtime(library / "Shows")
+    tree.refresh()
+
+    assert names.search("s01e") == (0, [])
+    assert names.file_count == 3
+
+
+def test_search_builds_index_on_first_use(tree):
+    idx = NameIndex(tree)
+
+    assert idx.search("reloaded")[0] == 1
+
+
+def test_search_endpoint(tmp_media, app_client):
+    season = tmp_media / "input" / "Searchable" / "Season 2"
+    season.mkdir(parents=True, exist_ok=True)
+    (season / "Findme.S02E05.mkv").write_bytes(b"")
+    from app.core.tree_index import tree_index
+
+    tree_index.invalidate("/Searchable")
+
+    data = app_client.get("/api/search", params={"q": "findme s02e05"}).json()
+
+    assert data["query"] == "findme s02e05"
+    assert data["total"] == 1
+    assert data["results"] == ["/Searchable/Season 2/Findme.S02E05.mkv"]
+
+
+def test_search_endpoint_requires_query(app_client):
+    assert app_client.get("/api/search").status_code == 422
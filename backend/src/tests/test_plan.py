@@ -0,0 +1,148 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core import config
+from app.core.models import PlanRequest
+from app.core.planner import AUDIO_STREAM_SHARE, plan_file
+from app.core.tree_index import TreeIndex
+
+
+def test_plan_file_keeps_streams_in_kept_languages(make_streams):
+    planned = plan_file("/a.mkv", 1_000_000, make_streams(["eng", "jpn", "rus"], ["eng", "rus"]), ["jpn"], ["eng"])
+
+    assert planned.selection.rel_path == "/a.mkv"
+    assert planned.selection.audio_stream_ids == [2]
+    assert planned.selection.subtitle_stream_ids == [10]
+    assert planned.audio_dropped == 2
+    assert planned.subtitles_dropped == 1
+    assert planned.estimated_bytes_saved >= int(1_000_000 * 2 * AUDIO_STREAM_SHARE)
+
+
+def test_plan_file_skips_files_without_anything_to_drop(make_streams):
+    assert plan_file("/a.mkv", 100, make_streams(["eng"], ["eng"]), ["eng"], ["eng"]) is None
+    assert plan_file("/b.mkv", 100, make_streams([]), ["eng"], ["eng"]) is None
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    root = tmp_path / "input"
+    for rel in ("Show/S01/e1.mkv", "Show/S01/e2.mkv", "Show/S02/e1.mkv", "Show/extra.mkv", "Other/x.mkv"):
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).touch()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    index = TreeIndex(index_file=tmp_path / "tree_index.json")
+    monkeypatch.setattr("app.api.routes_plan.tree_index", index)
+    return root
+
+
+@pytest.fixture
+def run_plan(make_streams, fake_esr):
+    """run_plan(request): calls the route and returns its events."""
+    streams = {
+        "e1.mkv": make_streams(["jpn", "eng"], ["eng", "spa"]),
+        "e2.mkv": make_streams(["jpn"], ["eng"]),
+        "extra.mkv": make_streams([]),
+        "x.mkv": make_streams(["eng", "fra"]),
+    }
+
+    async def fake_probe(path, identity=None, raise_errors=False):
+        await asyncio.sleep(0)
+        return streams[path.name]
+
+    async def _run(request: PlanRequest):
+        from app.api.routes_plan import plan
+
+        captured = {}
+        with patch("app.api.routes_plan.EventSourceResponse", fake_esr(captured)), \
+             patch("app.api.routes_plan.probe_file", fake_probe), \
+             patch("app.core.preflight.probe_file", fake_probe), \
+             patch("app.core.preflight.probe_cache.quarantine_reason", return_value=None):
+            await plan(request)
+            return [event async for event in captured["gen"]]
+    return _run
+
+
+async def test_plan_streams_files_and_summary(library, run_plan):
+    events = await run_plan(PlanRequest(
+        dir="/Show", output_dir="/out", audio_languages=["jpn"], subtitle_languages=["eng"],
+    ))
+
+    assert [e["event"] for e in events] == ["file", "file", "collision", "summary"]
+    summary = json.loads(events[-1]["data"])
+    assert summary["files"] == 4
+    assert summary["files_changed"] == 2
+    assert summary["files_without_streams"] == 1
+    # S01/e1 drops eng audio and spa subtitles, S02/e1 the same
+    assert summary["streams_dropped"] == 4
+    assert summary["job_id"] is None
+    # S02/e1.mkv has the same output name; it is reported instead
+    assert summary["request"]["selections"] == [
+        {"rel_path": "/Show/S01/e1.mkv", "audio_stream_ids": [1], "subtitle_stream_ids": [10]},
+    ]
+    assert summary["request"]["output_dir"] == "/out"
+
+
+async def test_plan_non_recursive(library, run_plan):
+    events = await run_plan(PlanRequest(
+        dir="/Show/S01", recursive=False, output_dir="/out", audio_languages=["jpn"], subtitle_languages=["eng"],
+    ))
+
+    summary = json.loads(events[-1]["data"])
+    assert summary["files"] == 2
+    assert [s["rel_path"] for s in summary["request"]["selections"]] == ["/Show/S01/e1.mkv"]
+
+
+async def test_plan_can_enqueue(library, run_plan):
+    with patch("app.api.routes_plan.job_queue.enqueue", AsyncMock(return_value="job-1")) as enqueue, \
+         patch("app.api.routes_plan.event_manager.emit_global", AsyncMock()), \
+         patch("app.api.routes_plan.job_store.list_active_jobs", return_value=[]):
+        events = await run_plan(PlanRequest(
+            dir="/Other", output_dir="/out", audio_languages=["eng"], subtitle_languages=[], enqueue=True,
+        ))
+
+    summary = json.loads(events[-1]["data"])
+    assert summary["job_id"] == "job-1"
+    request = enqueue.call_args.args[0]
+    assert request.selections[0].rel_path == "/Other/x.mkv"
+    assert request.selections[0].audio_stream_ids == [1]
+
+
+async def test_plan_reports_files_with_colliding_outputs(library, run_plan):
+    with patch("app.api.routes_plan.job_queue.enqueue", AsyncMock(return_value="job-1")) as enqueue, \
+         patch("app.api.routes_plan.event_manager.emit_global", AsyncMock()), \
+         patch("app.api.routes_plan.job_store.list_active_jobs", return_value=[]):
+        events = await run_plan(PlanRequest(
+            dir="/Show", output_dir="/out", audio_languages=["jpn"], subtitle_languages=["eng"], enqueue=True,
+        ))
+
+    # S01/e1.mkv and S02/e1.mkv would both be written to /out/e1.mkv
+    assert [e["event"] for e in events] == ["file", "file", "collision", "summary"]
+    assert json.loads(events[2]["data"]) == {"rel_path": "/Show/S02/e1.mkv", "collides_with": "/Show/S01/e1.mkv"}
+    summary = json.loads(events[-1]["data"])
+    assert summary["files_changed"] == 2
+    assert summary["files_colliding"] == 1
+    assert summary["errors"] == []
+    assert summary["job_id"] == "job-1"
+    assert [s.rel_path for s in enqueue.call_args.args[0].selections] == ["/Show/S01/e1.mkv"]
+
+
+async def test_plan_is_not_enqueued_when_preflight_fails(library, run_plan):
+    with patch("app.api.routes_plan.job_queue.enqueue", AsyncMock(return_value="job-1")) as enqueue:
+        events = await run_plan(PlanRequest(
+            dir="/Other", output_dir="/../out", audio_languages=["eng"], subtitle_languages=[], enqueue=True,
+        ))
+
+    summary = json.loads(events[-1]["data"])
+    enqueue.assert_not_called()
+    assert summary["job_id"] is None
+    assert [e["type"] for e in summary["errors"]] == ["path_invalid"]
+
+
+def test_plan_rejects_invalid_directory(app_client):
+    response = app_client.post("/api/plan", json={
+        "dir": "/NoSuchFolder", "output_dir": "/out", "audio_languages": [], "subtitle_languages": [],
+    })
+    assert response.status_code == 400
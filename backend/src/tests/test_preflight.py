@@ -0,0 +1,158 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.models import StreamInfo
+from app.core.probe_cache import FileIdentity, probe_cache
+
+
+@pytest.fixture(scope="module")
+def library(tmp_media):
+    root = tmp_media / "input" / "Preflight"
+    for rel in ("A/movie.mkv", "B/movie.mkv", "A/other.mkv", "A/broken.mkv"):
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_bytes(b"video")
+    return root
+
+
+@pytest.fixture
+def enqueue():
+    with patch("app.api.routes_process.job_queue.enqueue", AsyncMock(return_value="job-1")) as enqueue, \
+         patch("app.api.routes_process.event_manager.emit_global", AsyncMock()):
+        yield enqueue
+
+
+def _cache_streams(path):
+    probe_cache.put(path, FileIdentity.of(path), {
+        "audio": [
+            StreamInfo(id=1, language="eng", codec_type="audio"),
+            StreamInfo(id=2, language="jpn", codec_type="audio"),
+        ],
+        "subtitle": [StreamInfo(id=3, language="eng", codec_type="subtitle")],
+    })
+
+
+def _post(app_client, **payload):
+    body = {"output_dir": "/cleaned", "audio_languages": ["eng"], "subtitle_languages": [], **payload}
+    return app_client.post("/api/process", json=body)
+
+
+def _selection(rel_path, audio=(), subtitle=()):
+    return {"rel_path": rel_path, "audio_stream_ids": list(audio), "subtitle_stream_ids": list(subtitle)}
+
+
+def test_valid_selection_is_enqueued(library, app_client, enqueue):
+    _cache_streams(library / "A" / "movie.mkv")
+
+    response = _post(app_client, selections=[_selection("/Preflight/A/movie.mkv", [1, 2], [3])])
+
+    assert response.status_code == 200
+    assert response.json() == {"jobId": "job-1"}
+
+
+def test_missing_file_is_rejected(library, app_client, enqueue):
+    response = _post(app_client, files=["/Preflight/A/other.mkv", "/Preflight/A/gone.mkv"])
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == [{
+        "loc": ["body", "files", 1],
+        "msg": "/Preflight/A/gone.mkv: file not found",
+        "type": "file_not_found",
+    }]
+    enqueue.assert_not_called()
+
+
+def test_stream_ids_are_checked_against_probe_cache(library, app_client, enqueue):
+    _cache_streams(library / "A" / "movie.mkv")
+
+    with patch("app.core.ffprobe._probe") as probe:
+        response = _post(app_client, selections=[_selection("/Preflight/A/movie.mkv", [1, 3, 7], [2])])
+
+    probe.assert_not_called()
+    assert response.status_code == 422
+    assert response.json()["detail"] == [
+        {
+            "loc": ["body", "selections", 0, "audio_stream_ids"],
+            "msg": "/Preflight/A/movie.mkv: stream 3 has codec_type subtitle, expected audio",
+            "type": "stream_type_mismatch",
+        },
+        {
+            "loc": ["body", "selections", 0, "audio_stream_ids"],
+            "msg": "/Preflight/A/movie.mkv: no stream with id 7 (audio streams: 1, 2)",
+            "type": "stream_not_found",
+        },
+        {
+            "loc": ["body", "selections", 0, "subtitle_stream_ids"],
+            "msg": "/Preflight/A/movie.mkv: stream 2 has codec_type audio, expected subtitle",
+            "type": "stream_type_mismatch",
+        },
+    ]
+    enqueue.assert_not_called()
+
+
+def test_output_collisions_are_rejected(library, app_client, enqueue):
+    response = _post(app_client, files=[
+        "/Preflight/A/movie.mkv", "/Preflight/B/movie.mkv", "/Preflight/A/other.mkv", "Preflight/A/other.mkv",
+    ])
+
+    assert response.status_code == 422
+    assert [(i["loc"], i["type"]) for i in response.json()["detail"]] == [
+        (["body", "files", 1], "output_collision"),
+        (["body", "files", 3], "duplicate_file"),
+    ]
+    assert "/cleaned/movie.mkv would also be written for /Preflight/A/movie.mkv" in response.json()["detail"][0]["msg"]
+
+
+def test_quarantined_file_is_rejected(library, app_client, enqueue):
+    broken = library / "A" / "broken.mkv"
+    probe_cache.quarantine(broken, FileIdentity.of(broken), "ffprobe exited with code 1: Invalid data")
+
+    try:
+        response = _post(app_client, selections=[_selection("/Preflight/A/broken.mkv", [1])])
+    finally:
+        probe_cache.release(broken)
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == [{
+        "loc": ["body", "selections", 0, "rel_path"],
+        "msg": "/Preflight/A/broken.mkv: file could not be probed (ffprobe exited with code 1: Invalid data)",
+        "type": "probe_failed",
+    }]
+
+
+def test_stream_check_is_skipped_when_probe_cannot_run(library, app_client, enqueue):
+    from app.core.ffprobe import ProbeError
+
+    with patch("app.core.ffprobe._probe", AsyncMock(side_effect=ProbeError("ffprobe timed out after 60s"))):
+        response = _post(app_client, selections=[_selection("/Preflight/A/other.mkv", [1])])
+
+    assert response.status_code == 200
+    enqueue.assert_called_once()
+
+
+@pytest.mark.parametrize("parallelism", [0, 9])
+def test_parallelism_out_of_range_is_rejected(library, app_client, enqueue, parallelism):
+    response = _post(app_client, files=["/Preflight/A/other.mkv"], parallelism=parallelism)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "parallelism"]
+    enqueue.assert_not_called()
+
+
+def test_paths_outside_roots_are_rejected(library, app_client, enqueue):
+    response = _post(app_client, output_dir="../../escape", files=["/../../etc/passwd"])
+
+    assert response.status_code == 422
+    assert [(i["loc"], i["type"]) for i in response.json()["detail"]] == [
+        (["body", "output_dir"], "path_invalid"),
+        (["body", "files", 0], "path_invalid"),
+    ]
+
+
+def test_folder_job_needs_existing_folder(library, app_client, enqueue):
+    assert _post(app_client, dir="/Preflight/A").status_code == 200
+
+    response = _post(app_client, dir="/Preflight/Nope")
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["type"] == "not_a_directory"
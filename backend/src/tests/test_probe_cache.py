@@ -0,0 +1,395 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.models import StreamInfo
+from app.core.probe_cache import FileIdentity, ProbeCache
+
+
+RESULT = {
+    "audio": [StreamInfo(id=1, language="eng", title="Stereo", codec_type="audio")],
+    "subtitle": [StreamInfo(id=2, language="fra", codec_type="subtitle")],
+}
+
+
+def _ffprobe_process(stdout="", returncode=0, stderr=""):
+    process = MagicMock(returncode=returncode)
+    process.communicate = MagicMock(return_value=(stdout.encode(), stderr.encode()))
+    return process
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db", max_entries=100)
+    yield cache
+    cache.close()
+
+
+def test_get_returns_result_while_identity_matches(cache, tmp_path):
+    path = tmp_path / "a.mkv"
+    cache.put(path, FileIdentity(10, 100, 7), RESULT)
+
+    assert cache.get(path, FileIdentity(10, 100, 7)) == RESULT
+
+
+@pytest.mark.parametrize("identity", [
+    FileIdentity(11, 100, 7),  # size changed
+    FileIdentity(10, 101, 7),  # rewritten in place
+    FileIdentity(10, 100, 8),  # replaced by another file
+])
+def test_get_misses_when_file_changed(cache, tmp_path, identity):
+    path = tmp_path / "a.mkv"
+    cache.put(path, FileIdentity(10, 100, 7), RESULT)
+
+    assert cache.get(path, identity) is None
+
+
+def test_put_replaces_stale_entry(cache, tmp_path):
+    path = tmp_path / "a.mkv"
+    cache.put(path, FileIdentity(10, 100, 7), RESULT)
+    cache.put(path, FileIdentity(10, 200, 7), {"audio": [], "subtitle": []})
+
+    assert cache.get(path, FileIdentity(10, 200, 7)) == {"audio": [], "subtitle": []}
+    assert len(cache) == 1
+
+
+def test_results_survive_reopen(tmp_path):
+    db_file = tmp_path / "probe_cache.db"
+    path = tmp_path / "a.mkv"
+    first = ProbeCache(db_file=db_file)
+    first.put(path, FileIdentity(1, 2, 3), RESULT)
+    first.close()
+
+    second = ProbeCache(db_file=db_file)
+    assert second.get(path, FileIdentity(1, 2, 3)) == RESULT
+    second.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db", max_entries=3)
+    paths = [tmp_path / f"{i}.mkv" for i in range(4)]
+    for i, path in enumerate(paths[:3]):
+        with patch("app.core.probe_cache.time.time", return_value=float(i)):
+            cache.put(path, FileIdentity(i, i, i), RESULT)
+    with patch("app.core.probe_cache.time.time", return_value=10000.0):
+        assert cache.get(paths[0], FileIdentity(0, 0, 0)) is not None
+    with patch("app.core.probe_cache.time.time", return_value=10001.0):
+        cache.put(paths[3], FileIdentity(3, 3, 3), RESULT)
+
+    assert len(cache) <= 3
+    assert cache.get(paths[1], FileIdentity(1, 1, 1)) is None
+    assert cache.get(paths[0], FileIdentity(0, 0, 0)) is not None
+    assert cache.get(paths[3], FileIdentity(3, 3, 3)) is not None
+    cache.close()
+
+
+def test_recent_hit_does_not_write(cache, tmp_path):
+    path = tmp_path / "a.mkv"
+    with patch("app.core.probe_cache.time.time", return_value=1000.0):
+        cache.put(path, FileIdentity(1, 2, 3), RESULT)
+    with patch("app.core.probe_cache.time.time", return_value=1060.0):
+        assert cache.get(path, FileIdentity(1, 2, 3)) == RESULT
+
+    last_used = cache._conn.execute("SELECT last_used FROM probes").fetchone()[0]
+    assert last_used == 1000.0
+
+
+def test_len_counts_rows_written_by_other_processes(cache, tmp_path):
+    cache.put(tmp_path / "a.mkv", FileIdentity(1, 2, 3), RESULT)
+    other = ProbeCache(db_file=cache.db_file)
+    other.put(tmp_path / "b.mkv", FileIdentity(4, 5, 6), RESULT)
+    other.close()
+
+    assert len(cache) == 2
+
+
+def test_discard_removes_entry(cache, tmp_path):
+    path = tmp_path / "a.mkv"
+    cache.put(path, FileIdentity(1, 2, 3), RESULT)
+
+    cache.discard(path)
+
+    assert cache.get(path, FileIdentity(1, 2, 3)) is None
+    assert len(cache) == 0
+
+
+def test_unusable_database_disables_cache(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.touch()
+    cache = ProbeCache(db_file=blocker / "probe_cache.db")
+
+    cache.put(tmp_path / "a.mkv", FileIdentity(1, 2, 3), RESULT)
+
+    assert cache.get(tmp_path / "a.mkv", FileIdentity(1, 2, 3)) is None
+
+
+async def test_probe_file_uses_cache_for_unchanged_file(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    monkeypatch.setattr(ffprobe, "probe_cache", cache)
+    video = tmp_path / "movie.mkv"
+    video.write_bytes(b"data")
+    result = _ffprobe_process(json.dumps({"streams": [
+        {"codec_type": "audio", "index": 1, "tags": {"language": "eng"}},
+    ]}))
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=result) as run:
+        first = await ffprobe.probe_file(video)
+        second = await ffprobe.probe_file(video)
+
+    assert run.call_count == 1
+    assert second == first
+    assert second["audio"][0].language == "eng"
+
+    video.write_bytes(b"changed data")
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=result) as run:
+        await ffprobe.probe_file(video)
+    assert run.call_count == 1
+    cache.close()
+
+
+async def test_probe_file_quarantines_failures_until_file_changes(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    monkeypatch.setattr(ffprobe, "probe_cache", cache)
+    # One ffprobe run per attempt (no fast -> full retry)
+    monkeypatch.setattr(ffprobe.settings, "PROBE_PROFILE", "full")
+    video = tmp_path / "broken.mkv"
+    video.touch()
+    failed = _ffprobe_process(returncode=1, stderr="[matroska] EBML header parsing failed\nInvalid data found")
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=failed) as run:
+        assert await ffprobe.probe_file(video) == {"audio": [], "subtitle": []}
+        assert await ffprobe.probe_file(video) == {"audio": [], "subtitle": []}
+
+    assert run.call_count == 1
+    assert len(cache) == 0
+    identity = FileIdentity.of(video)
+    assert cache.is_quarantined(video, identity)
+    assert cache.contains(video, identity)
+    [entry] = cache.quarantined()
+    assert entry.path == str(video)
+    assert entry.reason == "ffprobe exited with code 1: Invalid data found"
+
+    video.write_bytes(b"repaired")
+    ok = _ffprobe_process(json.dumps({"streams": [{"codec_type": "audio", "index": 1, "tags": {}}]}))
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=ok) as run:
+        result = await ffprobe.probe_file(video)
+
+    assert run.call_count == 1
+    assert result["audio"][0].id == 1
+    # A successful probe clears the quarantine entry
+    assert cache.quarantined() == []
+    cache.close()
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError(2, "No such file or directory: 'ffprobe'"), NotImplementedError()])
+async def test_probe_file_does_not_quarantine_when_ffprobe_cannot_run(tmp_path, monkeypatch, error):
+    from app.core import ffprobe
+
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    monkeypatch.setattr(ffprobe, "probe_cache", cache)
+    monkeypatch.setattr(ffprobe.settings, "PROBE_NATIVE_PARSER", False)
+    video = tmp_path / "movie.mkv"
+    video.touch()
+
+    with patch("app.core.ffprobe.subprocess.Popen", side_effect=error) as run:
+        assert await ffprobe.probe_file(video) == {"audio": [], "subtitle": []}
+        with pytest.raises(ffprobe.ProbeError, match="could not run ffprobe"):
+            await ffprobe.probe_file(video, raise_errors=True)
+
+    # Nothing recorded: every call tried again
+    assert run.call_count == 2
+    assert not cache.contains(video, FileIdentity.of(video))
+    assert cache.quarantined() == []
+    cache.close()
+
+
+async def test_probe_file_quarantines_unreadable_output(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    monkeypatch.setattr(ffprobe, "probe_cache", cache)
+    monkeypatch.setattr(ffprobe.settings, "PROBE_NATIVE_PARSER", False)
+    video = tmp_path / "movie.mkv"
+    video.touch()
+
+    with patch("app.core.ffprobe.subprocess.Popen", return_value=_ffprobe_process("not json")):
+        assert await ffprobe.probe_file(video) == {"audio": [], "subtitle": []}
+
+    [entry] = cache.quarantined()
+    assert entry.reason.startswith("unreadable ffprobe output: JSONDecodeError")
+    cache.close()
+
+
+def test_release_from_quarantine(cache, tmp_path):
+    video = tmp_path / "a.mkv"
+    cache.quarantine(video, FileIdentity(1, 2, 3), "ffprobe timed out after 30s")
+
+    assert cache.release(video)
+    assert not cache.is_quarantined(video, FileIdentity(1, 2, 3))
+    assert not cache.release(video)
+
+
+def test_folder_languages_only_counts_current_files_of_the_folder(cache, tmp_path):
+    folder = tmp_path / "Show"
+    eng = {"audio": [StreamInfo(id=1, language="eng", codec_type="audio")], "subtitle": []}
+    cache.put(folder / "e1.mkv", FileIdentity(1, 1, 1), RESULT)
+    cache.put(folder / "e2.mkv", FileIdentity(2, 2, 2), eng)
+    cache.put(folder / "Extras" / "x.mkv", FileIdentity(3, 3, 3), {"audio": [], "subtitle": [
+        StreamInfo(id=1, language="deu", codec_type="subtitle"),
+    ]})
+    cache.put(tmp_path / "Show 2" / "e1.mkv", FileIdentity(4, 4, 4), {"audio": [
+        StreamInfo(id=1, language="spa", codec_type="audio"),
+    ], "subtitle": []})
+
+    files = {
+        "e1.mkv": FileIdentity(1, 1, 1),
+        "e2.mkv": FileIdentity(2, 9, 2),  # changed since it was probed
+        "e3.mkv": FileIdentity(5, 5, 5),  # never probed
+    }
+
+    assert cache.folder_languages(folder, files) == {"eng", "fra"}
+
+
+def test_quarantine_endpoints(app_client, tmp_media):
+    from app.core.probe_cache import probe_cache
+
+    video = tmp_media / "input" / "Broken" / "bad.mkv"
+    probe_cache.quarantine(video, FileIdentity(10, 20, 30), "ffprobe exited with code 1: Invalid data found")
+
+    files = app_client.get("/api/probes/quarantine").json()
+    assert {"path": "/Broken/bad.mkv", "size": 10, "mtime_ns": 20,
+            "reason": "ffprobe exited with code 1: Invalid data found"}.items() <= files[0].items()
+
+    assert app_client.delete("/api/probes/quarantine", params={"path": "/Broken/bad.mkv"}).status_code == 200
+    assert app_client.get("/api/probes/quarantine").json() == []
+    assert app_client.delete("/api/probes/quarantine", params={"path": "/Broken/bad.mkv"}).status_code == 404
+
+
+def _stream_rows(cache):
+    return sorted(cache._connect().execute(
+        "SELECT path, dir, stream_id, codec_type, language, title FROM probe_streams"
+    ).fetchall())
+
+
+def test_probe_streams_follow_probes(cache, tmp_path):
+    video = tmp_path / "Show" / "a.mkv"
+    cache.put(video, FileIdentity(1, 2, 3), RESULT)
+
+    folder = str(tmp_path / "Show") + os.sep
+    assert _stream_rows(cache) == [
+        (str(video), folder, 1, "audio", "eng", "Stereo"),
+        (str(video), folder, 2, "subtitle", "fra", None),
+    ]
+
+    cache.put(video, FileIdentity(1, 2, 4), {"audio": [], "subtitle": RESULT["subtitle"]})
+    assert [row[2] for row in _stream_rows(cache)] == [2]
+
+    cache.discard(video)
+    assert _stream_rows(cache) == []
+
+
+def test_probe_streams_backfilled_for_existing_database(tmp_path):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    cache.put(tmp_path / "a.mkv", FileIdentity(1, 2, 3), RESULT)
+    conn = cache._connect()
+    conn.executescript("DROP TABLE probe_streams;")
+    cache.close()
+
+    reopened = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    assert len(_stream_rows(reopened)) == 2
+    reopened.close()
+
+
+def test_schema_upgrade_drops_derived_tables(tmp_path):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    cache.put(tmp_path / "a.mkv", FileIdentity(1, 2, 3), RESULT)
+    conn = cache._connect()
+    conn.execute("PRAGMA user_version=1")
+    conn.commit()
+    cache.close()
+
+    reopened = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    assert len(reopened) == 0
+    assert _stream_rows(reopened) == []
+    assert reopened._connect().execute("SELECT COUNT(*) FROM probe_files").fetchone()[0] == 0
+    reopened.close()
+
+
+def test_stream_folder_of_name_with_backslash(cache, tmp_path):
+    show = tmp_path / "Show"
+    cache.put(show / "a\\b.mkv", FileIdentity(1, 1, 1), RESULT)
+
+    files, rows = cache.language_index(show, recursive=False)
+
+    assert files == 1
+    assert {row[0] for row in rows} == {str(show) + os.sep}
+
+
+def test_language_index(cache, tmp_path):
+    eng_jpn = {
+        "audio": [StreamInfo(id=1, language="jpn", codec_type="audio")],
+        "subtitle": [StreamInfo(id=2, language="eng", codec_type="subtitle")],
+    }
+    eng = {"audio": [StreamInfo(id=1, language="eng", codec_type="audio")], "subtitle": []}
+    cache.put(tmp_path / "Show" / "e1.mkv", FileIdentity(1, 1, 1), eng_jpn)
+    cache.put(tmp_path / "Show" / "e2.mkv", FileIdentity(1, 1, 2), eng)
+    cache.put(tmp_path / "Show" / "S02" / "e1.mkv", FileIdentity(1, 1, 3), eng)
+    cache.put(tmp_path / "Show Extras" / "x.mkv", FileIdentity(1, 1, 4), eng)
+
+    files, rows = cache.language_index(tmp_path / "Show", recursive=True)
+    show = str(tmp_path / "Show") + os.sep
+    season = str(tmp_path / "Show" / "S02") + os.sep
+    assert files == 3
+    assert sorted(rows) == [(show, "eng", 2, 1, 1), (show, "jpn", 1, 1, 0), (season, "eng", 1, 1, 0)]
+
+    files, rows = cache.language_index(tmp_path / "Show", recursive=False)
+    assert files == 2
+    assert sorted(rows) == [(show, "eng", 2, 1, 1), (show, "jpn", 1, 1, 0)]
+
+
+def test_prune_folder_forgets_deleted_and_changed_files(cache, tmp_path):
+    show = tmp_path / "Show"
+    cache.put(show / "kept.mkv", FileIdentity(1, 1, 1), RESULT)
+    cache.put(show / "remuxed.mkv", FileIdentity(1, 1, 2), RESULT)
+    cache.put(show / "deleted.mkv", FileIdentity(1, 1, 3), RESULT)
+    cache.put(show / "S02" / "e1.mkv", FileIdentity(1, 1, 4), RESULT)
+    cache.quarantine(show / "gone.mkv", FileIdentity(1, 1, 5), "Invalid data")
+
+    removed = cache.prune_folder(show, {"kept.mkv": FileIdentity(1, 1, 1), "remuxed.mkv": FileIdentity(9, 9, 2)})
+
+    assert removed == 2
+    assert len(cache) == 2
+    assert cache.quarantined() == []
+    # Sub-folders are listed separately
+    assert cache.contains(show / "S02" / "e1.mkv", FileIdentity(1, 1, 4))
+    files, rows = cache.language_index(show, recursive=False)
+    assert files == 1
+    assert sorted(rows) == [(str(show) + os.sep, "eng", 1, 1, 0), (str(show) + os.sep, "fra", 1, 0, 1)]
+
+
+def test_prune_folders_forgets_deleted_folders(cache, tmp_path):
+    cache.put(tmp_path / "Show" / "e1.mkv", FileIdentity(1, 1, 1), RESULT)
+    cache.put(tmp_path / "Show" / "S02" / "e1.mkv", FileIdentity(1, 1, 2), RESULT)
+    cache.put(tmp_path.parent / "elsewhere.mkv", FileIdentity(1, 1, 3), RESULT)
+
+    assert cache.prune_folders(tmp_path, {str(tmp_path), str(tmp_path / "Show")}) == 1
+
+    assert cache.contains(tmp_path / "Show" / "e1.mkv", FileIdentity(1, 1, 1))
+    assert not cache.contains(tmp_path / "Show" / "S02" / "e1.mkv", FileIdentity(1, 1, 2))
+    assert cache.contains(tmp_path.parent / "elsewhere.mkv", FileIdentity(1, 1, 3))
+
+
+def test_prune_folders_keeps_files_below_hidden_folders(cache, tmp_path):
+    cache.put(tmp_path / ".hidden" / "e1.mkv", FileIdentity(1, 1, 1), RESULT)
+    cache.put(tmp_path / "Show" / ".extras" / "S01" / "e1.mkv", FileIdentity(1, 1, 2), RESULT)
+
+    assert cache.prune_folders(tmp_path, {str(tmp_path), str(tmp_path / "Show")}) == 0
+
+    assert cache.contains(tmp_path / ".hidden" / "e1.mkv", FileIdentity(1, 1, 1))
+    assert cache.contains(tmp_path / "Show" / ".extras" / "S01" / "e1.mkv", FileIdentity(1, 1, 2))
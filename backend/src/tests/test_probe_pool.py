@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.probe_pool import ProbePool
+
+
+class _Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def work(self, seconds=0.02):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(seconds)
+        with self.lock:
+            self.active -= 1
+        return "done"
+
+
+async def test_run_limits_concurrency_across_callers(tmp_path):
+    pool = ProbePool(max_concurrency=3, max_per_device=0)
+    tracker = _Tracker()
+
+    results = await asyncio.gather(*(pool.run(tmp_path / f"{i}.mkv", tracker.work) for i in range(12)))
+
+    assert results == ["done"] * 12
+    assert tracker.peak == 3
+    stats = pool.stats()
+    assert stats.completed == 12
+    assert stats.active == 0
+    assert stats.queued == 0
+    assert stats.max_queued == 9
+    assert stats.max_wait_ms > 0
+
+
+async def test_waiters_are_served_in_order(tmp_path):
+    pool = ProbePool(max_concurrency=1, max_per_device=0)
+    order = []
+
+    async def probe(i):
+        async with pool.slot(tmp_path / "a.mkv"):
+            order.append(i)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(probe(i) for i in range(5)))
+
+    assert order == [0, 1, 2, 3, 4]
+
+
+async def test_per_device_limit(tmp_path, monkeypatch):
+    pool = ProbePool(max_concurrency=4, max_per_device=1)
+    devices = {"disk1": 1, "disk2": 2}
+    monkeypatch.setattr(pool, "_device_of", lambda path: devices[path.parent.name])
+    active = {1: 0, 2: 0}
+    peak = {1: 0, 2: 0}
+
+    async def probe(disk):
+        async with pool.slot(tmp_path / disk / "a.mkv"):
+            device = devices[disk]
+            active[device] += 1
+            peak[device] = max(peak[device], active[device])
+            await asyncio.sleep(0.01)
+            active[device] -= 1
+
+    await asyncio.gather(*(probe(disk) for disk in ["disk1", "disk1", "disk2", "disk1", "disk2"]))
+
+    assert peak == {1: 1, 2: 1}
+
+
+def test_device_is_looked_up_per_folder(tmp_path):
+    pool = ProbePool(max_concurrency=2, max_per_device=1)
+
+    assert pool._device_of(tmp_path / "a.mkv") == tmp_path.stat().st_dev
+    assert str(tmp_path) in pool._devices
+    assert ProbePool(max_concurrency=2, max_per_device=0)._device_of(tmp_path / "a.mkv") is None
+
+
+async def test_cancelled_waiter_does_not_leak_slot(tmp_path):
+    pool = ProbePool(max_concurrency=1, max_per_device=0)
+    release = asyncio.Event()
+
+    async def holder():
+        async with pool.slot(tmp_path / "a.mkv"):
+            await release.wait()
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    assert pool.stats().queued == 1
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    release.set()
+    await first
+
+    assert pool.stats().active == 0
+    async with pool.slot(tmp_path / "a.mkv"):
+        assert pool.stats().active == 1
+
+
+async def test_timed_out_run_keeps_slot_until_thread_returns(tmp_path):
+    pool = ProbePool(max_concurrency=1, max_per_device=0)
+    release = threading.Event()
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.run(tmp_path / "a.mkv", release.wait, timeout=0.01)
+
+    # The thread is still blocked, so its slot is not handed out again
+    assert pool.stats().active == 1
+    release.set()
+    for _ in range(100):
+        if pool.stats().active == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert pool.stats().active == 0
+    assert await pool.run(tmp_path / "a.mkv", lambda: "done") == "done"
+
+
+def test_probe_stats_endpoint(app_client):
+    response = app_client.get("/api/probes/stats")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["max_concurrency"] >= 1
+    assert {"active", "queued", "completed", "avg_wait_ms"} <= data.keys()
@@ -0,0 +1,114 @@
+import pytest
+
+from app.core.models import StreamQuery
+from app.core.probe_cache import FileIdentity, ProbeCache, probe_cache
+
+
+@pytest.fixture
+def cache(tmp_path, make_streams):
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    lib = tmp_path / "lib"
+    cache.put(lib / "a.mkv", FileIdentity(1, 1, 1), make_streams(["eng", "jpn", "fra", "ger"], ["rus"]))
+    cache.put(lib / "b.mkv", FileIdentity(1, 1, 2), make_streams(["unknown"]))
+    cache.put(lib / "c.mkv", FileIdentity(1, 1, 3), make_streams(["unknown", "eng"], ["eng"], {2: "Director's Commentary"}))
+    cache.put(lib / "sub" / "d.mkv", FileIdentity(1, 1, 4), make_streams(["jpn"], ["rus", "eng"]))
+    cache.put(lib / "sub" / "e.mkv", FileIdentity(1, 1, 5), make_streams([]))
+    yield cache
+    cache.close()
+
+
+def _names(cache, tmp_path, recursive=True, offset=0, limit=100, **filters):
+    total, rows = cache.query_files(tmp_path / "lib", recursive, StreamQuery(**filters), offset, limit)
+    return total, [path.rsplit("/", 1)[-1] for path, _, _ in rows]
+
+
+@pytest.mark.parametrize("filters,expected", [
+    ({"min_audio": 4}, ["a.mkv"]),
+    ({"subtitle_languages": ["rus"]}, ["a.mkv", "d.mkv"]),
+    ({"only_audio_languages": ["unknown"]}, ["b.mkv"]),
+    ({"audio_languages": ["eng", "jpn"]}, ["a.mkv"]),
+    ({"missing_subtitle_languages": ["eng"], "min_audio": 1}, ["a.mkv", "b.mkv"]),
+    ({"title": "commentary"}, ["c.mkv"]),
+    ({"max_audio": 0}, ["e.mkv"]),
+    ({"title": "%"}, []),
+])
+def test_query_filters(cache, tmp_path, filters, expected):
+    total, names = _names(cache, tmp_path, **filters)
+
+    assert names == expected
+    assert total == len(expected)
+
+
+def test_query_scope_and_pagination(cache, tmp_path):
+    assert _names(cache, tmp_path, recursive=False) == (3, ["a.mkv", "b.mkv", "c.mkv"])
+    assert _names(cache, tmp_path, offset=1, limit=2) == (5, ["b.mkv", "c.mkv"])
+    assert _names(cache, tmp_path, offset=10) == (5, [])
+
+
+def test_query_endpoint(tmp_media, app_client, make_streams):
+    root = tmp_media / "input" / "Queried"
+    root.mkdir(exist_ok=True)
+    for name in ("x.mkv", "y.mkv"):
+        (root / name).touch()
+    probe_cache.put(root / "x.mkv", FileIdentity.of(root / "x.mkv"), make_streams(["eng", "jpn", "fra", "ger"], ["rus"]))
+    probe_cache.put(root / "y.mkv", FileIdentity.of(root / "y.mkv"), make_streams(["unknown"]))
+
+    data = app_client.get("/api/query", params={"dir": "/Queried", "only_audio_language": "unknown"}).json()
+    assert data["total"] == 1
+    assert data["next_offset"] is None
+    assert data["files"][0]["rel_path"] == "/Queried/y.mkv"
+    assert data["files"][0]["audio_streams"][0]["language"] == "unknown"
+
+    data = app_client.get("/api/query", params={"dir": "/Queried", "limit": 1}).json()
+    assert [f["name"] for f in data["files"]] == ["x.mkv"]
+    assert data["next_offset"] == 1
+
+    response = app_client.get("/api/query", params={"dir": "/Queried", "audio_language": ["eng", "jpn"], "subtitle_language": "rus"})
+    assert [f["name"] for f in response.json()["files"]] == ["x.mkv"]
+
+
+def test_query_endpoint_leaves_out_changed_files(tmp_media, app_client, make_streams):
+    root = tmp_media / "input" / "Requeried"
+    root.mkdir(exist_ok=True)
+    for name in ("a.mkv", "b.mkv"):
+        (root / name).write_bytes(b"old")
+        probe_cache.put(root / name, FileIdentity.of(root / name), make_streams(["eng"]))
+    (root / "a.mkv").write_bytes(b"remuxed")
+
+    data = app_client.get("/api/query", params={"dir": "/Requeried"}).json()
+
+    assert [f["name"] for f in data["files"]] == ["b.mkv"]
+    # Counted until pruned
+    assert data["total"] == 2
+
+
+def test_query_endpoint_pages_past_changed_files(tmp_media, app_client, make_streams):
+    root = tmp_media / "input" / "Paged query"
+    root.mkdir(exist_ok=True)
+    for name in ("a.mkv", "b.mkv", "c.mkv", "d.mkv"):
+        (root / name).write_bytes(b"old")
+        probe_cache.put(root / name, FileIdentity.of(root / name), make_streams(["eng"]))
+    (root / "a.mkv").write_bytes(b"remuxed")
+
+    names, offset = [], 0
+    while offset is not None:
+        data = app_client.get("/api/query", params={"dir": "/Paged query", "offset": offset, "limit": 2}).json()
+        names += [f["name"] for f in data["files"]]
+        offset = data["next_offset"]
+
+    assert names == ["b.mkv", "c.mkv", "d.mkv"]
+
+
+def test_query_endpoint_skips_files_outside_input_root(tmp_media, tmp_path, app_client, monkeypatch, make_streams):
+    root = tmp_media / "input" / "Queried"
+    root.mkdir(exist_ok=True)
+    outside, inside = tmp_path / "z.mkv", root / "x.mkv"
+    outside.touch()
+    inside.touch()
+    rows = [(str(p), FileIdentity.of(p), make_streams(["eng"])) for p in (outside, inside)]
+    monkeypatch.setattr(probe_cache, "query_files", lambda *args: (3, rows))
+
+    data = app_client.get("/api/query", params={"dir": "/Queried", "limit": 2}).json()
+
+    assert [f["rel_path"] for f in data["files"]] == ["/Queried/x.mkv"]
+    assert data["next_offset"] == 2
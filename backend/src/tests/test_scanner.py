@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from app.core import config
+from app.core.scanner import scan_dir, scan_tree
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "library"
+    for season in range(3):
+        season_dir = root / "Shows" / f"S{season}"
+        season_dir.mkdir(parents=True)
+        (season_dir / "ep1.mkv").touch()
+    (root / "Movies").mkdir()
+    (root / "Movies" / "film.MP4").touch()
+    (root / ".hidden").mkdir()
+    (root / "Docs").mkdir()
+    (root / "Docs" / "readme.txt").touch()
+    return root
+
+
+def test_scan_dir_lists_subdirs_and_videos(library):
+    entry = scan_dir(library)
+
+    assert entry.subdirs == ["Docs", "Movies", "Shows"]
+    assert not entry.has_videos
+    assert entry.mtime_ns == library.stat().st_mtime_ns
+    assert scan_dir(library / "Movies").has_videos
+    assert not scan_dir(library / "Docs").has_videos
+
+
+def test_scan_dir_ignores_directories_with_video_suffix(tmp_path):
+    (tmp_path / "extras.mkv").mkdir()
+
+    entry = scan_dir(tmp_path)
+
+    assert entry.subdirs == ["extras.mkv"]
+    assert not entry.has_videos
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="symlinks not supported")
+def test_scan_dir_follows_symlinks(tmp_path, library):
+    link_root = tmp_path / "links"
+    link_root.mkdir()
+    os.symlink(library / "Movies", link_root / "Movies")
+    os.symlink(library / "Movies" / "film.MP4", link_root / "film.mkv")
+
+    entry = scan_dir(link_root)
+
+    assert entry.subdirs == ["Movies"]
+    assert entry.has_videos
+
+
+def test_scan_dir_returns_none_for_missing_directory(tmp_path):
+    assert scan_dir(tmp_path / "missing") is None
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_scan_tree_visits_every_directory_once(library, workers):
+    results = scan_tree(library, max_workers=workers)
+
+    assert sorted(results) == [
+        "/", "/Docs", "/Movies", "/Shows", "/Shows/S0", "/Shows/S1", "/Shows/S2",
+    ]
+    assert results["/Shows/S1"].has_videos
+
+
+def test_scan_tree_lists_parents_before_children(library):
+    order = list(scan_tree(library, max_workers=4))
+
+    for rel_path in order[1:]:
+        parent = rel_path.rsplit("/", 1)[0] or "/"
+        assert order.index(parent) < order.index(rel_path)
+
+
+def test_scan_tree_from_subdirectory(library):
+    results = scan_tree(library, "/Shows", max_workers=2)
+
+    assert sorted(results) == ["/Shows", "/Shows/S0", "/Shows/S1", "/Shows/S2"]
+
+
+def test_scan_tree_uses_configured_worker_count(library, monkeypatch):
+    monkeypatch.setattr(config.settings, "TREE_SCAN_WORKERS", 1)
+
+    assert len(scan_tree(library)) == 7
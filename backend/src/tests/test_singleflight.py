@@ -0,0 +1,146 @@
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.probe_cache import ProbeCache
+from app.core.singleflight import SingleFlight
+
+
+async def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "result"
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.shared == 4
+    assert flights.in_flight() == 0
+
+
+async def test_different_keys_run_separately():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    results = await asyncio.gather(flights.do("a", lambda: work("a")), flights.do("b", lambda: work("b")))
+
+    assert results == ["a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+
+async def test_later_calls_run_again():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    assert await flights.do("key", work) == 1
+    assert await flights.do("key", work) == 2
+
+
+async def test_exception_is_shared_by_all_waiters():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flights.do("key", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+async def test_cancelling_one_waiter_keeps_work_running_for_others():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", work))
+    second = asyncio.create_task(flights.do("key", work))
+    await started.wait()
+
+    first.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+    assert await second == "done"
+
+
+async def test_cancelling_every_waiter_cancels_work():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flights.do("key", work))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+async def test_concurrent_probes_of_same_file_run_ffprobe_once(tmp_path, monkeypatch):
+    from app.core import ffprobe
+
+    cache = ProbeCache(db_file=tmp_path / "probe_cache.db")
+    monkeypatch.setattr(ffprobe, "probe_cache", cache)
+    video = tmp_path / "movie.mkv"
+    video.write_bytes(b"data")
+    output = MagicMock(returncode=0)
+    output.communicate = MagicMock(return_value=(json.dumps({"streams": [
+        {"codec_type": "audio", "index": 1, "tags": {"language": "eng"}},
+    ]}).encode(), b""))
+
+    def slow_run(*args, **kwargs):
+        time.sleep(0.05)
+        return output
+
+    with patch("app.core.ffprobe.subprocess.Popen", side_effect=slow_run) as run:
+        results = await asyncio.gather(*(ffprobe.probe_file(video) for _ in range(3)))
+
+    assert run.call_count == 1
+    assert all(r["audio"][0].language == "eng" for r in results)
+    cache.close()
+
+
+async def test_concurrent_listings_share_one_directory_scan(tmp_path, monkeypatch):
+    from app.api import routes_list
+
+    calls = []
+
+    def slow_list(dir_path):
+        calls.append(dir_path)
+        time.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(routes_list.dir_cache, "list_videos", slow_list)
+
+    await asyncio.gather(*(routes_list._list_files(tmp_path) for _ in range(3)))
+
+    assert calls == [tmp_path]
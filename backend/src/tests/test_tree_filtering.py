@@ -2,6 +2,8 @@ import shutil
 
 import pytest
 
+from app.core.tree_index import tree_index
+
 
 @pytest.fixture
 def setup_tree(tmp_media):
@@ -22,6 +24,8 @@ def setup_tree(tmp_media):
     (input_root / "OnlyDocs").mkdir(exist_ok=True)
     (input_root / "OnlyDocs" / "readme.txt").touch()
 
+    tree_index.invalidate("/")
+
     yield
 
     # Only remove what this fixture created; preserve pre-existing dirs (e.g. Movies
@@ -29,6 +33,7 @@ def setup_tree(tmp_media):
     (input_root / "Movies" / "movie1.mkv").unlink(missing_ok=True)
     for d in ["Shows", "Empty", "NoVideos", "OnlyDocs"]:
         shutil.rmtree(input_root / d, ignore_errors=True)
+    tree_index.invalidate("/")
 
 
 def test_tree_filtering(setup_tree, app_client):
@@ -48,3 +53,38 @@ def test_tree_filtering(setup_tree, app_client):
 
     shows_node = next(child for child in data["children"] if child["name"] == "Shows")
     assert any(c["name"] == "S1" for c in shows_node["children"])
+
+
+def test_tree_depth_limited(setup_tree, app_client):
+    response = app_client.get("/api/tree", params={"depth": 1})
+    assert response.status_code == 200
+    data = response.json()
+
+    shows_node = next(child for child in data["children"] if child["name"] == "Shows")
+    assert shows_node["children"] is None
+    assert shows_node["has_children"] is True
+
+
+def test_tree_expand_subfolder(setup_tree, app_client):
+    response = app_client.get("/api/tree", params={"path": "/Shows", "depth": 1})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["rel_path"] == "/Shows"
+    assert [c["name"] for c in data["children"]] == ["S1"]
+    assert data["children"][0]["has_children"] is False
+
+
+def test_tree_unknown_path_returns_404(setup_tree, app_client):
+    response = app_client.get("/api/tree", params={"path": "/Empty", "depth": 1})
+    assert response.status_code == 404
+
+
+def test_tree_rejects_traversal(app_client):
+    response = app_client.get("/api/tree", params={"path": "../../etc"})
+    assert response.status_code == 403
+
+
+def test_tree_rejects_negative_depth(app_client):
+    response = app_client.get("/api/tree", params={"depth": -1})
+    assert response.status_code == 422
@@ -0,0 +1,171 @@
+import os
+import shutil
+
+import pytest
+
+from app.core import config
+from app.core.tree_index import TreeIndex
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    (root / "Movies").mkdir(parents=True)
+    (root / "Movies" / "film.mkv").touch()
+    (root / "Shows" / "S1").mkdir(parents=True)
+    (root / "Shows" / "S1" / "ep1.mp4").touch()
+    (root / "Docs").mkdir()
+    (root / "Docs" / "readme.txt").touch()
+    (root / ".hidden").mkdir()
+    (root / ".hidden" / "secret.mkv").touch()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    return root
+
+
+@pytest.fixture
+def index(tmp_path, library):
+    idx = TreeIndex(index_file=tmp_path / "job-data" / "tree_index.json")
+    idx.build()
+    return idx
+
+
+def _bump_mtime(path):
+    """Force a visible mtime change regardless of filesystem timestamp granularity."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _names(node):
+    return [c.name for c in node.children]
+
+
+def test_build_only_includes_directories_with_videos(index):
+    tree = index.get_tree()
+    assert tree.name == "/"
+    assert tree.rel_path == "/"
+    assert _names(tree) == ["Movies", "Shows"]
+    shows = tree.children[1]
+    assert shows.rel_path == "/Shows"
+    assert _names(shows) == ["S1"]
+    assert shows.children[0].rel_path == "/Shows/S1"
+
+
+def test_empty_library_returns_empty_root(tmp_path, monkeypatch):
+    root = tmp_path / "empty"
+    root.mkdir()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    idx = TreeIndex(index_file=tmp_path / "tree_index.json")
+    idx.build()
+
+    tree = idx.get_tree()
+    assert tree.rel_path == "/"
+    assert tree.children == []
+
+
+def test_get_tree_is_cached_until_change(index, library):
+    first = index.get_tree()
+    assert index.get_tree() is first
+
+    (library / "Docs" / "clip.mkv").touch()
+    index.invalidate("/Docs")
+
+    assert index.get_tree() is not first
+    assert "Docs" in _names(index.get_tree())
+
+
+def test_refresh_rescans_only_changed_directories(index, library):
+    assert index.refresh() == 0
+
+    (library / "Anime").mkdir()
+    (library / "Anime" / "ep.mkv").touch()
+    _bump_mtime(library)
+
+    assert index.refresh() == 1
+    assert "Anime" in _names(index.get_tree())
+
+
+def test_refresh_drops_removed_directories(index, library):
+    shutil.rmtree(library / "Shows")
+    _bump_mtime(library)
+
+    index.refresh()
+
+    assert _names(index.get_tree()) == ["Movies"]
+
+
+def test_invalidate_picks_up_new_nested_directories(index, library):
+    (library / "Shows" / "S2" / "Extras").mkdir(parents=True)
+    (library / "Shows" / "S2" / "Extras" / "bonus.mkv").touch()
+
+    index.invalidate("/Shows")
+
+    shows = next(c for c in index.get_tree().children if c.name == "Shows")
+    assert _names(shows) == ["S1", "S2"]
+    assert _names(shows.children[1]) == ["Extras"]
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save()
+    assert index.index_file.exists()
+
+    restored = TreeIndex(index_file=index.index_file)
+    assert restored.load()
+    assert restored.get_tree() == index.get_tree()
+
+
+def test_load_ignores_index_for_other_root(index, tmp_path, monkeypatch):
+    index.save()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", tmp_path / "elsewhere")
+
+    restored = TreeIndex(index_file=index.index_file)
+    assert not restored.load()
+
+
+def test_ensure_loaded_refreshes_persisted_index(index, library):
+    index.save()
+    (library / "Docs" / "clip.mkv").touch()
+    _bump_mtime(library / "Docs")
+
+    restored = TreeIndex(index_file=index.index_file)
+    restored.ensure_loaded()
+
+    assert "Docs" in _names(restored.get_tree())
+
+
+def test_full_tree_sets_has_children(index):
+    tree = index.get_tree()
+    assert tree.has_children
+    movies, shows = tree.children
+    assert not movies.has_children
+    assert movies.children == []
+    assert shows.has_children
+
+
+def test_get_subtree_limits_depth(index):
+    root = index.get_subtree("/", depth=1)
+    assert [c.name for c in root.children] == ["Movies", "Shows"]
+    movies, shows = root.children
+    # Cut-off nodes are not expanded but report whether they can be
+    assert shows.children is None
+    assert shows.has_children
+    assert movies.children is None
+    assert not movies.has_children
+
+
+def test_get_subtree_depth_zero_returns_only_the_node(index):
+    node = index.get_subtree("/", depth=0)
+    assert node.children is None
+    assert node.has_children
+
+
+def test_get_subtree_from_nested_path(index):
+    node = index.get_subtree("Shows/", depth=1)
+    assert node.rel_path == "/Shows"
+    assert node.name == "Shows"
+    assert [c.rel_path for c in node.children] == ["/Shows/S1"]
+
+
+def test_get_subtree_unknown_or_empty_folder_returns_none(index):
+    assert index.get_subtree("/Nope", depth=1) is None
+    assert index.get_subtree("/Docs", depth=1) is None
+    assert index.get_subtree("/.hidden") is None
@@ -0,0 +1,201 @@
+import asyncio
+import errno
+import os
+import struct
+
+import pytest
+
+from app.core import config, inotify
+from app.core.dir_cache import DirectoryCache
+from app.core.tree_index import TreeIndex
+from app.core.watcher import LibraryWatcher, filesystem_type
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    root = tmp_path / "library"
+    (root / "Movies").mkdir(parents=True)
+    (root / "Movies" / "film.mkv").touch()
+    monkeypatch.setattr(config.settings, "INPUT_ROOT", root)
+    return root
+
+
+@pytest.fixture
+def watcher(tmp_path, library):
+    index = TreeIndex(index_file=tmp_path / "tree_index.json")
+    index.build()
+    return LibraryWatcher(index, DirectoryCache(), debounce=0.05)
+
+
+async def _wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+def _child_names(index):
+    return [c.name for c in index.get_tree().children]
+
+
+def test_filesystem_type_uses_longest_mount_prefix(tmp_path):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "overlay / overlay rw 0 0\n"
+        "//nas/media /media/input cifs rw 0 0\n"
+        "/dev/sdb1 /media/input\\040local ext4 rw 0 0\n"
+    )
+
+    assert filesystem_type("/media/input/Movies", str(mounts)) == "cifs"
+    assert filesystem_type("/media/input local/x", str(mounts)) == "ext4"
+    assert filesystem_type("/media/inputs", str(mounts)) == "overlay"
+    assert filesystem_type("/x", str(tmp_path / "missing")) is None
+
+
+def test_choose_mode_respects_setting(watcher, monkeypatch):
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "off")
+    assert watcher.choose_mode() == "off"
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "poll")
+    assert watcher.choose_mode() == "poll"
+
+
+def test_choose_mode_polls_network_mounts(watcher, monkeypatch):
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "auto")
+    monkeypatch.setattr(inotify, "is_available", lambda: True)
+    monkeypatch.setattr("app.core.watcher.filesystem_type", lambda path: "nfs4")
+    assert watcher.choose_mode() == "poll"
+
+    monkeypatch.setattr("app.core.watcher.filesystem_type", lambda path: "ext4")
+    assert watcher.choose_mode() == "inotify"
+
+
+def test_choose_mode_polls_without_inotify(watcher, monkeypatch):
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "inotify")
+    monkeypatch.setattr(inotify, "is_available", lambda: False)
+    assert watcher.choose_mode() == "poll"
+
+
+def test_parse_events_decodes_names():
+    name = "Season 1".encode() + b"\0\0\0\0"
+    data = struct.pack("iIII", 3, inotify.IN_CREATE | inotify.IN_ISDIR, 0, len(name)) + name
+    data += struct.pack("iIII", 4, inotify.IN_IGNORED, 0, 0)
+
+    events = inotify.parse_events(data)
+
+    assert events[0] == inotify.InotifyEvent(3, inotify.IN_CREATE | inotify.IN_ISDIR, 0, "Season 1")
+    assert events[1].wd == 4
+    assert events[1].name == ""
+
+
+def test_rescanned_directory_invalidates_listing(watcher, library):
+    cache = watcher.cache
+    cache.trusted = True
+    cache.list_videos(library / "Movies")
+    (library / "Movies" / "other.mkv").touch()
+
+    watcher.index.invalidate("/Movies")
+
+    assert [f.name for f in cache.list_videos(library / "Movies")] == ["film.mkv", "other.mkv"]
+
+
+async def test_poll_mode_picks_up_changed_directories(watcher, library, monkeypatch):
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "poll")
+    monkeypatch.setattr(config.settings, "TREE_INDEX_REFRESH_SECONDS", 0.02)
+    task = asyncio.create_task(watcher.run())
+    try:
+        (library / "Shows").mkdir()
+        (library / "Shows" / "ep1.mkv").touch()
+        st = library.stat()
+        os.utime(library, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        assert await _wait_for(lambda: "Shows" in _child_names(watcher.index))
+        assert watcher.mode == "poll"
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+@pytest.mark.skipif(not inotify.is_available(), reason="inotify is Linux-only")
+async def test_inotify_mode_rescans_only_changed_directories(watcher, library, monkeypatch):
+    monkeypatch.setattr(config.settings, "LIBRARY_WATCHER", "inotify")
+    rescanned = []
+    watcher.index.add_listener(rescanned.append)
+    task = asyncio.create_task(watcher.run())
+    try:
+        assert await _wait_for(lambda: watcher.cache.trusted)
+        await _wait_for(lambda: "/Movies" in watcher._rel_to_wd)
+
+        (library / "Shows" / "S1").mkdir(parents=True)
+        assert await _wait_for(lambda: "/Shows/S1" in watcher._rel_to_wd)
+
+        # New nested directory is watched, so files created in it are seen too
+        (library / "Shows" / "S1" / "ep1.mkv").touch()
+        assert await _wait_for(lambda: "Shows" in _child_names(watcher.index))
+
+        assert "/Movies" not in rescanned
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    assert watcher._inotify is None
+    assert not watcher.cache.trusted
+
+
+class _FakeInotify:
+    def __init__(self, denied):
+        self.denied = denied
+        self.next_wd = 1
+
+    def add_watch(self, path, mask):
+        if path in self.denied:
+            raise PermissionError(errno.EACCES, "Permission denied")
+        self.next_wd += 1
+        return self.next_wd
+
+    def rm_watch(self, wd):
+        pass
+
+
+def test_unwatchable_directory_is_revalidated_and_retried(watcher, library, capsys):
+    movies = library / "Movies"
+    watcher._inotify = _FakeInotify({str(movies)})
+    watcher._sync_watches()
+    watcher._sync_watches()
+
+    assert watcher.cache.unwatched == {movies}
+    assert capsys.readouterr().out.count("cannot watch /Movies") == 1
+
+    # Trusted listings still notice changes in the unwatched folder
+    watcher.cache.trusted = True
+    assert [f.name for f in watcher.cache.list_videos(movies)] == ["film.mkv"]
+    (movies / "new.mkv").touch()
+    os.utime(movies, ns=(0, movies.stat().st_mtime_ns + 1_000_000_000))
+    assert [f.name for f in watcher.cache.list_videos(movies)] == ["film.mkv", "new.mkv"]
+
+    watcher._inotify.denied.clear()
+    watcher._sync_watches()
+    assert watcher.cache.unwatched == set()
+    assert "/Movies" in watcher._rel_to_wd
+
+
+async def test_failed_flush_keeps_pending_directories(watcher, monkeypatch):
+    watcher._loop = asyncio.get_running_loop()
+    watcher._fallback = asyncio.Event()
+    applied = []
+
+    def apply(pending, overflow):
+        if not applied:
+            applied.append(None)
+            raise PermissionError(errno.EACCES, "Permission denied")
+        applied.append(sorted(pending))
+
+    monkeypatch.setattr(watcher, "_apply", apply)
+    watcher._pending = {"/Movies"}
+    watcher._schedule_flush()
+
+    assert await _wait_for(lambda: len(applied) == 2)
+    assert applied[1] == ["/Movies"]
+    assert not watcher._fallback.is_set()
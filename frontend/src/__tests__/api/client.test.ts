@@ -39,6 +39,14 @@ describe('fetchTree', () => {
         expect(mockFetch).toHaveBeenCalledWith(expect.stringContaining('/tree'))
     })
 
+    it('sends path and depth as query params', async () => {
+        mockFetch.mockReturnValueOnce(mockOk({ name: 'shows' }))
+        await fetchTree('/shows', 1)
+        const url = mockFetch.mock.calls[0][0] as string
+        expect(url).toContain('path=%2Fshows')
+        expect(url).toContain('depth=1')
+    })
+
     it('throws on non-ok response', async () => {
         mockFetch.mockReturnValueOnce(mockFail())
         await expect(fetchTree()).rejects.toThrow('Failed to fetch tree')
@@ -78,6 +86,19 @@ describe('startProcess', () => {
         mockFetch.mockReturnValueOnce(mockFail())
         await expect(startProcess(processRequest)).rejects.toThrow('Failed to start process')
     })
+
+    it('includes preflight messages in the error', async () => {
+        mockFetch.mockReturnValueOnce(Promise.resolve({
+            ok: false,
+            json: () => Promise.resolve({
+                detail: [
+                    { loc: ['body', 'files', 0], msg: '/a.mkv: file not found', type: 'file_not_found' },
+                    { loc: ['body', 'files', 1], msg: '/b.mkv: file not found', type: 'file_not_found' },
+                ],
+            }),
+        } as Response))
+        await expect(startProcess(processRequest)).rejects.toThrow('/a.mkv: file not found\n/b.mkv: file not found')
+    })
 })
 
 describe('fetchJob', () => {
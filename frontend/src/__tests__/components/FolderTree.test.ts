@@ -9,12 +9,14 @@ vi.mock('../../stores/mediaStore', () => ({
         expandedKeys: {},
         loadTree: vi.fn(),
         loadDirectory: vi.fn(),
+        loadChildren: vi.fn(),
     },
 }))
 
 beforeEach(() => {
     vi.mocked(mediaStore.loadTree).mockReset()
     vi.mocked(mediaStore.loadDirectory).mockReset()
+    vi.mocked(mediaStore.loadChildren).mockReset()
 })
 
 describe('FolderTree', () => {
@@ -31,4 +33,14 @@ describe('FolderTree', () => {
 
         expect(mediaStore.loadDirectory).toHaveBeenCalledWith('/movies')
     })
+
+    it('calls loadChildren with the expanded node on node-expand', async () => {
+        const wrapper = mount(FolderTree)
+        const tree = wrapper.findComponent({ name: 'Tree' })
+        const node = { rel_path: '/shows', name: 'shows', children: null, has_children: true }
+
+        await tree.vm.$emit('node-expand', node)
+
+        expect(mediaStore.loadChildren).toHaveBeenCalledWith(node)
+    })
 })
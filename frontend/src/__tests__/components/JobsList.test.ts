@@ -61,6 +61,20 @@ describe('JobsList', () => {
         expect(jobDivs[1].text()).toContain('pending.mkv')
     })
 
+    it('orders pending jobs by queue position', () => {
+        jobsListStore.jobs = [
+            makeJob({ job_id: 'second', first_file: 'second.mkv', queue_position: 2 }),
+            makeJob({ job_id: 'first', first_file: 'first.mkv', queue_position: 1 }),
+        ]
+
+        const wrapper = mount(JobsList)
+        const jobDivs = wrapper.findAll('[class*="flex align-items-start"]')
+
+        expect(jobDivs[0].text()).toContain('first.mkv')
+        expect(jobDivs[0].text()).toContain('#1 in queue')
+        expect(jobDivs[1].text()).toContain('#2 in queue')
+    })
+
     it('shows cancel button only for pending jobs', () => {
         jobsListStore.jobs = [
             makeJob({ job_id: 'p', status: 'pending' }),
@@ -34,6 +34,7 @@ function resetStore() {
         status: null,
         progress: 0,
         currentFile: null,
+        currentFiles: [],
         logs: [],
         error: null,
         eventSource: null,
@@ -144,6 +145,22 @@ describe('connectEvents', () => {
         expect(jobStore.status).toBe('processing')
         expect(jobStore.progress).toBe(42)
         expect(jobStore.currentFile).toBe('movie.mkv')
+        expect(jobStore.currentFiles).toEqual(['movie.mkv'])
+    })
+
+    it('tracks all files of a parallel job', () => {
+        jobStore.connectEvents('job-1')
+        const es = jobStore.eventSource as unknown as MockEventSource
+
+        es.dispatchEvent('status', {
+            status: 'processing',
+            overall_percent: 30,
+            current_file: 'e01.mkv',
+            current_files: ['e01.mkv', 'e02.mkv'],
+        })
+
+        expect(jobStore.currentFile).toBe('e01.mkv')
+        expect(jobStore.currentFiles).toEqual(['e01.mkv', 'e02.mkv'])
     })
 
     it('appends log lines on log event', () => {
@@ -66,6 +66,15 @@ describe('loadTree', () => {
         expect(mediaStore.expandedKeys['/movies']).toBe(true)
     })
 
+    it('requests a depth-limited tree', async () => {
+        mockFetchTree.mockResolvedValueOnce(sampleTree)
+        mockFetchList.mockResolvedValueOnce({ dir: '/', files: [], languages: [] })
+
+        await mediaStore.loadTree()
+
+        expect(mockFetchTree).toHaveBeenCalledWith('/', 2)
+    })
+
     it('calls loadDirectory("/") after loading tree', async () => {
         mockFetchTree.mockResolvedValueOnce(sampleTree)
         mockFetchList.mockResolvedValueOnce(sampleListData)
@@ -94,6 +103,33 @@ describe('loadTree', () => {
     })
 })
 
+describe('loadChildren', () => {
+    it('fetches one level below a collapsed node and marks leaves', async () => {
+        const node = { rel_path: '/shows', name: 'shows', children: null, has_children: true }
+        mockFetchTree.mockResolvedValueOnce({
+            ...node,
+            children: [
+                { rel_path: '/shows/s1', name: 's1', children: null, has_children: true },
+                { rel_path: '/shows/s2', name: 's2', children: null, has_children: false },
+            ],
+        })
+
+        await mediaStore.loadChildren(node)
+
+        expect(mockFetchTree).toHaveBeenCalledWith('/shows', 1)
+        expect(node.children).toMatchObject([
+            { key: '/shows/s1', leaf: false },
+            { key: '/shows/s2', leaf: true },
+        ])
+    })
+
+    it('does not refetch nodes whose children are loaded', async () => {
+        await mediaStore.loadChildren({ rel_path: '/movies', name: 'movies', children: [], has_children: false })
+
+        expect(mockFetchTree).not.toHaveBeenCalled()
+    })
+})
+
 describe('loadDirectory', () => {
     it('enriches files with includeFile and selectedAudio/selectedSubs', async () => {
         mockFetchList.mockResolvedValueOnce(sampleListData)
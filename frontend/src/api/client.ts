@@ -9,8 +9,10 @@ import type {
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000/api";
 
-export async function fetchTree(): Promise<MediaNode> {
-  const res = await fetch(`${API_URL}/tree`);
+export async function fetchTree(path = '/', depth?: number): Promise<MediaNode> {
+  const params = new URLSearchParams({ path });
+  if (depth !== undefined) params.set('depth', String(depth));
+  const res = await fetch(`${API_URL}/tree?${params}`);
   if (!res.ok) throw new Error("Failed to fetch tree");
   return res.json() as Promise<MediaNode>;
 }
@@ -22,13 +24,27 @@ export async function fetchList(dirVal: string): Promise<DirectoryContent> {
   return res.json() as Promise<DirectoryContent>;
 }
 
+// Messages of a 422 response (preflight check or request validation), if any
+async function validationMessages(res: Response): Promise<string[]> {
+  try {
+    const body = await res.json();
+    if (Array.isArray(body?.detail)) return body.detail.map((issue: { msg: string }) => issue.msg);
+  } catch {
+    // No JSON body
+  }
+  return [];
+}
+
 export async function startProcess(payload: ProcessRequest): Promise<ProcessResponse> {
   const res = await fetch(`${API_URL}/process`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(payload),
   });
-  if (!res.ok) throw new Error("Failed to start process");
+  if (!res.ok) {
+    const issues = await validationMessages(res);
+    throw new Error(issues.length ? `Failed to start process:\n${issues.join("\n")}` : "Failed to start process");
+  }
   return res.json() as Promise<ProcessResponse>;
 }
 
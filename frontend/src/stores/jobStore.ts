@@ -10,6 +10,8 @@ export const jobStore = reactive({
     status: null as JobStoreStatus | null,
     progress: 0,
     currentFile: null as string | null,
+    // Files running side by side in a parallel job
+    currentFiles: [] as string[],
     logs: [] as string[],
     error: null as string | null,
     eventSource: null as EventSource | null,
@@ -23,6 +25,7 @@ export const jobStore = reactive({
                 this.status = 'starting';
                 this.progress = 0;
                 this.currentFile = null;
+                this.currentFiles = [];
                 this.activeJobId = res.jobId;
                 this.connectEvents(res.jobId);
             }
@@ -42,6 +45,7 @@ export const jobStore = reactive({
             this.status = data.status;
             this.progress = data.overall_percent;
             this.currentFile = data.current_file ?? null;
+            this.currentFiles = data.current_files ?? (data.current_file ? [data.current_file] : []);
 
             if (data.status === 'completed' || data.status === 'failed') {
                 this.eventSource?.close();
@@ -52,6 +56,7 @@ export const jobStore = reactive({
                     this.status = next.status;
                     this.progress = next.overall_percent;
                     this.currentFile = next.current_file;
+                    this.currentFiles = next.current_files ?? (next.current_file ? [next.current_file] : []);
                     this.activeJobId = next.job_id;
                     this.connectEvents(next.job_id);
                 }
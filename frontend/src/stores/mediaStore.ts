@@ -2,6 +2,18 @@ import { reactive } from 'vue';
 import { fetchTree, fetchList } from '../api/client';
 import type { MediaNode, MediaFile } from '../types';
 
+// Folder levels fetched up front; anything deeper is fetched when expanded
+const TREE_PRELOAD_DEPTH = 2;
+
+function prepareNode(node: MediaNode, expandedKeys?: Record<string, boolean>) {
+    node.key = node.rel_path;
+    node.leaf = node.children ? node.children.length === 0 : !node.has_children;
+    if (node.children) {
+        if (expandedKeys) expandedKeys[node.rel_path] = true;
+        node.children.forEach(c => prepareNode(c, expandedKeys));
+    }
+}
+
 export const mediaStore = reactive({
     tree: null as MediaNode | null,
     currentDir: null as string | null,
@@ -15,19 +27,11 @@ export const mediaStore = reactive({
     async loadTree() {
         try {
             this.loading = true;
-            const tree = await fetchTree();
+            const tree = await fetchTree('/', TREE_PRELOAD_DEPTH);
 
-            // Expand all nodes by default
+            // Expand every node whose children were loaded; deeper folders load on expand
             const keys: Record<string, boolean> = {};
-            const expandNodes = (node: MediaNode) => {
-                if (!node) return;
-                node.key = node.rel_path;
-                keys[node.rel_path] = true;
-                if (node.children) {
-                    node.children.forEach((c: MediaNode) => expandNodes(c));
-                }
-            };
-            expandNodes(tree);
+            prepareNode(tree, keys);
             this.expandedKeys = keys;
 
             this.tree = tree;
@@ -42,6 +46,21 @@ export const mediaStore = reactive({
         }
     },
 
+    async loadChildren(node: MediaNode) {
+        if (node.children || !node.has_children || node.loading) return;
+        try {
+            node.loading = true;
+            const subtree = await fetchTree(node.rel_path, 1);
+            const children = subtree.children ?? [];
+            children.forEach(c => prepareNode(c));
+            node.children = children;
+        } catch (e: unknown) {
+            this.error = (e as Error).message;
+        } finally {
+            node.loading = false;
+        }
+    },
+
     async loadDirectory(dir: string) {
         try {
             this.loading = true;
@@ -2,7 +2,10 @@ export interface MediaNode {
     name: string;
     rel_path: string;
     children?: MediaNode[] | null;
+    has_children?: boolean;
     key?: string;
+    leaf?: boolean;
+    loading?: boolean;
 }
 
 export interface Stream {
@@ -29,6 +32,9 @@ export interface DirectoryContent {
     dir: string;
     files: ApiMediaFile[];
     languages: string[];
+    total?: number;
+    offset?: number;
+    next_offset?: number | null;
 }
 
 export interface FileSelection {
@@ -44,6 +50,8 @@ export interface ProcessRequest {
     audio_languages: string[];
     subtitle_languages: string[];
     selections?: FileSelection[] | null;
+    parallelism?: number | null;
+    priority?: number;
 }
 
 export interface ProcessResponse {
@@ -57,8 +65,10 @@ export interface JobStatus {
     status: JobStatusValue;
     overall_percent: number;
     current_file: string | null;
+    current_files?: string[];
     dir: string;
     first_file: string | null;
+    queue_position?: number | null;
 }
 
 export type ActiveJob = JobStatus & {
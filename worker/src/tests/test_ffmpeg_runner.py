@@ -199,3 +199,116 @@ def test_run_ffmpeg_raises_on_nonzero_returncode(runner, tmp_path):
                 audio_stream_ids=[1],
                 subtitle_stream_ids=None,
             )
+
+
+# ---------------------------------------------------------------------------
+# _probe_streams — shared probe cache
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    from worker.probe_cache import ProbeCache
+
+    cache = ProbeCache(db_file=tmp_path / "job-data" / "probe_cache.db")
+    monkeypatch.setattr("worker.ffmpeg_runner.probe_cache", cache)
+    yield cache
+    cache.close()
+
+
+def _ffprobe_output(streams):
+    import json
+
+    return MagicMock(stdout=json.dumps({"streams": streams}), returncode=0)
+
+
+def test_probe_streams_uses_cached_result_without_ffprobe(runner, cache, tmp_path):
+    from worker.probe_cache import FileIdentity
+
+    video = tmp_path / "cached.mkv"
+    video.write_bytes(b"video")
+    cache.put(video, FileIdentity.of(video), {
+        "audio": [
+            {"id": 1, "language": "eng", "title": "Stereo", "codec_type": "audio"},
+            {"id": 2, "language": "unknown", "title": None, "codec_type": "audio"},
+        ],
+        "subtitle": [{"id": 3, "language": "fra", "title": None, "codec_type": "subtitle"}],
+    })
+
+    cmd = []
+    with patch("worker.ffmpeg_runner.subprocess.run") as run:
+        runner._map_streams(video, cmd, ["eng", "unknown"], ["fra"])
+
+    run.assert_not_called()
+    assert cmd == ["-map", "0:1", "-map", "0:2", "-map", "0:3"]
+
+
+def test_probe_streams_populates_cache(runner, cache, tmp_path):
+    from worker.probe_cache import FileIdentity
+
+    video = tmp_path / "fresh.mkv"
+    video.write_bytes(b"video")
+    streams = [
+        {"index": 0, "codec_type": "video"},
+        {"index": 1, "codec_type": "audio", "tags": {"language": "jpn", "title": "Main"}},
+        {"index": 2, "codec_type": "subtitle"},
+    ]
+
+    with patch("worker.ffmpeg_runner.subprocess.run", return_value=_ffprobe_output(streams)) as run:
+        first = runner._probe_streams(video)
+        second = runner._probe_streams(video)
+
+    assert run.call_count == 1
+    assert first["audio"][0]["index"] == 1
+    assert second["audio"][0]["tags"] == {"language": "jpn", "title": "Main"}
+    assert cache.get(video, FileIdentity.of(video)) == {
+        "audio": [{"id": 1, "language": "jpn", "title": "Main", "codec_type": "audio"}],
+        "subtitle": [{"id": 2, "language": "unknown", "title": None, "codec_type": "subtitle"}],
+    }
+
+
+def test_failed_probe_is_not_cached(runner, cache, tmp_path):
+    from worker.probe_cache import FileIdentity
+
+    video = tmp_path / "broken.mkv"
+    video.write_bytes(b"video")
+    failed = MagicMock(stdout="{}\n", stderr="broken.mkv: Invalid data found\n", returncode=1)
+
+    with patch("worker.ffmpeg_runner.subprocess.run", return_value=failed):
+        with pytest.raises(Exception, match="ffprobe failed with code 1: broken.mkv: Invalid data found"):
+            runner._probe_streams(video)
+
+    assert cache.get(video, FileIdentity.of(video)) is None
+
+
+def test_probe_streams_ignores_entry_of_changed_file(runner, cache, tmp_path):
+    from worker.probe_cache import FileIdentity
+
+    video = tmp_path / "remuxed.mkv"
+    video.write_bytes(b"old")
+    cache.put(video, FileIdentity.of(video), {
+        "audio": [{"id": 1, "language": "eng", "title": None, "codec_type": "audio"}],
+        "subtitle": [],
+    })
+    video.write_bytes(b"new contents")
+    streams = [{"index": 4, "codec_type": "audio", "tags": {"language": "ger"}}]
+
+    with patch("worker.ffmpeg_runner.subprocess.run", return_value=_ffprobe_output(streams)) as run:
+        result = runner._probe_streams(video)
+
+    run.assert_called_once()
+    assert result["audio"][0]["index"] == 4
+
+
+def test_probe_cache_disables_itself_on_other_schema_version(tmp_path):
+    import sqlite3
+    from worker.probe_cache import FileIdentity, ProbeCache
+
+    db_file = tmp_path / "probe_cache.db"
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA user_version=99")
+    conn.close()
+
+    cache = ProbeCache(db_file=db_file)
+    cache.put(tmp_path / "a.mkv", FileIdentity(1, 1, 1), {"audio": [], "subtitle": []})
+
+    assert cache.get(tmp_path / "a.mkv", FileIdentity(1, 1, 1)) is None
@@ -0,0 +1,212 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from worker.leases import JobClaims
+from worker.processor import JobProcessor
+
+
+@pytest.fixture
+def queue(tmp_path):
+    pending = tmp_path / "pending"
+    processing = tmp_path / "processing"
+    pending.mkdir()
+    processing.mkdir()
+    return pending, processing
+
+
+def _claims(queue, owner, lease_seconds=60):
+    return JobClaims(*queue, owner=owner, lease_seconds=lease_seconds)
+
+
+def _enqueue(pending, job_id):
+    job_file = pending / f"{job_id}.json"
+    job_file.write_text(json.dumps({"job_id": job_id}))
+    return job_file
+
+
+def _expire(lease_file):
+    lease = json.loads(lease_file.read_text())
+    lease["expires_at"] = time.time() - 1
+    lease_file.write_text(json.dumps(lease))
+
+
+def test_only_one_worker_claims_a_job(queue):
+    pending, processing = queue
+    job_file = _enqueue(pending, "j1")
+    a, b = _claims(queue, "a"), _claims(queue, "b")
+
+    assert a.claim(job_file) == processing / "j1.json"
+    assert b.claim(job_file) is None
+
+    lease = json.loads((processing / "j1.lease").read_text())
+    assert lease["owner"] == "a"
+    assert lease["expires_at"] > time.time() + 50
+    assert a.owns("j1") and not b.owns("j1")
+
+
+def test_claim_of_vanished_job_leaves_no_lease(queue):
+    pending, processing = queue
+
+    assert _claims(queue, "a").claim(pending / "gone.json") is None
+    assert list(processing.iterdir()) == []
+
+
+def test_renew_and_release(queue):
+    pending, processing = queue
+    a, b = _claims(queue, "a"), _claims(queue, "b")
+    a.claim(_enqueue(pending, "j1"))
+    _expire(processing / "j1.lease")
+
+    assert not b.renew("j1")
+    assert a.renew("j1")
+    assert json.loads((processing / "j1.lease").read_text())["expires_at"] > time.time()
+
+    b.release("j1")
+    assert (processing / "j1.lease").exists()
+    a.release("j1")
+    assert not (processing / "j1.lease").exists()
+
+
+def test_reaper_returns_jobs_with_expired_leases(queue):
+    pending, processing = queue
+    dead, alive, reaper = _claims(queue, "dead"), _claims(queue, "alive"), _claims(queue, "reaper")
+    dead.claim(_enqueue(pending, "j1"))
+    alive.claim(_enqueue(pending, "j2"))
+    _expire(processing / "j1.lease")
+
+    assert reaper.reap() == ["j1"]
+
+    assert (pending / "j1.json").exists()
+    assert not (processing / "j1.lease").exists()
+    assert (processing / "j2.json").exists()
+    assert not dead.renew("j1")
+    # The job can be claimed again
+    assert reaper.claim(pending / "j1.json") is not None
+
+
+def test_reaper_returns_jobs_of_own_previous_run(queue):
+    pending, processing = queue
+    _claims(queue, "w1").claim(_enqueue(pending, "j1"))
+
+    assert _claims(queue, "w1").reap() == ["j1"]
+    assert (pending / "j1.json").exists()
+
+
+def test_reaper_drops_leases_of_finished_jobs(queue):
+    pending, processing = queue
+    a = _claims(queue, "a")
+    a.claim(_enqueue(pending, "j1"))
+    (processing / "j1.json").unlink()
+    _expire(processing / "j1.lease")
+
+    assert _claims(queue, "b").reap() == []
+    assert list(processing.iterdir()) == []
+
+
+def test_reaper_waits_for_half_written_leases(queue):
+    pending, processing = queue
+    lease_file = processing / "j1.lease"
+    lease_file.touch()
+    reaper = _claims(queue, "reaper", lease_seconds=10)
+
+    reaper.reap()
+    assert lease_file.exists()
+
+    old = time.time() - 60
+    os.utime(lease_file, (old, old))
+    reaper.reap()
+    assert not lease_file.exists()
+
+
+def test_reaper_returns_jobs_without_lease(queue):
+    pending, processing = queue
+    (processing / "old.json").write_text("{}")
+
+    assert _claims(queue, "a").reap() == ["old"]
+    assert (pending / "old.json").exists()
+
+
+def test_heartbeat_renews_until_lease_is_lost(queue):
+    pending, processing = queue
+    a = _claims(queue, "a", lease_seconds=0.06)
+    a.claim(_enqueue(pending, "j1"))
+
+    with a.heartbeat("j1") as lost:
+        time.sleep(0.15)
+        assert not lost.is_set()
+        assert not _claims(queue, "b", lease_seconds=0.06)._is_stale(processing / "j1.lease", time.time())
+
+        (processing / "j1.lease").unlink()
+        assert lost.wait(1)
+
+
+# ---------------------------------------------------------------------------
+# JobProcessor
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr("worker.processor.JOB_DATA_ROOT", tmp_path)
+    monkeypatch.setattr("worker.processor.INPUT_ROOT", tmp_path)
+    monkeypatch.setattr("worker.processor.OUTPUT_ROOT", tmp_path)
+    return JobProcessor()
+
+
+def _write_job(processor, job_id):
+    job_file = processor.pending_dir / f"{job_id}.json"
+    job_file.write_text(json.dumps({
+        "job_id": job_id, "files": [], "audio_languages": [], "subtitle_languages": [], "output_dir": "",
+    }))
+    return job_file
+
+
+def test_process_job_skips_job_claimed_elsewhere(processor):
+    job_file = _write_job(processor, "j1")
+    JobClaims(processor.pending_dir, processor.processing_dir, owner="other").claim(job_file)
+
+    assert processor.process_job(job_file) is False
+    assert (processor.processing_dir / "j1.json").exists()
+
+
+def test_process_job_releases_its_lease(processor):
+    job_file = _write_job(processor, "j1")
+
+    assert processor.process_job(job_file) is True
+    assert (processor.completed_dir / "j1.json").exists()
+    assert list(processor.processing_dir.iterdir()) == []
+
+
+def test_process_jobs_moves_on_to_claimable_job(processor):
+    _write_job(processor, "a")
+    _write_job(processor, "b")
+    # Another worker created the lease for "a" and has not moved it yet
+    (processor.processing_dir / "a.lease").write_text(json.dumps(
+        {"owner": "other", "token": "t", "expires_at": time.time() + 60}
+    ))
+
+    with patch("worker.processor.PendingWatcher.wait", side_effect=StopIteration):
+        with pytest.raises(StopIteration):
+            processor.process_jobs()
+
+    assert (processor.pending_dir / "a.json").exists()
+    assert (processor.completed_dir / "b.json").exists()
+
+
+def test_process_jobs_requeues_stale_jobs(processor):
+    job_file = _write_job(processor, "j1")
+    JobClaims(processor.pending_dir, processor.processing_dir, owner="dead").claim(job_file)
+    _expire(processor.processing_dir / "j1.lease")
+
+    with patch("worker.processor.PendingWatcher.wait", side_effect=StopIteration), \
+         patch.object(processor, "update_status", wraps=processor.update_status) as update_status:
+        with pytest.raises(StopIteration):
+            processor.process_jobs()
+
+    # Returned to the queue, then picked up by this worker
+    assert update_status.call_args_list[0].args == ("j1", "pending", 0.0)
+    assert (processor.completed_dir / "j1.json").exists()
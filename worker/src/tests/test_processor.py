@@ -1,5 +1,7 @@
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import patch
 
@@ -65,8 +67,8 @@ def test_init_creates_all_directories(processor):
 # ---------------------------------------------------------------------------
 
 
-def test_process_jobs_sleeps_when_no_pending(processor):
-    with patch("worker.processor.time.sleep", side_effect=StopIteration):
+def test_process_jobs_waits_when_no_pending(processor):
+    with patch("worker.processor.PendingWatcher.wait", side_effect=StopIteration):
         with pytest.raises(StopIteration):
             processor.process_jobs()
 
@@ -276,6 +278,205 @@ def test_process_job_validates_all_inputs_before_ffmpeg(processor, job_dirs):
     assert (processor.failed_dir / "bad-second-input.json").exists()
 
 
+# ---------------------------------------------------------------------------
+# process_job — parallel files
+# ---------------------------------------------------------------------------
+
+
+def test_job_progress_aggregates_running_files():
+    from worker.processor import JobProgress
+
+    progress = JobProgress(4)
+    progress.update(0, "/a.mkv", 50.0)
+    progress.update(1, "/b.mkv", 20.0)
+    assert progress.overall_percent == pytest.approx(70.0 / 4)
+    assert progress.current_files == ["/a.mkv", "/b.mkv"]
+
+    progress.finish(0)
+    progress.update(2, "/c.mkv", 0.0)
+    assert progress.overall_percent == pytest.approx(120.0 / 4)
+    assert progress.current_files == ["/b.mkv", "/c.mkv"]
+
+
+def _write_files(input_root, count):
+    names = [f"e{i:02d}.mkv" for i in range(count)]
+    for name in names:
+        (input_root / name).touch()
+    return ["/" + name for name in names]
+
+
+def test_process_job_runs_files_in_parallel(processor, job_dirs, monkeypatch):
+    import threading
+
+    job_data_root, input_root, _ = job_dirs
+    files = _write_files(input_root, 4)
+    job_file = _write_job(processor.pending_dir, "par1", {"files": files, "parallelism": 2})
+
+    # Both workers must be inside ffmpeg at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    statuses = []
+    real_update = processor.update_status
+    monkeypatch.setattr(processor, "update_status", lambda *a, **kw: (statuses.append((a, kw)), real_update(*a, **kw)))
+
+    def fake_ffmpeg(input_path, output_path, audio, subs, progress_callback, **kwargs):
+        barrier.wait()
+        progress_callback(50.0)
+        barrier.wait()
+
+    with patch("worker.processor.FfmpegRunner") as MockRunner:
+        MockRunner.return_value.run_ffmpeg.side_effect = fake_ffmpeg
+        processor.process_job(job_file)
+
+    assert MockRunner.return_value.run_ffmpeg.call_count == 4
+    assert (processor.completed_dir / "par1.json").exists()
+    assert max(len(kw.get("current_files") or []) for _, kw in statuses) == 2
+    percents = [a[2] for a, _ in statuses if a[1] == "processing"]
+    assert all(0.0 <= p <= 100.0 for p in percents)
+    data = json.loads((job_data_root / "status" / "par1.json").read_text())
+    assert data["status"] == "completed"
+    assert data["overall_percent"] == 100.0
+
+
+def test_parallelism_defaults_to_worker_setting(processor, job_dirs, monkeypatch):
+    import threading
+
+    _, input_root, _ = job_dirs
+    files = _write_files(input_root, 3)
+    job_file = _write_job(processor.pending_dir, "par2", {"files": files})
+    monkeypatch.setattr("worker.processor.JOB_PARALLELISM", 3)
+
+    barrier = threading.Barrier(3, timeout=5)
+    with patch("worker.processor.FfmpegRunner") as MockRunner:
+        MockRunner.return_value.run_ffmpeg.side_effect = lambda *a, **kw: barrier.wait()
+        processor.process_job(job_file)
+
+    assert (processor.completed_dir / "par2.json").exists()
+
+
+def test_parallelism_is_clamped_to_worker_maximum(processor, job_dirs, monkeypatch):
+    _, input_root, _ = job_dirs
+    files = _write_files(input_root, 4)
+    job_file = _write_job(processor.pending_dir, "par4", {"files": files, "parallelism": 500})
+    monkeypatch.setattr("worker.processor.JOB_PARALLELISM_MAX", 2)
+
+    with patch("worker.processor.FfmpegRunner"), \
+         patch("worker.processor.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as pool:
+        processor.process_job(job_file)
+
+    pool.assert_called_once_with(max_workers=2)
+    assert (processor.completed_dir / "par4.json").exists()
+
+
+def test_parallel_job_fails_and_stops_scheduling_on_error(processor, job_dirs):
+    _, input_root, _ = job_dirs
+    files = _write_files(input_root, 6)
+    job_file = _write_job(processor.pending_dir, "par3", {"files": files, "parallelism": 2})
+
+    def fake_ffmpeg(input_path, *args, **kwargs):
+        if input_path.name == "e00.mkv":
+            raise RuntimeError("ffmpeg failed")
+        time.sleep(0.05)
+
+    with patch("worker.processor.FfmpegRunner") as MockRunner:
+        MockRunner.return_value.run_ffmpeg.side_effect = fake_ffmpeg
+        processor.process_job(job_file)
+
+    assert (processor.failed_dir / "par3.json").exists()
+    # Files queued behind the failures are never started
+    assert MockRunner.return_value.run_ffmpeg.call_count < 6
+
+
+# ---------------------------------------------------------------------------
+# StatusPublisher
+# ---------------------------------------------------------------------------
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _publisher(**kwargs):
+    from worker.processor import StatusPublisher
+
+    writes = []
+    clock = _FakeClock()
+    publisher = StatusPublisher(lambda *a: writes.append(a), clock=clock, **kwargs)
+    return publisher, writes, clock
+
+
+def test_status_publisher_limits_write_rate():
+    publisher, writes, clock = _publisher(max_rate=4, min_step=0.5)
+
+    publisher.publish("processing", 0.0, ["/a.mkv"])
+    for i in range(1, 10):
+        clock.now += 0.1
+        publisher.publish("processing", float(i), ["/a.mkv"])
+
+    # One write per 0.25 s; each write carries the latest percent
+    assert writes == [
+        ("processing", 0.0, ["/a.mkv"]),
+        ("processing", 3.0, ["/a.mkv"]),
+        ("processing", 6.0, ["/a.mkv"]),
+        ("processing", 9.0, ["/a.mkv"]),
+    ]
+
+
+def test_status_publisher_skips_small_changes():
+    publisher, writes, clock = _publisher(max_rate=4, min_step=0.5)
+
+    publisher.publish("processing", 10.0, ["/a.mkv"])
+    clock.now += 5
+    publisher.publish("processing", 10.3, ["/a.mkv"])
+    clock.now += 5
+    publisher.publish("processing", 10.6, ["/a.mkv"])
+
+    assert [w[1] for w in writes] == [10.0, 10.6]
+
+
+def test_status_publisher_writes_transitions_immediately():
+    publisher, writes, clock = _publisher(max_rate=1, min_step=5)
+
+    publisher.publish("processing", 0.0)
+    publisher.publish("processing", 0.0, ["/a.mkv"])
+    publisher.publish("processing", 0.1, ["/a.mkv", "/b.mkv"])
+    publisher.publish("processing", 0.2, ["/a.mkv", "/b.mkv"])
+    publisher.publish("completed", 100.0)
+
+    assert writes == [
+        ("processing", 0.0, []),
+        ("processing", 0.0, ["/a.mkv"]),
+        ("processing", 0.1, ["/a.mkv", "/b.mkv"]),
+        ("completed", 100.0, []),
+    ]
+
+
+def test_process_job_coalesces_progress_writes(processor, job_dirs, monkeypatch):
+    job_data_root, input_root, _ = job_dirs
+    (input_root / "vid.mkv").touch()
+    job_file = _write_job(processor.pending_dir, "chatty", {"files": ["/vid.mkv"]})
+    monkeypatch.setattr("worker.processor.STATUS_MAX_WRITES_PER_SECOND", 0.01)
+    statuses = []
+    real_update = processor.update_status
+    monkeypatch.setattr(processor, "update_status", lambda *a, **kw: (statuses.append(a), real_update(*a, **kw)))
+
+    def fake_ffmpeg(input_path, output_path, audio, subs, progress_callback, **kwargs):
+        for i in range(1000):
+            progress_callback(i / 10)
+
+    with patch("worker.processor.FfmpegRunner") as MockRunner:
+        MockRunner.return_value.run_ffmpeg.side_effect = fake_ffmpeg
+        processor.process_job(job_file)
+
+    # Start, file started, completed; the 1000 progress lines all fall within one interval
+    assert [s[1] for s in statuses] == ["processing", "processing", "completed"]
+    data = json.loads((job_data_root / "status" / "chatty.json").read_text())
+    assert data["status"] == "completed"
+
+
 # ---------------------------------------------------------------------------
 # process_job — error path
 # ---------------------------------------------------------------------------
@@ -331,6 +532,7 @@ def test_update_status_writes_correct_json(processor, job_dirs):
         "status": "processing",
         "overall_percent": 42.5,
         "current_file": "/foo.mkv",
+        "current_files": ["/foo.mkv"],
     }
 
 
@@ -340,6 +542,16 @@ def test_update_status_defaults_current_file(processor, job_dirs):
 
     data = json.loads((job_data_root / "status" / "j2.json").read_text())
     assert data["current_file"] is None
+    assert data["current_files"] == []
+
+
+def test_update_status_with_several_current_files(processor, job_dirs):
+    job_data_root, *_ = job_dirs
+    processor.update_status("j4", "processing", 10.0, current_files=["/a.mkv", "/b.mkv"])
+
+    data = json.loads((job_data_root / "status" / "j4.json").read_text())
+    assert data["current_file"] == "/a.mkv"
+    assert data["current_files"] == ["/a.mkv", "/b.mkv"]
 
 
 def test_log_line_appends_to_log_file(processor, job_dirs):
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from worker import inotify
+from worker.processor import JobProcessor
+from worker.queue_watcher import PendingWatcher, filesystem_type
+
+needs_inotify = pytest.mark.skipif(not inotify.is_available(), reason="inotify not available")
+
+
+@pytest.fixture
+def pending_dir(tmp_path):
+    d = tmp_path / "pending"
+    d.mkdir()
+    return d
+
+
+def _enqueue(pending_dir, job_id):
+    # The way the backend writes jobs: a temporary file renamed into place
+    tmp_file = pending_dir / f"{job_id}.tmp"
+    tmp_file.write_text(json.dumps({
+        "job_id": job_id, "files": [], "audio_languages": [], "subtitle_languages": [], "output_dir": "",
+    }))
+    os.replace(tmp_file, pending_dir / f"{job_id}.json")
+
+
+@needs_inotify
+def test_inotify_wakes_up_on_new_job(pending_dir):
+    watcher = PendingWatcher(pending_dir, mode="inotify")
+    try:
+        assert watcher.mode == "inotify"
+        assert watcher.wait(0.01) is False
+
+        _enqueue(pending_dir, "j1")
+        assert watcher.wait(5) is True
+
+        watcher.drain()
+        assert watcher.wait(0.01) is False
+    finally:
+        watcher.close()
+
+
+def test_poll_mode_backs_off_until_reset(pending_dir):
+    watcher = PendingWatcher(pending_dir, mode="poll", poll_min=0.25, poll_max=2)
+
+    with patch("worker.queue_watcher.time.sleep") as sleep:
+        for _ in range(5):
+            assert watcher.wait(60) is False
+        watcher.reset()
+        watcher.wait(60)
+        # Never sleeps past the caller's deadline
+        watcher.wait(0.1)
+
+    assert [c.args[0] for c in sleep.call_args_list] == [0.25, 0.5, 1, 2, 2, 0.25, 0.1]
+
+
+def test_auto_mode_polls_on_network_mounts(pending_dir):
+    with patch("worker.queue_watcher.filesystem_type", return_value="nfs4"):
+        assert PendingWatcher(pending_dir, mode="auto").mode == "poll"
+
+
+def test_filesystem_type_picks_longest_mount(tmp_path):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "overlay / overlay rw 0 0\n"
+        "server:/jobs /job\\040data nfs4 rw 0 0\n"
+    )
+
+    assert filesystem_type("/job data/pending", str(mounts)) == "nfs4"
+    assert filesystem_type("/app", str(mounts)) == "overlay"
+    assert filesystem_type("/app", str(tmp_path / "missing")) is None
+
+
+@needs_inotify
+def test_process_jobs_picks_up_new_job_without_polling(tmp_path, monkeypatch):
+    monkeypatch.setattr("worker.processor.JOB_DATA_ROOT", tmp_path)
+    processor = JobProcessor()
+    picked_up = threading.Event()
+
+    def process_job(job_file):
+        picked_up.set()
+        raise StopIteration
+
+    def run():
+        try:
+            processor.process_jobs()
+        except StopIteration:
+            pass
+
+    with patch.object(processor, "process_job", side_effect=process_job), \
+         patch("worker.processor.PendingWatcher.wait", wraps=PendingWatcher.wait, autospec=True) as wait:
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        # Let the loop go idle: the next reap is lease_seconds / 3 away
+        while not wait.called:
+            time.sleep(0.01)
+
+        start = time.monotonic()
+        _enqueue(processor.pending_dir, "j1")
+        assert picked_up.wait(5)
+        thread.join(5)
+
+    assert time.monotonic() - start < 1
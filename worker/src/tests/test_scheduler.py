@@ -0,0 +1,112 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from worker.processor import JobProcessor
+from worker.scheduler import PendingQueue, schedule_key
+
+NOW = 1_000_000.0
+
+
+def _order(jobs, max_wait=600):
+    return [j["job_id"] for j in sorted(jobs, key=lambda j: schedule_key(j, NOW, max_wait))]
+
+
+def test_priority_beats_size_and_age():
+    jobs = [
+        {"job_id": "old", "sequence": 1, "enqueued_at": NOW - 5000, "estimated_bytes": 10},
+        {"job_id": "urgent", "sequence": 2, "enqueued_at": NOW, "estimated_bytes": 10**9, "priority": 2},
+    ]
+
+    assert _order(jobs) == ["urgent", "old"]
+
+
+def test_smaller_jobs_first_then_fifo():
+    jobs = [
+        {"job_id": "season", "sequence": 1, "enqueued_at": NOW - 10, "estimated_bytes": 500 * 10**9},
+        {"job_id": "fix-b", "sequence": 3, "enqueued_at": NOW, "estimated_bytes": 10**9},
+        {"job_id": "fix-a", "sequence": 2, "enqueued_at": NOW, "estimated_bytes": 10**9},
+    ]
+
+    assert _order(jobs) == ["fix-a", "fix-b", "season"]
+
+
+def test_overdue_jobs_are_no_longer_overtaken():
+    jobs = [
+        {"job_id": "small", "sequence": 2, "enqueued_at": NOW, "estimated_bytes": 1},
+        {"job_id": "season", "sequence": 1, "enqueued_at": NOW - 601, "estimated_bytes": 10**12},
+    ]
+
+    assert _order(jobs) == ["season", "small"]
+
+
+def test_jobs_without_scheduling_fields_go_first_by_id():
+    jobs = [
+        {"job_id": "new", "sequence": 5, "enqueued_at": NOW, "estimated_bytes": 1},
+        {"job_id": "legacy-b"},
+        {"job_id": "legacy-a"},
+    ]
+
+    assert _order(jobs) == ["legacy-a", "legacy-b", "new"]
+
+
+@pytest.fixture
+def pending_dir(tmp_path):
+    d = tmp_path / "pending"
+    d.mkdir()
+    return d
+
+
+def _enqueue(pending_dir, job_id, **fields):
+    job_file = pending_dir / f"{job_id}.json"
+    job_file.write_text(json.dumps({"job_id": job_id, "enqueued_at": NOW, **fields}))
+    return job_file
+
+
+def test_pending_queue_orders_and_rereads_changed_files(pending_dir):
+    queue = PendingQueue(pending_dir, max_wait=600)
+    _enqueue(pending_dir, "a", sequence=1, estimated_bytes=100)
+    b = _enqueue(pending_dir, "b", sequence=2, estimated_bytes=10)
+
+    assert [p.stem for p in queue.order(NOW)] == ["b", "a"]
+
+    b.write_text(json.dumps({"job_id": "b", "enqueued_at": NOW, "sequence": 2, "estimated_bytes": 1000}))
+    st = b.stat()
+    os.utime(b, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert queue.positions(NOW) == {"a": 1, "b": 2}
+
+    b.unlink()
+    assert queue.positions(NOW) == {"a": 1}
+    assert list(queue._fields) == ["a.json"]
+
+
+def test_pending_queue_reads_files_once(pending_dir):
+    queue = PendingQueue(pending_dir)
+    _enqueue(pending_dir, "a", sequence=1)
+    queue.order(NOW)
+
+    with patch("builtins.open", side_effect=AssertionError("re-read")):
+        assert [p.stem for p in queue.order(NOW)] == ["a"]
+
+
+def test_unreadable_job_file_is_still_scheduled(pending_dir):
+    (pending_dir / "broken.json").write_text("{")
+
+    assert PendingQueue(pending_dir).positions(NOW) == {"broken": 1}
+
+
+def test_process_jobs_takes_the_next_scheduled_job(tmp_path, monkeypatch):
+    monkeypatch.setattr("worker.processor.JOB_DATA_ROOT", tmp_path)
+    processor = JobProcessor()
+    now = time.time()
+    _enqueue(processor.pending_dir, "season", sequence=1, estimated_bytes=10**12, enqueued_at=now)
+    small = _enqueue(processor.pending_dir, "small", sequence=2, estimated_bytes=10, enqueued_at=now)
+
+    with patch.object(processor, "process_job", side_effect=StopIteration) as process_job:
+        with pytest.raises(StopIteration):
+            processor.process_jobs()
+
+    process_job.assert_called_once_with(small)
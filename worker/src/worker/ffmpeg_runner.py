@@ -3,6 +3,38 @@ import re
 import json
 from pathlib import Path
 from typing import List, Callable
+from .probe_cache import FileIdentity, probe_cache
+
+
+def _from_cache(result: dict) -> dict:
+    """Probe cache entries -> the ffprobe stream dicts _map_streams works with."""
+    streams = {}
+    for kind in ("audio", "subtitle"):
+        streams[kind] = []
+        for s in result[kind]:
+            tags = {"language": s["language"]}
+            if s.get("title") is not None:
+                tags["title"] = s["title"]
+            streams[kind].append({"index": s["id"], "codec_type": s["codec_type"], "tags": tags})
+    return streams
+
+
+def _to_cache(streams: dict) -> dict:
+    """ffprobe stream dicts -> probe cache entries, as the backend writes them."""
+    result = {}
+    for kind in ("audio", "subtitle"):
+        result[kind] = [
+            {
+                "id": s["index"],
+                "language": s.get("tags", {}).get("language", "unknown"),
+                "title": s.get("tags", {}).get("title"),
+                "codec_type": kind,
+            }
+            for s in streams[kind]
+            if s.get("index") is not None
+        ]
+    return result
+
 
 class FfmpegRunner:
     def run_ffmpeg(self, 
@@ -102,11 +134,24 @@ class FfmpegRunner:
         return log
 
     def _probe_streams(self, file_path: Path):
+        # The backend has almost always probed the file already when it was listed
+        identity = FileIdentity.of(file_path)
+        if identity is not None:
+            cached = probe_cache.get(file_path, identity)
+            if cached is not None:
+                return _from_cache(cached)
+
         cmd = [
-            "ffprobe", "-v", "quiet", "-print_format", "json", "-show_streams", str(file_path)
+            "ffprobe", "-v", "error", "-print_format", "json", "-show_streams", str(file_path)
         ]
         res = subprocess.run(cmd, capture_output=True, text=True)
-        data = json.loads(res.stdout)
+        # A failed probe still prints "{}"; caching that would look like a file without streams
+        if res.returncode != 0:
+            raise Exception(f"ffprobe failed with code {res.returncode}: {res.stderr.strip()}")
+        try:
+            data = json.loads(res.stdout)
+        except ValueError as e:
+            raise Exception(f"ffprobe returned unreadable output: {e}")
         
         audio = []
         subs = []
@@ -115,7 +160,10 @@ class FfmpegRunner:
                 audio.append(s)
             elif s.get("codec_type") == "subtitle":
                 subs.append(s)
-        return {"audio": audio, "subtitle": subs}
+        streams = {"audio": audio, "subtitle": subs}
+        if identity is not None:
+            probe_cache.put(file_path, identity, _to_cache(streams))
+        return streams
 
     def _map_streams(self, 
                      input_path: Path, 
@@ -0,0 +1,163 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# A job whose lease is not renewed for this long is handed to another worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Must be unique per replica; container hostnames are
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _read_lease(lease_file: Path) -> Optional[dict]:
+    try:
+        with open(lease_file, "r", encoding="utf-8") as f:
+            lease = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return lease if isinstance(lease, dict) else None
+
+
+class JobClaims:
+    """
+    Claims on queued jobs, safe for several workers sharing one JOB_DATA_ROOT.
+
+    A worker claims a job by creating processing/<job_id>.lease exclusively,
+    which only one worker can do, and then renaming the job file from pending/
+    into processing/. The lease names its owner and an expiry that a heartbeat
+    renews while the job runs. When a lease expires (its worker died or hung),
+    any worker may reap it and move the job back to pending/. Leases left by an
+    earlier run of this worker (same WORKER_ID) are reaped right away.
+    """
+
+    def __init__(self, pending_dir: Path, processing_dir: Path,
+                 owner: str = WORKER_ID, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.pending_dir = pending_dir
+        self.processing_dir = processing_dir
+        self.owner = owner
+        # Tells this process's leases apart from those of a previous run with the same owner
+        self.token = uuid.uuid4().hex
+        self.lease_seconds = lease_seconds
+
+    def _lease_file(self, job_id: str) -> Path:
+        return self.processing_dir / f"{job_id}.lease"
+
+    def _lease(self) -> dict:
+        return {"owner": self.owner, "token": self.token, "expires_at": time.time() + self.lease_seconds}
+
+    def claim(self, job_file: Path) -> Optional[Path]:
+        """Claims a pending job; returns its path in processing/, or None if another worker holds it."""
+        lease_file = self._lease_file(job_file.stem)
+        try:
+            fd = os.open(lease_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._lease(), f)
+
+        processing_file = self.processing_dir / job_file.name
+        try:
+            os.rename(job_file, processing_file)
+        except FileNotFoundError:
+            # Cancelled, or claimed and finished by another worker since pending/ was listed
+            lease_file.unlink(missing_ok=True)
+            return None
+        return processing_file
+
+    def owns(self, job_id: str) -> bool:
+        lease = _read_lease(self._lease_file(job_id))
+        return lease is not None and lease.get("token") == self.token
+
+    def renew(self, job_id: str) -> bool:
+        """Pushes the lease's expiry forward; False if the job is no longer ours."""
+        lease_file = self._lease_file(job_id)
+        if not self.owns(job_id) or not (self.processing_dir / f"{job_id}.json").exists():
+            return False
+        tmp_file = lease_file.with_name(f"{lease_file.name}.{self.token}.tmp")
+        try:
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._lease(), f)
+            os.replace(tmp_file, lease_file)
+        except OSError as e:
+            print(f"Lease renewal error: {e}")
+        return True
+
+    def release(self, job_id: str):
+        """Drops the lease once the job file has left processing/."""
+        if self.owns(job_id):
+            self._lease_file(job_id).unlink(missing_ok=True)
+
+    @contextmanager
+    def heartbeat(self, job_id: str) -> Iterator[threading.Event]:
+        """Renews the lease in the background; the yielded event is set if the lease is lost."""
+        lost = threading.Event()
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.renew(job_id):
+                    print(f"Lost the lease on job {job_id}")
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, name=f"lease-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
+
+    def _is_stale(self, lease_file: Path, now: float) -> bool:
+        lease = _read_lease(lease_file)
+        if lease is None:
+            # Still being written, or left half-written by a crash
+            try:
+                return lease_file.stat().st_mtime < now - self.lease_seconds
+            except OSError:
+                return False
+        if lease.get("owner") == self.owner and lease.get("token") != self.token:
+            return True
+        return lease.get("expires_at", 0) < now
+
+    def reap(self) -> List[str]:
+        """Moves jobs of dead workers back to pending/; returns their job ids."""
+        now = time.time()
+        reaped = []
+        for lease_file in self.processing_dir.glob("*.lease"):
+            if not self._is_stale(lease_file, now):
+                continue
+            job_id = lease_file.stem
+            # Only one of several reaping workers wins this rename
+            reaping = lease_file.with_name(f"{lease_file.name}.{self.token}.reaping")
+            try:
+                os.rename(lease_file, reaping)
+            except OSError:
+                continue
+            if not self._is_stale(reaping, now):
+                # Renewed between the check and the rename
+                os.replace(reaping, lease_file)
+                continue
+            if self._return_to_pending(job_id):
+                reaped.append(job_id)
+            reaping.unlink(missing_ok=True)
+
+        # Jobs without any lease were left by a worker that predates leases
+        for job_file in self.processing_dir.glob("*.json"):
+            if not any(self.processing_dir.glob(f"{job_file.stem}.lease*")) and self._return_to_pending(job_file.stem):
+                reaped.append(job_file.stem)
+        return reaped
+
+    def _return_to_pending(self, job_id: str) -> bool:
+        try:
+            os.rename(self.processing_dir / f"{job_id}.json", self.pending_dir / f"{job_id}.json")
+        except FileNotFoundError:
+            # The owner moved the job on but died before releasing its lease
+            return False
+        print(f"Returned job {job_id} to the queue")
+        return True
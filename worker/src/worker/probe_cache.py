@@ -0,0 +1,142 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
+
+# Must match the backend's probe cache (backend/src/app/core/probe_cache.py)
+SCHEMA_VERSION = 3
+LAST_USED_RESOLUTION_SECONDS = 3600
+
+# The worker only reads and writes `probes`. The backend owns the rest of the
+# schema: its triggers keep the derived stream tables in sync with rows written
+# here, and it rebuilds them if the worker created the database first.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    languages TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS probes_last_used ON probes (last_used);
+"""
+
+
+class FileIdentity(NamedTuple):
+    """What has to match for a cached probe result to still be valid."""
+    size: int
+    mtime_ns: int
+    inode: int
+
+    @classmethod
+    def of(cls, file_path: Path) -> Optional["FileIdentity"]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return cls(st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class ProbeCache:
+    """
+    The backend's SQLite probe cache, shared through JOB_DATA_ROOT.
+
+    Results are stored as {"audio": [...], "subtitle": [...]} with one
+    {"id", "language", "title", "codec_type"} dict per stream, keyed by absolute
+    path and only returned while the file's size, mtime and inode are unchanged.
+    The backend evicts old rows; the worker never deletes anything. If the
+    database cannot be opened, or was written by an incompatible backend, the
+    cache disables itself and every lookup is a miss.
+    """
+
+    def __init__(self, db_file: Optional[Path] = None):
+        self.db_file = db_file or JOB_DATA_ROOT / "probe_cache.db"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None and not self._disabled:
+            try:
+                self.db_file.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.db_file, timeout=10, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version == 0:
+                    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+                elif version != SCHEMA_VERSION:
+                    # Migrations are the backend's job
+                    print(f"Probe cache error: schema version {version}, expected {SCHEMA_VERSION}")
+                    conn.close()
+                    self._disabled = True
+                    return None
+                conn.executescript(_SCHEMA)
+                conn.commit()
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"Probe cache error: {e}")
+                self._disabled = True
+        return self._conn
+
+    def get(self, file_path: Path, identity: FileIdentity) -> Optional[Dict[str, List[dict]]]:
+        """Returns the cached result, or None if the file is unknown or changed since it was probed."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT size, mtime_ns, inode, result, last_used FROM probes WHERE path = ?",
+                    (str(file_path),),
+                ).fetchone()
+                if row is None or FileIdentity(*row[:3]) != identity:
+                    return None
+                now = time.time()
+                if now - row[4] >= LAST_USED_RESOLUTION_SECONDS:
+                    conn.execute("UPDATE probes SET last_used = ? WHERE path = ?", (now, str(file_path)))
+                    conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+                return None
+        return json.loads(row[3])
+
+    def put(self, file_path: Path, identity: FileIdentity, result: Dict[str, List[dict]]):
+        payload = json.dumps({"audio": result["audio"], "subtitle": result["subtitle"]})
+        languages = json.dumps(sorted({s["language"] for s in result["audio"] + result["subtitle"]}))
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO probes (path, dir, size, mtime_ns, inode, result, languages, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        str(file_path),
+                        # Parent folder with trailing separator, as the backend's folder_of()
+                        os.path.join(os.path.dirname(str(file_path)), ""),
+                        *identity, payload, languages, time.time(),
+                    ),
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Probe cache error: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._disabled = False
+
+
+probe_cache = ProbeCache()
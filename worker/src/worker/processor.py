@@ -4,11 +4,25 @@ import shutil
 from datetime import datetime, timezone
 from pathlib import Path, PureWindowsPath
 from .ffmpeg_runner import FfmpegRunner
+from .leases import JobClaims
+from .queue_watcher import PendingWatcher
+from .scheduler import PendingQueue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
 
 JOB_DATA_ROOT = Path(os.getenv("JOB_DATA_ROOT", "/job-data"))
 INPUT_ROOT = Path(os.getenv("INPUT_ROOT", "/media/input"))
 OUTPUT_ROOT = Path(os.getenv("OUTPUT_ROOT", "/media/output"))
+# Files of one job remuxed at the same time; a job may ask for its own value
+JOB_PARALLELISM = int(os.getenv("JOB_PARALLELISM", "1"))
+# Upper bound for JOB_PARALLELISM and for what a job asks for
+JOB_PARALLELISM_MAX = int(os.getenv("JOB_PARALLELISM_MAX", "8"))
+# Progress writes to a job's status file: at most this many per second, and only
+# once overall progress moved by at least STATUS_MIN_PERCENT_STEP
+STATUS_MAX_WRITES_PER_SECOND = float(os.getenv("STATUS_MAX_WRITES_PER_SECOND", "4"))
+STATUS_MIN_PERCENT_STEP = float(os.getenv("STATUS_MIN_PERCENT_STEP", "0.5"))
 
 def _is_relative_to(path: Path, root: Path) -> bool:
     try:
@@ -54,6 +68,78 @@ def _output_path_for(output_dir: Path, file_rel: str, output_root: Path) -> Path
     return resolved
 
 
+class JobProgress:
+    """Overall progress of a job whose files may run side by side."""
+
+    def __init__(self, total_files: int):
+        self.total_files = total_files
+        self._done = 0
+        # idx -> (rel_path, percent) of the files currently running, in start order
+        self._running: Dict[int, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, idx: int, file_rel: str, percent: float):
+        with self._lock:
+            self._running[idx] = (file_rel, min(max(percent, 0.0), 100.0))
+
+    def finish(self, idx: int):
+        with self._lock:
+            self._running.pop(idx, None)
+            self._done += 1
+
+    @property
+    def overall_percent(self) -> float:
+        with self._lock:
+            if not self.total_files:
+                return 0.0
+            in_flight = sum(percent for _, percent in self._running.values())
+            return (self._done * 100 + in_flight) / self.total_files
+
+    @property
+    def current_files(self) -> List[str]:
+        with self._lock:
+            return [file_rel for file_rel, _ in self._running.values()]
+
+
+class StatusPublisher:
+    """
+    Coalesces the progress updates of one job into status file writes.
+
+    ffmpeg reports progress many times a second, and every write replaces the
+    status file the backend polls. A status change or a change of the running
+    files is written at once; otherwise a write needs both the interval
+    (1 / max_rate) to have passed since the last one and the percent to have
+    moved by min_step. Updates held back are not lost for long: the next
+    update that qualifies carries the latest values.
+    """
+
+    def __init__(self, write: Callable[[str, float, List[str]], None],
+                 max_rate: Optional[float] = None, min_step: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._write = write
+        max_rate = STATUS_MAX_WRITES_PER_SECOND if max_rate is None else max_rate
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.min_step = STATUS_MIN_PERCENT_STEP if min_step is None else min_step
+        self._clock = clock
+        # (status, percent, files) last written, and when
+        self._last: Optional[Tuple[str, float, List[str]]] = None
+        self._last_at = 0.0
+        self._lock = threading.Lock()
+
+    def publish(self, status: str, percent: float, current_files: Optional[List[str]] = None):
+        current_files = list(current_files or [])
+        with self._lock:
+            now = self._clock()
+            last = self._last
+            if last is not None and last[0] == status and last[2] == current_files:
+                if now - self._last_at < self.interval or abs(percent - last[1]) < self.min_step:
+                    return
+            self._last = (status, percent, current_files)
+            self._last_at = now
+            # Written under the lock so an older update never lands after a newer one
+            self._write(status, percent, current_files)
+
+
 class JobProcessor:
     def __init__(self):
         self.pending_dir = JOB_DATA_ROOT / "pending"
@@ -61,21 +147,40 @@ class JobProcessor:
         self.completed_dir = JOB_DATA_ROOT / "completed"
         self.failed_dir = JOB_DATA_ROOT / "failed"
         self.logs_dir = JOB_DATA_ROOT / "logs"
+        self.status_dir = JOB_DATA_ROOT / "status"
 
-        for d in [self.pending_dir, self.processing_dir, self.completed_dir, self.failed_dir, self.logs_dir]:
+        for d in [self.pending_dir, self.processing_dir, self.completed_dir, self.failed_dir, self.logs_dir, self.status_dir]:
             d.mkdir(parents=True, exist_ok=True)
 
-    def process_jobs(self):
-        # Polling loop
-        while True:
-            # Check for pending jobs
-            files = sorted(list(self.pending_dir.glob("*.json")))
-            if not files:
-                time.sleep(2)
-                continue
+        # Files of a parallel job report progress from several threads
+        self._status_lock = threading.Lock()
+        self.claims = JobClaims(self.pending_dir, self.processing_dir)
+        self.pending_queue = PendingQueue(self.pending_dir)
 
-            job_file = files[0]
-            self.process_job(job_file)
+    def process_jobs(self):
+        watcher = PendingWatcher(self.pending_dir)
+        next_reap = 0.0
+        try:
+            while True:
+                if time.monotonic() >= next_reap:
+                    self.reap_stale_jobs()
+                    next_reap = time.monotonic() + self.claims.lease_seconds / 3
+
+                # Pending jobs in scheduling order; another worker may claim any of them first
+                watcher.drain()
+                for job_file in self.pending_queue.order():
+                    if self.process_job(job_file):
+                        watcher.reset()
+                        break
+                else:
+                    # Wakes up early for new jobs; otherwise in time for the next reap
+                    watcher.wait(next_reap - time.monotonic())
+        finally:
+            watcher.close()
+
+    def reap_stale_jobs(self):
+        for job_id in self.claims.reap():
+            self.update_status(job_id, "pending", 0.0)
 
     def _log_line(self, job_id: str, line: str):
         """Append a timestamped line to the job's log file."""
@@ -84,20 +189,31 @@ class JobProcessor:
         with open(log_file, "a", encoding="utf-8") as f:
             f.write(f"[{ts}] {line}\n")
 
-    def process_job(self, job_file: Path):
+    def process_job(self, job_file: Path) -> bool:
+        """Claims and runs a pending job; False if another worker claimed it first."""
+        processing_file = self.claims.claim(job_file)
+        if processing_file is None:
+            return False
         print(f"Picking up job {job_file.name}")
 
-        # Move to processing
-        processing_file = self.processing_dir / job_file.name
-        shutil.move(job_file, processing_file)
+        with self.claims.heartbeat(job_file.stem) as lease_lost:
+            self._run_job(job_file, processing_file, lease_lost)
+        self.claims.release(job_file.stem)
+        return True
 
+    def _run_job(self, job_file: Path, processing_file: Path, lease_lost: threading.Event):
         job_data = {}
         try:
             with open(processing_file, "r", encoding="utf-8") as f:
                 job_data = json.load(f)
 
             job_id = job_data["job_id"]
-            self.update_status(job_id, "processing", 0.0)
+            publisher = StatusPublisher(
+                lambda status, percent, current_files: self.update_status(
+                    job_id, status, percent, current_files=current_files
+                )
+            )
+            publisher.publish("processing", 0.0)
 
             # Resolve paths:
             # Input paths in job_data are relative to INPUT_ROOT
@@ -124,66 +240,76 @@ class JobProcessor:
 
             # Use 'selections' if available, otherwise use 'files' (fallback)
             selections = job_data.get("selections")
-
             if selections:
-                total_files = len(selections)
-                resolved_selections = [
-                    (
-                        sel,
-                        _resolve_under_root(sel["rel_path"], input_root, "input file"),
-                        _output_path_for(output_dir, sel["rel_path"], output_root),
-                    )
+                entries = [
+                    (sel["rel_path"], sel.get("audio_stream_ids"), sel.get("subtitle_stream_ids"))
                     for sel in selections
                 ]
-
-                for idx, (sel, input_path, output_path) in enumerate(resolved_selections):
-                    file_rel = sel["rel_path"]
-                    self.update_status(job_id, "processing", (idx / total_files) * 100, current_file=file_rel)
-
-                    if not input_path.exists():
-                        print(f"Input not found: {input_path}")
-                        continue
-
-                    runner = FfmpegRunner()
-                    runner.run_ffmpeg(
-                        input_path,
-                        output_path,
-                        job_data["audio_languages"],
-                        job_data["subtitle_languages"],
-                        lambda p: self.update_status(job_id, "processing", ((idx + p/100) / total_files) * 100, current_file=file_rel),
-                        audio_stream_ids=sel.get("audio_stream_ids"),
-                        subtitle_stream_ids=sel.get("subtitle_stream_ids"),
-                        log_callback=lambda line: self._log_line(job_id, line)
-                    )
             else:
-                total_files = len(files)
-                resolved_files = [
-                    (
-                        file_rel,
-                        _resolve_under_root(file_rel, input_root, "input file"),
-                        _output_path_for(output_dir, file_rel, output_root),
-                    )
-                    for file_rel in files
-                ]
-
-                for idx, (file_rel, input_path, output_path) in enumerate(resolved_files):
-                    self.update_status(job_id, "processing", (idx / total_files) * 100, current_file=file_rel)
-
-                    # Check if input exists
-                    if not input_path.exists():
-                         print(f"Input not found: {input_path}")
-                         continue
-
-                    runner = FfmpegRunner()
-                    runner.run_ffmpeg(
-                        input_path,
-                        output_path,
-                        job_data["audio_languages"],
-                        job_data["subtitle_languages"],
-                        lambda p: self.update_status(job_id, "processing", ((idx + p/100) / total_files) * 100, current_file=file_rel),
-                        log_callback=lambda line: self._log_line(job_id, line)
-                    )
-
+                entries = [(file_rel, None, None) for file_rel in files]
+
+            # Resolve every path before the first ffmpeg run
+            tasks = [
+                (
+                    file_rel,
+                    _resolve_under_root(file_rel, input_root, "input file"),
+                    _output_path_for(output_dir, file_rel, output_root),
+                    audio_stream_ids,
+                    subtitle_stream_ids,
+                )
+                for file_rel, audio_stream_ids, subtitle_stream_ids in entries
+            ]
+
+            parallelism = min(max(1, int(job_data.get("parallelism") or JOB_PARALLELISM)), max(1, JOB_PARALLELISM_MAX))
+            progress = JobProgress(len(tasks))
+
+            def run(idx, task):
+                file_rel, input_path, output_path, audio_stream_ids, subtitle_stream_ids = task
+                if not input_path.exists():
+                    print(f"Input not found: {input_path}")
+                    progress.finish(idx)
+                    return
+
+                def publish(percent=0.0):
+                    progress.update(idx, file_rel, percent)
+                    publisher.publish("processing", progress.overall_percent, progress.current_files)
+
+                def log(line):
+                    # Lines of files running side by side would be indistinguishable otherwise
+                    self._log_line(job_id, f"[{input_path.name}] {line}" if parallelism > 1 else line)
+
+                publish()
+                runner = FfmpegRunner()
+                runner.run_ffmpeg(
+                    input_path,
+                    output_path,
+                    job_data["audio_languages"],
+                    job_data["subtitle_languages"],
+                    publish,
+                    audio_stream_ids=audio_stream_ids,
+                    subtitle_stream_ids=subtitle_stream_ids,
+                    log_callback=log,
+                )
+                progress.finish(idx)
+
+            if parallelism == 1 or len(tasks) <= 1:
+                for idx, task in enumerate(tasks):
+                    run(idx, task)
+            else:
+                with ThreadPoolExecutor(max_workers=parallelism) as pool:
+                    futures = [pool.submit(run, idx, task) for idx, task in enumerate(tasks)]
+                    try:
+                        for future in as_completed(futures):
+                            future.result()
+                    except Exception:
+                        # Do not start further files; the running ones are left to finish
+                        pool.shutdown(wait=True, cancel_futures=True)
+                        raise
+
+            if lease_lost.is_set():
+                # The job went back to the queue while this worker was stalled
+                print(f"Job {job_id} finished after its lease was lost; leaving it to its new owner")
+                return
             self.update_status(job_id, "completed", 100.0)
             shutil.move(processing_file, self.completed_dir / job_file.name)
 
@@ -191,20 +317,30 @@ class JobProcessor:
             print(f"Job failed: {e}")
             job_id = job_data.get("job_id", "unknown")
             self._log_line(job_id, str(e))
+            if lease_lost.is_set():
+                return
             self.update_status(job_id, "failed", 0.0)
             shutil.move(processing_file, self.failed_dir / job_file.name)
 
-    def update_status(self, job_id, status, percent, current_file=None):
-        status_file = JOB_DATA_ROOT / "status" / f"{job_id}.json"
-        status_file.parent.mkdir(parents=True, exist_ok=True)
+    def update_status(self, job_id, status, percent, current_file=None, current_files: Optional[List[str]] = None):
+        if current_files is None:
+            current_files = [current_file] if current_file else []
+        elif current_file is None and current_files:
+            current_file = current_files[0]
+
+        status_file = self.status_dir / f"{job_id}.json"
 
         data = {
             "job_id": job_id,
             "status": status,
             "overall_percent": percent,
             "current_file": current_file,
+            "current_files": current_files,
         }
+        with self._status_lock:
+            self._write_status(status_file, data)
 
+    def _write_status(self, status_file: Path, data: dict):
         # Simple atomic write
         tmp_file = status_file.with_suffix(".tmp")
         with open(tmp_file, "w", encoding="utf-8") as f:
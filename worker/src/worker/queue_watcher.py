@@ -0,0 +1,106 @@
+import os
+import select
+import time
+from pathlib import Path
+from typing import Optional
+from . import inotify
+
+# How the worker notices new jobs: 'auto', 'inotify' or 'poll'.
+# 'auto' uses inotify unless JOB_DATA_ROOT is on a network mount.
+QUEUE_WATCHER = os.getenv("QUEUE_WATCHER", "auto")
+# Polling interval bounds (seconds); the interval doubles while the queue stays empty
+QUEUE_POLL_MIN_SECONDS = float(os.getenv("QUEUE_POLL_MIN_SECONDS", "0.25"))
+QUEUE_POLL_MAX_SECONDS = float(os.getenv("QUEUE_POLL_MAX_SECONDS", "5"))
+
+# The backend writes job files under a temporary name and renames them into place
+WATCH_MASK = inotify.IN_MOVED_TO | inotify.IN_CLOSE_WRITE | inotify.IN_ONLYDIR
+
+# Filesystems where inotify only sees local changes (same list as the backend's library watcher)
+NETWORK_FS_TYPES = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs",
+    "fuse.sshfs", "fuse.rclone", "davfs", "fuse.glusterfs",
+}
+
+
+def filesystem_type(path: Path, mounts_file: str = "/proc/mounts") -> Optional[str]:
+    """Returns the type of the filesystem path lives on, or None if unknown."""
+    try:
+        with open(mounts_file, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    path_str = str(path)
+    best, best_type = "", None
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        # Spaces in mount points are escaped as \040
+        mount_point = parts[1].replace("\\040", " ")
+        prefix = mount_point.rstrip("/") + "/"
+        if (path_str == mount_point or path_str.startswith(prefix)) and len(mount_point) >= len(best):
+            best, best_type = mount_point, parts[2]
+    return best_type
+
+
+class PendingWatcher:
+    """
+    Sleeps until pending/ may hold a new job.
+
+    In 'inotify' mode wait() blocks on the inotify descriptor and returns as
+    soon as a job file is written or moved into pending/, so an idle worker
+    does not touch the volume. In 'poll' mode (network mounts, where other
+    hosts' writes raise no events, and non-Linux platforms) it sleeps between
+    QUEUE_POLL_MIN_SECONDS and QUEUE_POLL_MAX_SECONDS, backing off while the
+    queue stays empty.
+    """
+
+    def __init__(self, pending_dir: Path, mode: str = QUEUE_WATCHER,
+                 poll_min: float = QUEUE_POLL_MIN_SECONDS, poll_max: float = QUEUE_POLL_MAX_SECONDS):
+        self.pending_dir = pending_dir
+        self.poll_min = poll_min
+        self.poll_max = max(poll_min, poll_max)
+        self._delay = self.poll_min
+        self._inotify: Optional[inotify.Inotify] = None
+        self.mode = self.choose_mode(mode)
+        if self.mode == "inotify":
+            try:
+                self._inotify = inotify.Inotify()
+                self._inotify.add_watch(str(pending_dir), WATCH_MASK)
+            except OSError as e:
+                print(f"Queue watcher: inotify unavailable ({e}), falling back to polling")
+                self.close()
+                self.mode = "poll"
+        print(f"Queue watcher running in '{self.mode}' mode")
+
+    def choose_mode(self, mode: str) -> str:
+        mode = mode.lower()
+        if mode == "poll" or not inotify.is_available():
+            return "poll"
+        if mode == "auto" and filesystem_type(self.pending_dir.resolve()) in NETWORK_FS_TYPES:
+            return "poll"
+        return "inotify"
+
+    def drain(self):
+        """Forgets events seen so far; call right before listing pending/."""
+        if self._inotify is not None:
+            while self._inotify.read_events():
+                pass
+
+    def wait(self, timeout: float) -> bool:
+        """Blocks until pending/ changes or `timeout` seconds pass; True if woken by a change."""
+        if self._inotify is None:
+            time.sleep(max(0.0, min(self._delay, timeout)))
+            self._delay = min(self._delay * 2, self.poll_max)
+            return False
+        readable, _, _ = select.select([self._inotify.fileno()], [], [], max(0.0, timeout))
+        return bool(readable)
+
+    def reset(self):
+        """Polls quickly again after a job ran; jobs tend to come in bursts."""
+        self._delay = self.poll_min
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
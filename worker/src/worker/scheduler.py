@@ -0,0 +1,77 @@
+"""
+Order in which workers take pending jobs.
+
+The worker uses it to decide what runs next. The backend imports this module
+too (its image copies the package in) to report queue positions, so both
+always order jobs the same way.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# A job that has waited this long is no longer overtaken by smaller jobs of its priority
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOB_MAX_WAIT_SECONDS", "1800"))
+
+_FIELDS = ("job_id", "priority", "sequence", "enqueued_at", "estimated_bytes")
+
+
+def schedule_key(job: dict, now: float, max_wait: float = JOB_MAX_WAIT_SECONDS) -> tuple:
+    """
+    Sort key of a pending job: higher `priority` first; within a priority, jobs
+    waiting longer than max_wait in enqueue order, then shortest job first by
+    `estimated_bytes`; ties in enqueue order. Jobs queued without these fields
+    count as priority 0 and overdue.
+    """
+    priority = int(job.get("priority") or 0)
+    sequence = int(job.get("sequence") or 0)
+    overdue = now - float(job.get("enqueued_at") or 0) >= max_wait
+    size = 0 if overdue else int(job.get("estimated_bytes") or 0)
+    return (-priority, not overdue, size, sequence, str(job.get("job_id") or ""))
+
+
+class PendingQueue:
+    """Scheduling fields of pending/*.json; a job file is only re-read when it changes."""
+
+    def __init__(self, pending_dir: Path, max_wait: float = JOB_MAX_WAIT_SECONDS):
+        self.pending_dir = pending_dir
+        self.max_wait = max_wait
+        # file name -> (mtime_ns, scheduling fields)
+        self._fields: Dict[str, Tuple[int, dict]] = {}
+
+    def _read(self, job_file: Path) -> Optional[dict]:
+        try:
+            mtime_ns = job_file.stat().st_mtime_ns
+        except OSError:
+            return None
+        cached = self._fields.get(job_file.name)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        try:
+            with open(job_file, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            fields = {k: payload.get(k) for k in _FIELDS}
+        except (OSError, ValueError, AttributeError):
+            fields = {}
+        fields["job_id"] = fields.get("job_id") or job_file.stem
+        self._fields[job_file.name] = (mtime_ns, fields)
+        return fields
+
+    def order(self, now: Optional[float] = None) -> List[Path]:
+        """Pending job files, next to run first."""
+        now = time.time() if now is None else now
+        jobs = []
+        for job_file in self.pending_dir.glob("*.json"):
+            fields = self._read(job_file)
+            if fields is not None:
+                jobs.append((schedule_key(fields, now, self.max_wait), job_file))
+        names = {job_file.name for _, job_file in jobs}
+        for name in list(self._fields):
+            if name not in names:
+                del self._fields[name]
+        return [job_file for _, job_file in sorted(jobs)]
+
+    def positions(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Job id -> 1-based place in the queue."""
+        return {job_file.stem: i for i, job_file in enumerate(self.order(now), start=1)}